@@ -1,22 +1,49 @@
 # app/db/database.py
 import os
-from sqlalchemy import create_engine
+from datetime import datetime, timezone
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.pool import StaticPool
 
 # Obtiene la URL de la base de datos de la variable de entorno de Render
 DATABASE_URL = os.getenv("DATABASE_URL")
 
+# Modo harness: sin DATABASE_URL, HARNESS_DB permite arrancar la app contra SQLite local
+# (ruta de archivo o ":memory:") para benchmarks y perfilado sin un Postgres disponible.
+HARNESS_DB = os.getenv("HARNESS_DB")
+if not DATABASE_URL and HARNESS_DB:
+    DATABASE_URL = "sqlite://" if HARNESS_DB == ":memory:" else f"sqlite:///{HARNESS_DB}"
+
 # Si no se encuentra la URL, levanta un error
 if not DATABASE_URL:
-    raise ValueError("DATABASE_URL no está configurada. Por favor, revisa las variables de entorno de Render.")
+    raise ValueError("DATABASE_URL no está configurada. Por favor, revisa las variables de entorno de Render (o usa HARNESS_DB en local).")
+
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
+
+engine_kwargs = {}
+if IS_SQLITE:
+    # Los endpoints síncronos corren en el threadpool: la conexión se comparte entre hilos
+    engine_kwargs["connect_args"] = {"check_same_thread": False}
+    if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+        # Una base en memoria solo existe dentro de su conexión: todas las sesiones usan la misma
+        engine_kwargs["poolclass"] = StaticPool
 
 # Crea el motor de la base de datos, usando un pool_pre_ping para mantener la conexión
 engine = create_engine(
     DATABASE_URL, 
-    pool_pre_ping=True
+    pool_pre_ping=True,
+    **engine_kwargs
 )
 
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _activar_claves_foraneas(dbapi_connection, connection_record):
+        # SQLite no valida claves foráneas por defecto; Postgres sí
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
 # Configura la clase de sesión que tu aplicación usará para interactuar con la base de datos
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -24,6 +51,15 @@ SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
 
+def utc_now() -> datetime:
+    """
+    Fecha y hora UTC sin zona: lo que devuelven las columnas DateTime (sin zona) al leerlas.
+    Default de las columnas de fecha: una respuesta armada antes del commit serializa la fecha
+    igual que cualquier GET posterior.
+    """
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
 # Función para obtener una sesión de base de datos
 def get_db():
     """
@@ -0,0 +1,325 @@
+# app/historial_particiones.py
+"""
+Particionado mensual y retención de historial_cambios (Postgres).
+
+historial_cambios solo crece. Particionada por rango mensual de fecha_cambio, las consultas del
+historial reciente (paginación por cursor, del más nuevo al más antiguo) tocan una partición,
+y la retención se reduce a desconectar y borrar particiones enteras en lugar de un DELETE masivo.
+
+    python -m app.historial_particiones convertir            # una vez: convierte la tabla en particionada
+    python -m app.historial_particiones crear --meses 3       # particiones del mes actual y los 3 siguientes (cron mensual)
+    python -m app.historial_particiones listar
+    python -m app.historial_particiones retencion --meses 24 [--archivar DIR] [--dry-run]
+    python -m app.historial_particiones snapshots --minimo 50   # snapshots de registros con muchos cambios (cron)
+
+Una partición DEFAULT recoge las filas fuera de rango, así que un mes sin crear no hace fallar
+los INSERT; 'crear' mueve después esas filas a su partición, y 'crear' y 'listar' avisan si la
+DEFAULT no está vacía. Con --archivar, cada partición vencida se exporta a DIR/<partición>.csv.gz antes de
+borrarla. En SQLite (harness) no hay particiones: la retención borra por lotes.
+Antes de borrar, la retención guarda un snapshot a la fecha de corte de cada registro con
+cambios vencidos, para que /historial_cambio/{tabla}/{id}/as_of siga reconstruyendo fechas
+posteriores al corte.
+"""
+import argparse
+import gzip
+import os
+import re
+import sys
+from datetime import date, datetime, timezone
+from typing import List, Tuple
+
+from sqlalchemy import text
+
+from app.db.database import SessionLocal, engine as default_engine
+from app.models.historial_cambio import HistorialCambio
+from app.utils.auditoria import tomar_snapshots
+
+TABLA = HistorialCambio.__tablename__
+DEFAULT = f"{TABLA}_default"
+# Filas por DELETE en la retención sin particiones
+LOTE_RETENCION = int(os.getenv("HISTORIAL_RETENTION_BATCH", "5000"))
+_PATRON_PARTICION = re.compile(rf"^{TABLA}_p(\d{{4}})(\d{{2}})$")
+
+
+def _mes(d) -> date:
+    return date(d.year, d.month, 1)
+
+
+def _sumar_meses(d: date, meses: int) -> date:
+    indice = d.year * 12 + d.month - 1 + meses
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _nombre_particion(mes: date) -> str:
+    return f"{TABLA}_p{mes.year:04d}{mes.month:02d}"
+
+
+def _es_postgres(engine) -> bool:
+    return engine.dialect.name == "postgresql"
+
+
+def esta_particionada(conn) -> bool:
+    relkind = conn.execute(
+        text("SELECT c.relkind FROM pg_class c WHERE c.oid = to_regclass(:tabla)"), {"tabla": TABLA}
+    ).scalar()
+    return relkind == "p"
+
+
+def particiones(conn) -> List[Tuple[str, date]]:
+    """(nombre, mes) de las particiones mensuales, de la más antigua a la más reciente."""
+    nombres = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:tabla)"
+    ), {"tabla": TABLA}).scalars().all()
+    resultado = []
+    for nombre in nombres:
+        coincidencia = _PATRON_PARTICION.match(nombre)
+        if coincidencia:
+            resultado.append((nombre, date(int(coincidencia.group(1)), int(coincidencia.group(2)), 1)))
+    return sorted(resultado, key=lambda particion: particion[1])
+
+
+def _filas_en_default(conn, desde: date, hasta: date) -> int:
+    if conn.execute(text("SELECT to_regclass(:nombre) IS NULL"), {"nombre": DEFAULT}).scalar():
+        return 0
+    return conn.execute(
+        text(f"SELECT count(*) FROM {DEFAULT} WHERE fecha_cambio >= :desde AND fecha_cambio < :hasta"),
+        {"desde": desde, "hasta": hasta},
+    ).scalar()
+
+
+def crear_particion(conn, mes: date) -> bool:
+    """
+    Crea la partición de `mes`. Si el cron llegó tarde y la partición DEFAULT ya recogió filas de
+    ese mes, Postgres no permite crearla: se desconecta la DEFAULT, se crea la partición, se mueven
+    a ella las filas del mes y se vuelve a conectar la DEFAULT, todo en la misma transacción.
+    """
+    nombre = _nombre_particion(mes)
+    existe = conn.execute(text("SELECT to_regclass(:nombre) IS NOT NULL"), {"nombre": nombre}).scalar()
+    if existe:
+        return False
+    siguiente = _sumar_meses(mes, 1)
+    rango = f"FROM ('{mes.isoformat()}') TO ('{siguiente.isoformat()}')"
+    atrasadas = _filas_en_default(conn, mes, siguiente)
+    if not atrasadas:
+        conn.exec_driver_sql(f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES {rango}")
+        print(f"DEBUG BACKEND: [HISTORIAL] Partición {nombre} creada.")
+        return True
+
+    print(f"DEBUG BACKEND: [HISTORIAL] {DEFAULT} tiene {atrasadas} filas de {mes.isoformat()[:7]}: se mueven a {nombre}.")
+    condicion = {"desde": mes, "hasta": siguiente}
+    conn.exec_driver_sql(f"ALTER TABLE {TABLA} DETACH PARTITION {DEFAULT}")
+    conn.exec_driver_sql(f"CREATE TABLE {nombre} PARTITION OF {TABLA} FOR VALUES {rango}")
+    conn.execute(text(
+        f"WITH movidas AS (DELETE FROM {DEFAULT} WHERE fecha_cambio >= :desde AND fecha_cambio < :hasta RETURNING *) "
+        f"INSERT INTO {nombre} SELECT * FROM movidas"
+    ), condicion)
+    conn.exec_driver_sql(f"ALTER TABLE {TABLA} ATTACH PARTITION {DEFAULT} DEFAULT")
+    print(f"DEBUG BACKEND: [HISTORIAL] Partición {nombre} creada con {atrasadas} filas movidas desde {DEFAULT}.")
+    return True
+
+
+def crear_particiones(engine=default_engine, meses: int = 3) -> int:
+    """
+    Crea las particiones que falten del mes actual y de los `meses` siguientes, además de las
+    de meses anteriores que tengan filas en la partición DEFAULT (cron atrasado).
+    Cada partición va en su propia transacción: un fallo no impide crear las demás.
+    """
+    actual = _mes(datetime.now(timezone.utc))
+    with engine.connect() as conn:
+        if not esta_particionada(conn):
+            print(f"ERROR DB: [HISTORIAL] {TABLA} no está particionada. Ejecuta primero 'convertir'.")
+            return 0
+        meses_pendientes = []
+        if conn.execute(text("SELECT to_regclass(:nombre) IS NOT NULL"), {"nombre": DEFAULT}).scalar():
+            meses_pendientes = [
+                _mes(fila) for fila in conn.execute(text(
+                    f"SELECT DISTINCT date_trunc('month', fecha_cambio) FROM {DEFAULT} WHERE fecha_cambio < :desde"
+                ), {"desde": actual}).scalars()
+            ]
+    meses_pendientes += [_sumar_meses(actual, desplazamiento) for desplazamiento in range(meses + 1)]
+
+    creadas = 0
+    for mes in sorted(set(meses_pendientes)):
+        try:
+            with engine.begin() as conn:
+                creadas += crear_particion(conn, mes)
+        except Exception as e:
+            print(f"ERROR DB: [HISTORIAL] No se pudo crear la partición {_nombre_particion(mes)}: {e}")
+    avisar_default(engine)
+    return creadas
+
+
+def avisar_default(engine=default_engine) -> int:
+    """Filas en la partición DEFAULT (debería estar vacía); se avisa si no lo está."""
+    with engine.connect() as conn:
+        if conn.execute(text("SELECT to_regclass(:nombre) IS NULL"), {"nombre": DEFAULT}).scalar():
+            return 0
+        filas = conn.exec_driver_sql(f"SELECT count(*) FROM {DEFAULT}").scalar()
+    if filas:
+        print(f"ERROR DB: [HISTORIAL] La partición {DEFAULT} tiene {filas} filas: falta crear particiones (ejecuta 'crear').")
+    return filas
+
+
+def convertir(engine=default_engine, meses: int = 3):
+    """Convierte historial_cambios en una tabla particionada por mes, copiando las filas existentes."""
+    if not _es_postgres(engine):
+        print("ERROR DB: [HISTORIAL] El particionado solo está disponible en Postgres.")
+        return
+    antigua = f"{TABLA}_antigua"
+    with engine.begin() as conn:
+        if esta_particionada(conn):
+            print(f"DEBUG BACKEND: [HISTORIAL] {TABLA} ya está particionada.")
+            return
+        print(f"DEBUG BACKEND: [HISTORIAL] Convirtiendo {TABLA} en tabla particionada por mes...")
+        conn.exec_driver_sql(f"ALTER TABLE {TABLA} RENAME TO {antigua}")
+        conn.exec_driver_sql(f"ALTER TABLE {antigua} RENAME CONSTRAINT {TABLA}_pkey TO {antigua}_pkey")
+        # Los nombres de índice son globales al esquema: se recrean en la tabla nueva
+        for indice in HistorialCambio.__table__.indexes:
+            conn.exec_driver_sql(f"DROP INDEX IF EXISTS {indice.name}")
+        conn.exec_driver_sql(f"UPDATE {antigua} SET fecha_cambio = now() AT TIME ZONE 'utc' WHERE fecha_cambio IS NULL")
+
+        conn.exec_driver_sql(f"CREATE TABLE {TABLA} (LIKE {antigua} INCLUDING DEFAULTS) PARTITION BY RANGE (fecha_cambio)")
+        conn.exec_driver_sql(f"ALTER TABLE {TABLA} ALTER COLUMN fecha_cambio SET NOT NULL")
+        # La clave de partición debe formar parte de la clave primaria
+        conn.exec_driver_sql(f"ALTER TABLE {TABLA} ADD PRIMARY KEY (id, fecha_cambio)")
+        conn.exec_driver_sql(f"ALTER TABLE {TABLA} ADD FOREIGN KEY (usuario_id) REFERENCES users (id)")
+        conn.exec_driver_sql(f"CREATE TABLE {DEFAULT} PARTITION OF {TABLA} DEFAULT")
+
+        primera = conn.exec_driver_sql(f"SELECT min(fecha_cambio) FROM {antigua}").scalar()
+        mes = _mes(primera) if primera else _mes(datetime.now(timezone.utc))
+        ultimo = _sumar_meses(_mes(datetime.now(timezone.utc)), meses)
+        while mes <= ultimo:
+            crear_particion(conn, mes)
+            mes = _sumar_meses(mes, 1)
+        for indice in HistorialCambio.__table__.indexes:
+            indice.create(conn)
+
+        copiadas = conn.exec_driver_sql(f"INSERT INTO {TABLA} SELECT * FROM {antigua}").rowcount
+        # La secuencia del id pasa a la tabla nueva antes de borrar la antigua (si no, se borraría con ella)
+        secuencia = conn.execute(text("SELECT pg_get_serial_sequence(:tabla, 'id')"), {"tabla": antigua}).scalar()
+        if secuencia:
+            conn.exec_driver_sql(f"ALTER SEQUENCE {secuencia} OWNED BY {TABLA}.id")
+        conn.exec_driver_sql(f"DROP TABLE {antigua}")
+    print(f"DEBUG BACKEND: [HISTORIAL] Conversión terminada: {copiadas} filas copiadas.")
+
+
+def _archivar(engine, nombre: str, directorio: str) -> str:
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, f"{nombre}.csv.gz")
+    conexion = engine.raw_connection()
+    try:
+        with gzip.open(ruta, "wb") as destino, conexion.cursor() as cursor:
+            cursor.copy_expert(f"COPY {nombre} TO STDOUT WITH (FORMAT csv, HEADER)", destino)
+    finally:
+        conexion.close()
+    return ruta
+
+
+def retencion(engine=default_engine, meses: int = 24, archivar: str = None, dry_run: bool = False) -> int:
+    """
+    Elimina el historial anterior a `meses` meses. Con particiones se desconectan y borran las
+    particiones completamente vencidas (opcionalmente archivándolas); sin ellas, DELETE por lotes.
+    Devuelve el número de particiones (o filas) eliminadas.
+    """
+    corte = _sumar_meses(_mes(datetime.now(timezone.utc)), -meses)
+    print(f"DEBUG BACKEND: [HISTORIAL] Retención: se elimina el historial anterior a {corte.isoformat()}{' (dry-run)' if dry_run else ''}.")
+    if not dry_run:
+        # Estado a la fecha de corte de cada registro con cambios vencidos: la reconstrucción parte de ahí
+        with SessionLocal(bind=engine) as db:
+            tomar_snapshots(db, minimo_cambios=1, fecha=datetime(corte.year, corte.month, corte.day))
+
+    if _es_postgres(engine):
+        with engine.connect() as conn:
+            particionada = esta_particionada(conn)
+            vencidas = [nombre for nombre, mes in particiones(conn) if _sumar_meses(mes, 1) <= corte] if particionada else []
+        if particionada:
+            for nombre in vencidas:
+                if dry_run:
+                    print(f"DEBUG BACKEND: [HISTORIAL] Se eliminaría la partición {nombre}.")
+                    continue
+                # DETACH es un cambio de catálogo: no reescribe ni bloquea la tabla durante una copia
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"ALTER TABLE {TABLA} DETACH PARTITION {nombre}")
+                if archivar:
+                    print(f"DEBUG BACKEND: [HISTORIAL] Partición {nombre} archivada en {_archivar(engine, nombre, archivar)}.")
+                with engine.begin() as conn:
+                    conn.exec_driver_sql(f"DROP TABLE {nombre}")
+                print(f"DEBUG BACKEND: [HISTORIAL] Partición {nombre} eliminada.")
+            # Filas vencidas que quedaron en la DEFAULT (meses sin partición): DELETE por lotes
+            if not dry_run:
+                _borrar_por_lotes(engine, DEFAULT, datetime(corte.year, corte.month, corte.day))
+            avisar_default(engine)
+            return len(vencidas)
+
+    if archivar:
+        print("ERROR DB: [HISTORIAL] --archivar requiere la tabla particionada en Postgres; se omite.")
+    limite = datetime(corte.year, corte.month, corte.day)
+    with engine.connect() as conn:
+        pendientes = conn.execute(
+            text(f"SELECT count(*) FROM {TABLA} WHERE fecha_cambio < :corte"), {"corte": limite}
+        ).scalar()
+    if dry_run or not pendientes:
+        print(f"DEBUG BACKEND: [HISTORIAL] {pendientes} filas vencidas{' se eliminarían' if dry_run else ''}.")
+        return pendientes
+    return _borrar_por_lotes(engine, TABLA, limite)
+
+
+def _borrar_por_lotes(engine, tabla: str, limite: datetime) -> int:
+    eliminadas = 0
+    while True:
+        # Lotes cortos: cada transacción bloquea pocas filas
+        with engine.begin() as conn:
+            borradas = conn.execute(text(
+                f"DELETE FROM {tabla} WHERE id IN (SELECT id FROM {tabla} WHERE fecha_cambio < :corte LIMIT :lote)"
+            ), {"corte": limite, "lote": LOTE_RETENCION}).rowcount
+        eliminadas += borradas
+        if borradas < LOTE_RETENCION:
+            break
+    print(f"DEBUG BACKEND: [HISTORIAL] {eliminadas} filas de {tabla} eliminadas.")
+    return eliminadas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Particionado mensual y retención de historial_cambios.")
+    subparsers = parser.add_subparsers(dest="comando", required=True)
+    p_convertir = subparsers.add_parser("convertir", help="Convierte la tabla en particionada por mes (Postgres, una vez).")
+    p_convertir.add_argument("--meses", type=int, default=3, help="Meses futuros para los que crear partición.")
+    p_crear = subparsers.add_parser("crear", help="Crea las particiones del mes actual y los siguientes.")
+    p_crear.add_argument("--meses", type=int, default=3)
+    subparsers.add_parser("listar", help="Lista las particiones mensuales.")
+    p_retencion = subparsers.add_parser("retencion", help="Elimina (o archiva y elimina) el historial vencido.")
+    p_retencion.add_argument("--meses", type=int, default=int(os.getenv("HISTORIAL_RETENTION_MONTHS", "24")),
+                             help="Meses de historial a conservar.")
+    p_retencion.add_argument("--archivar", help="Directorio donde exportar cada partición vencida (.csv.gz) antes de borrarla.")
+    p_retencion.add_argument("--dry-run", action="store_true", help="Solo mostrar qué se eliminaría.")
+    p_snapshots = subparsers.add_parser("snapshots", help="Guarda snapshots de los registros con muchos cambios desde el último.")
+    p_snapshots.add_argument("--minimo", type=int, default=int(os.getenv("HISTORIAL_SNAPSHOT_MIN_CHANGES", "50")),
+                             help="Cambios desde el último snapshot a partir de los cuales se toma uno nuevo.")
+    args = parser.parse_args(argv)
+
+    if args.comando == "convertir":
+        convertir(meses=args.meses)
+    elif args.comando == "crear":
+        if not _es_postgres(default_engine):
+            print("ERROR DB: [HISTORIAL] El particionado solo está disponible en Postgres.")
+            return 1
+        print(f"DEBUG BACKEND: [HISTORIAL] {crear_particiones(meses=args.meses)} particiones creadas.")
+    elif args.comando == "listar":
+        if not _es_postgres(default_engine):
+            print("ERROR DB: [HISTORIAL] El particionado solo está disponible en Postgres.")
+            return 1
+        with default_engine.connect() as conn:
+            for nombre, mes in particiones(conn):
+                print(f"{nombre}\t{mes.isoformat()}")
+        avisar_default()
+    elif args.comando == "snapshots":
+        with SessionLocal() as db:
+            tomar_snapshots(db, minimo_cambios=args.minimo)
+    else:
+        retencion(meses=args.meses, archivar=args.archivar, dry_run=args.dry_run)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,12 +7,22 @@ from datetime import timedelta, datetime, timezone
 import os
 
 # Importaciones de modelos y utilidades
-from app.db.database import get_db, engine, Base  # Importado 'engine' y 'Base' para la inicialización
+from app.db.database import get_db, engine  # Importado 'engine' para la migración opcional y la instrumentación
+from app.migrate import migrate
 from app.models.user import User, UserCreate, UserRead, UserLogin, Token, LicenseStatusResponse
 # Importar TODOS los routers que hemos creado. Es CRÍTICO que todos estén aquí.
 # ¡Basado en tu main.py que funcionaba!
-from app.routers import user, cliente, poliza, reclamacion, empresa_aseguradora, asesor, comision, historial_cambio, configuracion, dashboard
+from app.routers import user, cliente, poliza, reclamacion, empresa_aseguradora, asesor, comision, historial_cambio, configuracion, dashboard, metrics, profiler, health, batch, changes, events
 from app.utils.auth import authenticate_user, create_access_token, get_current_active_user, ACCESS_TOKEN_EXPIRE_MINUTES
+from app.utils.metrics import MetricsMiddleware, register_db_pool_metrics
+from app.utils.tracing import TracingMiddleware, instrument_engine
+from app.utils.responses import FastJSONResponse
+from app.utils.profiler import ProfilerMiddleware
+from app.utils.loop_monitor import LoopLagMiddleware, LOOP_LAG_ENABLED, monitor as loop_lag_monitor
+from app.utils.warmup import start_warm_up
+from app.utils.compression import CompressionMiddleware
+from app.utils.idempotency import IdempotencyMiddleware
+from app.utils import pubsub
 
 # Importar CORSMiddleware
 from starlette.middleware.cors import CORSMiddleware
@@ -21,50 +31,68 @@ app = FastAPI(
     title="API de Gestión de Seguros",
     description="API para la gestión de clientes, pólizas, reclamaciones, empresas aseguradoras, asesores y comisiones.",
     version="1.0.0",
+    default_response_class=FastJSONResponse,
 )
 
-# Función para inicializar la base de datos y crear las tablas
-def init_db():
-    """
-    Inicializa la base de datos, creando todas las tablas.
-    """
-    try:
-        print("DEBUG BACKEND: [STARTUP] Inicializando base de datos...")
-        # Usa 'engine.begin()' para manejar la transacción de forma segura
-        # Esto soluciona el error 'Connection' object has no attribute 'commit'
-        with engine.begin() as connection:
-            Base.metadata.create_all(bind=connection)
-            print("DEBUG BACKEND: [STARTUP] Tablas creadas correctamente.")
-    except Exception as e:
-        print(f"ERROR DB: [INIT_DB] Error al crear las tablas: {e}")
+# Creación/actualización del esquema: se hace con `python -m app.migrate` antes de arrancar.
+# AUTO_MIGRATE=1 la ejecuta también en el arranque (desarrollo o harness local).
+AUTO_MIGRATE = os.getenv("AUTO_MIGRATE", "0") == "1"
+# DEBUG=1 imprime las rutas registradas al arrancar
+DEBUG = os.getenv("DEBUG", "0") == "1"
 
 @app.on_event("startup")
 async def startup_event():
     """
     Evento que se ejecuta al iniciar la aplicación FastAPI.
-    Se encarga de inicializar la base de datos, creando todas las tablas
-    definidas en los modelos si no existen.
+    No toca el esquema salvo con AUTO_MIGRATE=1, para que el arranque sea rápido y sin efectos secundarios.
     """
-    # Llama a la nueva función de inicialización de la base de datos
-    init_db() 
-    print("DEBUG BACKEND: [STARTUP] Base de datos inicializada.")
-
-    # --- INICIO DE CÓDIGO DE DEPURACIÓN DE RUTAS ---
-    print("DEBUG BACKEND: [FASTAPI ROUTES] Rutas registradas:")
-    for route in app.routes:
-        # Manejar rutas directas de la aplicación
-        if hasattr(route, 'path') and hasattr(route, 'methods'):
-            print(f"  Path: {route.path}, Methods: {list(route.methods)}")
-        # Manejar rutas dentro de routers incluidos
-        elif hasattr(route, 'routes'):
-            for sub_route in route.routes:
-                if hasattr(sub_route, 'path') and hasattr(sub_route, 'methods'):
-                    # Construir el path completo incluyendo el prefijo del router
-                    full_path = f"{route.prefix}{sub_route.path}" if hasattr(route, 'prefix') else sub_route.path
-                    print(f"  Path: {full_path}, Methods: {list(sub_route.methods)}")
-    print("DEBUG BACKEND: [FASTAPI ROUTES] Fin de listado de rutas.")
-    # --- FIN DE CÓDIGO DE DEPURACIÓN DE RUTAS ---
+    if AUTO_MIGRATE:
+        try:
+            migrate(engine)
+        except Exception as e:
+            print(f"ERROR DB: [AUTO_MIGRATE] Error al migrar el esquema: {e}")
+
+    if DEBUG:
+        # --- INICIO DE CÓDIGO DE DEPURACIÓN DE RUTAS ---
+        print("DEBUG BACKEND: [FASTAPI ROUTES] Rutas registradas:")
+        for route in app.routes:
+            # Manejar rutas directas de la aplicación
+            if hasattr(route, 'path') and hasattr(route, 'methods'):
+                print(f"  Path: {route.path}, Methods: {list(route.methods)}")
+            # Manejar rutas dentro de routers incluidos
+            elif hasattr(route, 'routes'):
+                for sub_route in route.routes:
+                    if hasattr(sub_route, 'path') and hasattr(sub_route, 'methods'):
+                        # Construir el path completo incluyendo el prefijo del router
+                        full_path = f"{route.prefix}{sub_route.path}" if hasattr(route, 'prefix') else sub_route.path
+                        print(f"  Path: {full_path}, Methods: {list(sub_route.methods)}")
+        print("DEBUG BACKEND: [FASTAPI ROUTES] Fin de listado de rutas.")
+        # --- FIN DE CÓDIGO DE DEPURACIÓN DE RUTAS ---
+
+    # Monitor de lag del event loop (detecta handlers que bloquean el loop)
+    if LOOP_LAG_ENABLED:
+        loop_lag_monitor.start()
 
+    # Escucha LISTEN/NOTIFY de Postgres para el canal de eventos (uno por worker)
+    pubsub.start()
+
+    # Calentamiento en segundo plano: /readyz responde 503 hasta que termine
+    start_warm_up()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """
+    Evento que se ejecuta al detener la aplicación FastAPI.
+    Detiene las tareas en segundo plano iniciadas en el arranque.
+    """
+    if LOOP_LAG_ENABLED:
+        await loop_lag_monitor.stop()
+    pubsub.stop()
+
+
+# Idempotency-Key en los POST de alta: el más interno, para que los replays lleven también
+# los encabezados de CORS y se guarde el cuerpo sin comprimir
+app.add_middleware(IdempotencyMiddleware)
 
 # Configuración de CORS
 # Para desarrollo, permitimos todos los orígenes. En producción, esto debería ser más restrictivo.
@@ -74,8 +102,27 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permitir todos los métodos (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Permitir todos los headers
+    expose_headers=["X-Next-Cursor"],  # Cursor de paginación del historial, legible desde el navegador
 )
 
+# Compresión gzip/br/zstd de respuestas JSON grandes (listados con objetos anidados)
+app.add_middleware(CompressionMiddleware)
+
+# Asociar cada petición con su tarea asyncio para reportar qué ruta bloquea el event loop
+app.add_middleware(LoopLagMiddleware)
+
+# Perfilado bajo demanda (X-Profile: 1) para administradores; no afecta al resto de peticiones
+app.add_middleware(ProfilerMiddleware)
+
+# Trazas por petición (auth, SQL, serialización y JSON) con encabezado Server-Timing
+app.add_middleware(TracingMiddleware)
+instrument_engine(engine)
+
+# Métricas por ruta (conteo, códigos de estado y latencia). Se añade al final para
+# que sea el middleware más externo y mida también el tiempo de CORS.
+app.add_middleware(MetricsMiddleware)
+register_db_pool_metrics(engine)
+
 # Incluir routers
 # ¡ES CRÍTICO QUE TODOS LOS ROUTERS CREADOS ESTÉN INCLUIDOS AQUÍ!
 # Asegúrate de que el router de usuario incluya la ruta /license-status
@@ -91,6 +138,12 @@ app.include_router(comision.router, prefix="/api/v1/comisiones", tags=["Comision
 app.include_router(historial_cambio.router, prefix="/api/v1/historial_cambio", tags=["Historial de Cambios"])
 app.include_router(configuracion.router, prefix="/api/v1/configuracion", tags=["Configuración"])
 app.include_router(dashboard.router, prefix="/api/v1", tags=["Estadísticas del Dashboard"])
+app.include_router(metrics.router)
+app.include_router(profiler.router, prefix="/api/v1")
+app.include_router(health.router)
+app.include_router(batch.router, prefix="/api/v1")
+app.include_router(changes.router, prefix="/api/v1")
+app.include_router(events.router, prefix="/api/v1")
 
 @app.post("/api/v1/auth/token", response_model=Token, summary="Obtener token de autenticación")
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
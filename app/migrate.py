@@ -0,0 +1,104 @@
+# app/migrate.py
+"""
+Paso explícito de migración del esquema.
+
+Antes, cada arranque ejecutaba `create_all`. Ahora el esquema se crea/actualiza con:
+
+    python -m app.migrate            # aplica los cambios pendientes
+    python -m app.migrate --check    # solo los lista (código de salida 1 si hay pendientes)
+
+Solo se aplican cambios aditivos y seguros: tablas, columnas e índices que existen en los
+modelos pero no en la base de datos. Nada se elimina ni se modifica.
+Con AUTO_MIGRATE=1 la aplicación lo ejecuta también al arrancar (útil en desarrollo).
+"""
+import argparse
+import sys
+from typing import List, Tuple
+
+from sqlalchemy import Index, Table, inspect
+from sqlalchemy.schema import CreateIndex
+
+from app.db.database import Base, engine as default_engine
+import app.models # noqa: F401  (registra todos los modelos en Base.metadata)
+
+
+def _columna_ddl(conn, columna) -> Tuple[str, bool]:
+    """DDL de ADD COLUMN. Devuelve (ddl, nullable_forzado)."""
+    dialecto = conn.dialect
+    ddl = f"{dialecto.identifier_preparer.format_column(columna)} {columna.type.compile(dialect=dialecto)}"
+    default = columna.server_default
+    if default is not None:
+        valor = default.arg
+        ddl += " DEFAULT " + ("'" + valor.replace("'", "''") + "'" if isinstance(valor, str) else str(valor.compile(dialect=dialecto)))
+    # Una columna NOT NULL sin default no se puede añadir a una tabla con filas: se crea como nullable
+    forzado = not columna.nullable and default is None
+    if not columna.nullable and not forzado:
+        ddl += " NOT NULL"
+    return ddl, forzado
+
+
+def pending_changes(engine=default_engine) -> List[Tuple[str, object]]:
+    """Lista (descripción, elemento) de los cambios aditivos pendientes."""
+    inspector = inspect(engine)
+    tablas_existentes = set(inspector.get_table_names())
+    cambios = []
+    for tabla in Base.metadata.sorted_tables:
+        if tabla.name not in tablas_existentes:
+            cambios.append((f"crear tabla {tabla.name}", tabla))
+            continue
+        columnas = {c["name"] for c in inspector.get_columns(tabla.name)}
+        for columna in tabla.columns:
+            if columna.name not in columnas:
+                cambios.append((f"añadir columna {tabla.name}.{columna.name}", columna))
+        indices = {i["name"] for i in inspector.get_indexes(tabla.name)}
+        indices |= {u["name"] for u in inspector.get_unique_constraints(tabla.name)}
+        for indice in tabla.indexes:
+            if indice.name not in indices:
+                cambios.append((f"crear índice {indice.name}", indice))
+    return cambios
+
+
+def schema_is_current(engine=default_engine) -> bool:
+    return not pending_changes(engine)
+
+
+def migrate(engine=default_engine) -> List[str]:
+    """Aplica los cambios aditivos pendientes en una transacción y devuelve sus descripciones."""
+    aplicados = []
+    with engine.begin() as conn:
+        for descripcion, elemento in pending_changes(engine):
+            if isinstance(elemento, Table):
+                # Tabla nueva: create_all crea también sus índices y tipos ENUM
+                Base.metadata.create_all(bind=conn, tables=[elemento])
+            elif isinstance(elemento, Index):
+                conn.execute(CreateIndex(elemento))
+            else:
+                if hasattr(elemento.type, "create"):
+                    # Tipos con DDL propio (ENUM de Postgres)
+                    elemento.type.create(conn, checkfirst=True)
+                ddl, forzado = _columna_ddl(conn, elemento)
+                conn.exec_driver_sql(f"ALTER TABLE {elemento.table.name} ADD COLUMN {ddl}")
+                if forzado:
+                    descripcion += " (creada como nullable: NOT NULL sin default)"
+            print(f"DEBUG BACKEND: [MIGRATE] {descripcion}")
+            aplicados.append(descripcion)
+    if not aplicados:
+        print("DEBUG BACKEND: [MIGRATE] El esquema está al día.")
+    return aplicados
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Crea o actualiza el esquema de la base de datos (solo cambios aditivos).")
+    parser.add_argument("--check", action="store_true", help="Solo listar los cambios pendientes.")
+    args = parser.parse_args(argv)
+    if args.check:
+        cambios = pending_changes()
+        for descripcion, _ in cambios:
+            print(f"pendiente: {descripcion}")
+        return 1 if cambios else 0
+    migrate()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,8 +1,8 @@
 # app/models/asesor.py
 from sqlalchemy import Column, Integer, String, ForeignKey, DateTime
 from sqlalchemy.orm import relationship
-from app.db.database import Base
-from datetime import datetime, timezone
+from app.db.database import Base, utc_now
+from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -18,8 +18,10 @@ class Asesor(Base):
     cedula = Column(String, unique=True, index=True, nullable=False)
     telefono = Column(String, nullable=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    fecha_contratacion = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_contratacion = Column(DateTime, default=utc_now)
     empresa_aseguradora_id = Column(Integer, ForeignKey("empresas_aseguradoras.id"), nullable=True) # Puede ser nulo si es independiente
+    # Versión de la fila: cambia en cada UPDATE hecho por el ORM (ETag / Last-Modified)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     empresa_aseguradora = relationship("EmpresaAseguradora", back_populates="asesores")
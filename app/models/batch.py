@@ -0,0 +1,25 @@
+# app/models/batch.py
+import os
+from typing import Any, Dict, List, Optional
+from pydantic import BaseModel, Field
+
+# Máximo de sub-peticiones por lote
+BATCH_MAX_REQUESTS = int(os.getenv("BATCH_MAX_REQUESTS", "20"))
+
+# Pydantic Schemas (no hay tabla: el lote no se persiste)
+class BatchSubRequest(BaseModel):
+    id: Optional[str] = Field(None, max_length=50, description="Identificador libre para encontrar la respuesta en el resultado (por defecto, la posición).")
+    method: str = Field("GET", description="Método HTTP. Solo se admite GET.")
+    path: str = Field(..., min_length=1, max_length=500, description="Ruta de la API, p. ej. /api/v1/clientes/.")
+    query: Dict[str, Any] = Field(default_factory=dict, description="Parámetros de consulta (los valores lista se repiten).")
+
+class BatchRequest(BaseModel):
+    requests: List[BatchSubRequest] = Field(..., min_length=1, max_length=BATCH_MAX_REQUESTS, description="Sub-peticiones a ejecutar.")
+
+class BatchSubResponse(BaseModel):
+    id: str = Field(..., description="Identificador de la sub-petición.")
+    status: int = Field(..., description="Código HTTP de la sub-respuesta.")
+    body: Any = Field(None, description="Cuerpo JSON de la sub-respuesta.")
+
+class BatchResponse(BaseModel):
+    responses: List[BatchSubResponse]
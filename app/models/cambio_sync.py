@@ -0,0 +1,91 @@
+# app/models/cambio_sync.py
+import os
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, event, text
+from sqlalchemy.orm import Session
+from typing import Dict, List
+from pydantic import BaseModel, Field
+
+from app.db.database import Base, utc_now
+
+# Tablas cuyas altas, modificaciones y bajas se publican en /api/v1/changes
+TABLAS_SINCRONIZADAS = ("clientes", "polizas", "empresas_aseguradoras", "asesores", "reclamaciones", "comisiones")
+CHANGE_FEED_ENABLED = os.getenv("CHANGE_FEED_ENABLED", "1") == "1"
+
+class CambioSync(Base):
+    """Registro de cambios para sincronización incremental. El id (secuencia) es el cursor del feed."""
+    __tablename__ = "cambios_sync"
+
+    # BIGINT en Postgres; en SQLite el autoincremento requiere INTEGER PRIMARY KEY
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True)
+    tabla = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    operacion = Column(String(6), nullable=False) # "upsert" o "delete"
+    fecha = Column(DateTime, default=utc_now, nullable=False)
+
+def filas_escritas(session, tablas):
+    """(tabla, id, operacion) de cada fila de `tablas` que escribió el flush: operacion es insert, update o delete.
+
+    Debe llamarse desde after_flush: ahí new/dirty/deleted aún reflejan lo que el flush acaba de escribir.
+    """
+    for operacion, objetos, verificar in (("insert", session.new, False), ("update", session.dirty, True), ("delete", session.deleted, False)):
+        for objeto in objetos:
+            tabla = getattr(type(objeto), "__tablename__", None)
+            if tabla not in tablas:
+                continue
+            # session.dirty incluye objetos tocados sin cambios reales en columnas
+            if verificar and not session.is_modified(objeto, include_collections=False):
+                continue
+            yield tabla, objeto.id, operacion
+
+# Filas de cambios_sync anotadas en los flush de la transacción, pendientes de escribir al confirmar
+_PENDIENTES_KEY = "cambios_sync_pendientes"
+# Advisory lock (Postgres) que ordena las confirmaciones con cambios sincronizados
+_LOCK_ORDEN_COMMIT = 730142
+
+@event.listens_for(Session, "after_flush")
+def _anotar_cambios(session, flush_context):
+    """Anota cada fila sincronizada que el flush escribió; se registran en cambios_sync al confirmar."""
+    if not CHANGE_FEED_ENABLED:
+        return
+    ahora = utc_now()
+    session.info.setdefault(_PENDIENTES_KEY, []).extend(
+        {"tabla": tabla, "registro_id": registro_id, "operacion": "delete" if operacion == "delete" else "upsert", "fecha": ahora}
+        for tabla, registro_id, operacion in filas_escritas(session, TABLAS_SINCRONIZADAS)
+    )
+
+@event.listens_for(Session, "before_commit")
+def _registrar_cambios(session):
+    """
+    Escribe en cambios_sync, justo antes del COMMIT, los cambios anotados en la transacción.
+
+    El id de cambios_sync es el cursor del feed, así que debe seguir el orden de confirmación:
+    en Postgres el INSERT se hace con un advisory lock de transacción, que se libera después de
+    que el COMMIT sea visible. Una transacción que obtiene ids menores ya es visible cuando otra
+    obtiene los siguientes, y el feed no puede dejar atrás cambios aún sin confirmar. En SQLite
+    las escrituras ya se serializan hasta el COMMIT.
+    Solo se serializa el tramo final (INSERT + COMMIT) de las transacciones con cambios sincronizados.
+    """
+    if not CHANGE_FEED_ENABLED:
+        return
+    session.flush() # El flush final del commit también debe quedar anotado
+    filas = session.info.pop(_PENDIENTES_KEY, None)
+    if not filas:
+        return
+    conexion = session.connection()
+    if conexion.dialect.name == "postgresql":
+        conexion.execute(text("SELECT pg_advisory_xact_lock(:clave)"), {"clave": _LOCK_ORDEN_COMMIT})
+    conexion.execute(CambioSync.__table__.insert(), filas)
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_cambios(session):
+    session.info.pop(_PENDIENTES_KEY, None)
+
+# Pydantic Schemas
+class ChangeSet(BaseModel):
+    upserted: List[int] = Field(default_factory=list, description="IDs creados o modificados (volver a pedirlos).")
+    deleted: List[int] = Field(default_factory=list, description="IDs eliminados (quitarlos de la caché local).")
+
+class ChangesRead(BaseModel):
+    cursor: int = Field(..., description="Cursor a enviar como ?since= en la siguiente llamada.")
+    has_more: bool = Field(..., description="Hay más cambios disponibles: volver a llamar de inmediato con el nuevo cursor.")
+    changes: Dict[str, ChangeSet] = Field(default_factory=dict, description="Cambios por tabla.")
@@ -1,8 +1,8 @@
 # app/models/cliente.py
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
-from app.db.database import Base
-from datetime import datetime, date, timezone
+from app.db.database import Base, utc_now
+from datetime import datetime, date
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -17,7 +17,9 @@ class Cliente(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     direccion = Column(String, nullable=True)
     fecha_nacimiento = Column(DateTime, nullable=True)
-    fecha_registro = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_registro = Column(DateTime, default=utc_now)
+    # Versión de la fila: cambia en cada UPDATE hecho por el ORM (ETag / Last-Modified)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     polizas = relationship("Poliza", back_populates="cliente")
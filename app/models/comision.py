@@ -1,8 +1,8 @@
 # app/models/comision.py
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum
 from sqlalchemy.orm import relationship
-from app.db.database import Base
-from datetime import datetime, timezone
+from app.db.database import Base, utc_now
+from datetime import datetime
 import enum
 from typing import Optional, List # Asegurarse de que List esté importado si aún se usa, pero usaremos 'list'
 
@@ -32,11 +32,13 @@ class Comision(Base):
     asesor_id = Column(Integer, ForeignKey("asesores.id"), nullable=False)
     monto = Column(Float, nullable=False)
     porcentaje_comision = Column(Float, nullable=False)
-    fecha_calculo = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_calculo = Column(DateTime, default=utc_now)
     estatus_pago = Column(Enum(EstatusPago), default=EstatusPago.PENDIENTE, nullable=False)
     fecha_pago = Column(DateTime, nullable=True)
     tipo_comision = Column(Enum(TipoComision), nullable=False)
     observaciones = Column(String, nullable=True)
+    # Última modificación (la mantiene el ORM en cada UPDATE)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     poliza = relationship("Poliza", back_populates="comisiones")
@@ -1,8 +1,8 @@
 # app/models/configuracion.py
 from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean
 from sqlalchemy.orm import relationship
-from app.db.database import Base # Importar Base
-from datetime import datetime, timezone
+from app.db.database import Base, utc_now # Importar Base
+from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -15,7 +15,7 @@ class Configuracion(Base):
     moneda_preferida = Column(String, nullable=True)
     idioma_preferido = Column(String, nullable=True)
     configuracion_completa = Column(Boolean, default=False, nullable=False) # Indica si la configuración inicial está completa
-    fecha_ultima_actualizacion = Column(DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc))
+    fecha_ultima_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relación con el usuario
     usuario = relationship("User", back_populates="configuracion")
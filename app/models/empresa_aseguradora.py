@@ -1,8 +1,8 @@
 # app/models/empresa_aseguradora.py
 from sqlalchemy import Column, Integer, String, DateTime
 from sqlalchemy.orm import relationship
-from app.db.database import Base
-from datetime import datetime, timezone
+from app.db.database import Base, utc_now
+from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
@@ -15,7 +15,9 @@ class EmpresaAseguradora(Base):
     direccion = Column(String, nullable=True)
     telefono = Column(String, nullable=True)
     email = Column(String, unique=True, index=True, nullable=False)
-    fecha_registro = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_registro = Column(DateTime, default=utc_now)
+    # Versión de la fila: cambia en cada UPDATE hecho por el ORM (ETag / Last-Modified)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     polizas = relationship("Poliza", back_populates="empresa_aseguradora")
@@ -55,3 +57,8 @@ class PaginatedEmpresasAseguradorasRead(BaseModel):
     size: int
 
     model_config = ConfigDict(from_attributes=True)
+
+# Opción de los typeahead servidos desde la caché de referencia (empresas y asesores)
+class OpcionReferencia(BaseModel):
+    id: int
+    nombre: str
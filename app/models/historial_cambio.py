@@ -1,9 +1,9 @@
 # app/models/historial_cambio.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Index, Text
 from sqlalchemy.orm import relationship
-from app.db.database import Base # Importar Base
-from datetime import datetime, timezone
-from typing import Optional
+from app.db.database import Base, utc_now # Importar Base
+from datetime import datetime
+from typing import Dict, Optional
 from pydantic import BaseModel, Field, ConfigDict
 
 class HistorialCambio(Base):
@@ -15,12 +15,42 @@ class HistorialCambio(Base):
     campo_modificado = Column(String, nullable=False)
     valor_anterior = Column(String, nullable=True)
     valor_nuevo = Column(String, nullable=True)
-    fecha_cambio = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_cambio = Column(DateTime, default=utc_now)
     usuario_id = Column(Integer, ForeignKey("users.id"), nullable=False) # Clave foránea al usuario que hizo el cambio
 
     # Relaciones
     usuario = relationship("User", back_populates="historial_cambios") # <-- ¡CAMBIO AQUÍ!
 
+    # Un índice por patrón de filtro, todos terminados en (fecha_cambio, id): el orden de la
+    # paginación por cursor, para que cada página sea un recorrido de rango sin ordenar
+    __table_args__ = (
+        Index("ix_historial_cambios_fecha_id", "fecha_cambio", "id"),
+        Index("ix_historial_cambios_tabla_registro_fecha", "tabla_afectada", "registro_id", "fecha_cambio", "id"),
+        Index("ix_historial_cambios_registro_fecha", "registro_id", "fecha_cambio", "id"),
+        Index("ix_historial_cambios_usuario_fecha", "usuario_id", "fecha_cambio", "id"),
+    )
+
+class HistorialSnapshot(Base):
+    """
+    Estado completo de un registro auditado en una fecha (ver app/utils/auditoria.py).
+
+    Se guarda uno al crear el registro ("alta"), otro al eliminarlo ("baja") y, periódicamente,
+    uno de los registros con muchos cambios acumulados ("periodico"): reconstruir el estado en
+    una fecha parte del último snapshot anterior y solo aplica los cambios posteriores a él.
+    """
+    __tablename__ = "historial_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    tabla = Column(String(50), nullable=False)
+    registro_id = Column(Integer, nullable=False)
+    tipo = Column(String(10), nullable=False) # "alta", "periodico" o "baja"
+    fecha = Column(DateTime, nullable=False)
+    datos = Column(Text, nullable=False) # JSON {campo: valor}, con los valores como en historial_cambios
+
+    __table_args__ = (
+        Index("ix_historial_snapshots_tabla_registro_fecha", "tabla", "registro_id", "fecha"),
+    )
+
 # Pydantic Schemas
 class HistorialCambioBase(BaseModel):
     tabla_afectada: str = Field(..., description="Nombre de la tabla que fue modificada.")
@@ -41,3 +71,11 @@ class HistorialCambioRead(HistorialCambioBase):
 
     # Para incluir datos relacionados al leer
     # usuario: Optional["UserRead"] = None # Descomentar si UserRead está importado y definido
+
+class HistorialAsOfRead(BaseModel):
+    tabla: str = Field(..., description="Tabla del registro.")
+    registro_id: int = Field(..., description="ID del registro.")
+    as_of: datetime = Field(..., description="Fecha para la que se reconstruyó el estado.")
+    estado: Dict[str, Optional[str]] = Field(..., description="Valor de cada campo en esa fecha (en texto, como en el historial).")
+    snapshot_fecha: Optional[datetime] = Field(None, description="Fecha del snapshot de partida (vacía si se reconstruyó hacia atrás desde un estado posterior).")
+    cambios_aplicados: int = Field(..., description="Cambios del historial aplicados sobre el punto de partida.")
@@ -0,0 +1,30 @@
+# app/models/idempotencia.py
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary, Text, Index
+
+from app.db.database import Base, utc_now
+
+class ClaveIdempotencia(Base):
+    """
+    Respuesta guardada de un POST enviado con Idempotency-Key (ver app/utils/idempotency.py).
+
+    Mientras la primera ejecución está en curso la fila queda en estado "en_proceso" con una
+    expiración corta; al terminar pasa a "completada" con la respuesta y expira tras el TTL.
+    """
+    __tablename__ = "claves_idempotencia"
+
+    id = Column(Integer, primary_key=True)
+    usuario = Column(String(50), nullable=False)
+    clave = Column(String(255), nullable=False)
+    huella = Column(String(64), nullable=False) # SHA-256 de método, ruta y cuerpo de la petición
+    estado = Column(String(12), nullable=False) # "en_proceso" o "completada"
+    status_code = Column(Integer, nullable=True)
+    encabezados = Column(Text, nullable=True) # JSON [[nombre, valor], ...]
+    cuerpo = Column(LargeBinary, nullable=True)
+    fecha_creacion = Column(DateTime, default=utc_now, nullable=False)
+    expira = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        # Una clave por usuario: la restricción única es la que serializa los reintentos concurrentes
+        Index("ux_claves_idempotencia_usuario_clave", "usuario", "clave", unique=True),
+        Index("ix_claves_idempotencia_expira", "expira"),
+    )
@@ -1,12 +1,12 @@
 # app/models/poliza.py
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Boolean
 from sqlalchemy.orm import relationship
-from datetime import datetime, date, timezone # Importar date y datetime
+from datetime import datetime, date # Importar date y datetime
 import enum
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict
 
-from app.db.database import Base # Importando la Base declarativa
+from app.db.database import Base, utc_now # Importando la Base declarativa
 
 # Importar esquemas de modelos relacionados para anidarlos en PolizaRead
 from app.models.cliente import ClienteRead
@@ -46,7 +46,9 @@ class Poliza(Base):
     empresa_aseguradora_id = Column(Integer, ForeignKey("empresas_aseguradoras.id"), nullable=False)
     asesor_id = Column(Integer, ForeignKey("asesores.id"), nullable=True) # ¡CRÍTICO! Cambiado a nullable=True
     
-    fecha_creacion = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_creacion = Column(DateTime, default=utc_now)
+    # Versión de la fila: cambia en cada UPDATE hecho por el ORM (ETag / Last-Modified)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     cliente = relationship("Cliente", back_populates="polizas")
@@ -1,8 +1,8 @@
 # app/models/reclamacion.py
 from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Enum, Text
 from sqlalchemy.orm import relationship
-from app.db.database import Base # Importar Base
-from datetime import datetime, timezone
+from app.db.database import Base, utc_now # Importar Base
+from datetime import datetime
 import enum
 from typing import Optional, List
 from pydantic import BaseModel, Field, ConfigDict
@@ -24,13 +24,15 @@ class Reclamacion(Base):
     id = Column(Integer, primary_key=True, index=True)
     poliza_id = Column(Integer, ForeignKey("polizas.id"), nullable=False)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
-    fecha_reclamacion = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    fecha_reclamacion = Column(DateTime, default=utc_now)
     descripcion = Column(Text, nullable=False)
     estado = Column(Enum(EstadoReclamacion), default=EstadoReclamacion.PENDIENTE, nullable=False)
     monto_reclamado = Column(Float, nullable=True) # Opcional, si se aplica un monto
     monto_aprobado = Column(Float, nullable=True) # Opcional, si se aplica un monto
     fecha_resolucion = Column(DateTime, nullable=True)
     observaciones = Column(Text, nullable=True)
+    # Última modificación (la mantiene el ORM en cada UPDATE)
+    fecha_actualizacion = Column(DateTime, default=utc_now, onupdate=utc_now)
 
     # Relaciones
     poliza = relationship("Poliza", back_populates="reclamaciones")
@@ -13,6 +13,12 @@ from .reclamacion import router as reclamacion_router
 from .dashboard import router as dashboard_router # Si tienes un router de dashboard
 from .license import router as license_router # Si tienes un router de licencia
 from .configuracion import router as configuracion_router # <-- ¡NUEVA LÍNEA AÑADIDA!
+from .metrics import router as metrics_router
+from .profiler import router as profiler_router
+from .health import router as health_router
+from .batch import router as batch_router
+from .changes import router as changes_router
+from .events import router as events_router
 
 # Exporta los routers para que puedan ser incluidos en main.py
 # Esto permite que otros archivos hagan 'from app.routers import user_router'
@@ -28,4 +34,10 @@ __all__ = [
     "dashboard_router",
     "license_router",
     "configuracion_router", # <-- ¡AÑADIDO A LA LISTA!
+    "metrics_router",
+    "profiler_router",
+    "health_router",
+    "batch_router",
+    "changes_router",
+    "events_router",
 ]
@@ -3,12 +3,16 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, selectinload # Usar selectinload
 from typing import List, Optional
 from sqlalchemy import func, select # Importar select y func
+from sqlalchemy.exc import IntegrityError
 
 from app.db.database import get_db
 from app.models.asesor import Asesor, AsesorCreate, AsesorRead, AsesorUpdate, PaginatedAsesoresRead
-from app.models.empresa_aseguradora import EmpresaAseguradora # Importar EmpresaAseguradora para validación
+from app.models.empresa_aseguradora import EmpresaAseguradoraRead, OpcionReferencia
 from app.models.user import User # Importar User para el current_user
 from app.utils.auth import get_current_active_user # Importar dependencias de usuario
+from app.utils.responses import FastJSONResponse
+from app.utils.db_errors import integrity_http_error
+from app.utils.reference_cache import reference_cache, asesor_read, ASESORES
 
 router = APIRouter(prefix="/asesores", tags=["Asesores"]) # Añadir prefijo y tags
 
@@ -24,6 +28,19 @@ def _get_asesor_with_relations_and_map(db_asesor: Asesor) -> AsesorRead:
     
     return asesor_read_item
 
+# Mensajes de las restricciones de asesores (ver app/utils/db_errors.py)
+_UNICOS_ASESOR = {"cedula": "La cédula ya existe", "email": "El email ya existe"}
+_FORANEAS_ASESOR = {"empresa_aseguradora_id": "Empresa Aseguradora no encontrada"}
+
+def _empresa_de_referencia(db: Session, empresa_id: Optional[int]) -> Optional[EmpresaAseguradoraRead]:
+    """Empresa del asesor desde la caché de referencia; 404 si el id no existe (el asesor puede no tener empresa)."""
+    if empresa_id is None:
+        return None
+    empresa = reference_cache.empresa(db, empresa_id)
+    if empresa is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=_FORANEAS_ASESOR["empresa_aseguradora_id"])
+    return empresa
+
 # Ruta para crear un nuevo asesor
 @router.post("/", response_model=AsesorRead, status_code=status.HTTP_201_CREATED, summary="Crear nuevo asesor")
 async def create_asesor(
@@ -33,36 +50,23 @@ async def create_asesor(
 ):
     print(f"DEBUG BACKEND: [CREATE_ASESOR] Usuario '{current_user.username}' intentando crear asesor: {asesor.cedula}")
 
-    # Validar que la cédula y el email sean únicos
-    existing_asesor_cedula = db.execute(select(Asesor).filter(Asesor.cedula == asesor.cedula)).scalar_one_or_none()
-    if existing_asesor_cedula:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La cédula ya existe")
-    
-    existing_asesor_email = db.execute(select(Asesor).filter(Asesor.email == asesor.email)).scalar_one_or_none()
-    if existing_asesor_email:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El email ya existe")
-
-    # Validar que la empresa aseguradora exista si se proporciona
-    if asesor.empresa_aseguradora_id:
-        db_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.id == asesor.empresa_aseguradora_id)).scalar_one_or_none()
-        if not db_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
-
+    # La empresa se comprueba en la caché de referencia (y se anida en la respuesta desde ella);
+    # la unicidad de cédula y email la garantizan las restricciones de la base
+    username = current_user.username
+    empresa = _empresa_de_referencia(db, asesor.empresa_aseguradora_id)
     db_asesor = Asesor(**asesor.model_dump())
     db.add(db_asesor)
-    db.commit()
-    db.refresh(db_asesor)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "asesores", _UNICOS_ASESOR, _FORANEAS_ASESOR)
 
-    # Cargar la relación para la respuesta
-    asesor_with_relations = db.execute(
-        select(Asesor)
-        .options(selectinload(Asesor.empresa_aseguradora))
-        .filter(Asesor.id == db_asesor.id)
-    ).scalar_one()
-
-    asesor_response = _get_asesor_with_relations_and_map(asesor_with_relations)
+    asesor_response = asesor_read(db_asesor, empresa)
+    db.commit()
+    reference_cache.invalidar(ASESORES)
 
-    print(f"DEBUG BACKEND: [CREATE_ASESOR] Asesor '{db_asesor.nombre} {db_asesor.apellido}' creado exitosamente por '{current_user.username}'.")
+    print(f"DEBUG BACKEND: [CREATE_ASESOR] Asesor '{asesor_response.nombre} {asesor_response.apellido}' creado exitosamente por '{username}'.")
     return asesor_response
 
 # Ruta para obtener todos los asesores con paginación y filtro de búsqueda
@@ -104,12 +108,23 @@ async def read_asesores(
     for asesor in asesores_db:
         asesores_response_items.append(_get_asesor_with_relations_and_map(asesor))
             
-    return PaginatedAsesoresRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedAsesoresRead(
         items=asesores_response_items,
         total=total,
         page=offset // limit + 1,
         size=limit
-    )
+    ))
+
+# Typeahead de asesores (selectores del frontend), servido desde la caché de referencia
+@router.get("/typeahead", response_model=List[OpcionReferencia], summary="Buscar asesores por nombre (typeahead)")
+async def typeahead_asesores(
+    q: Optional[str] = Query(None, description="Texto contenido en el nombre completo (sin distinguir mayúsculas)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return FastJSONResponse(reference_cache.buscar(db, ASESORES, q, limit))
 
 # Ruta para obtener un asesor por ID
 @router.get("/{asesor_id}", response_model=AsesorRead, summary="Obtener asesor por ID")
@@ -143,41 +158,30 @@ async def update_asesor(
     if not db_asesor:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
 
-    # Validar que la cédula o el email no se dupliquen si se están actualizando
-    if asesor_update.cedula and asesor_update.cedula != db_asesor.cedula:
-        existing_asesor_cedula = db.execute(select(Asesor).filter(Asesor.cedula == asesor_update.cedula)).scalar_one_or_none()
-        if existing_asesor_cedula:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La nueva cédula ya existe para otro asesor")
-
-    if asesor_update.email and asesor_update.email != db_asesor.email:
-        existing_asesor_email = db.execute(select(Asesor).filter(Asesor.email == asesor_update.email)).scalar_one_or_none()
-        if existing_asesor_email:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El nuevo email ya existe para otro asesor")
-
-    # Validar que la empresa aseguradora exista si se proporciona
-    if asesor_update.empresa_aseguradora_id is not None:
-        db_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.id == asesor_update.empresa_aseguradora_id)).scalar_one_or_none()
-        if not db_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
+    # Empresa de destino desde la caché de referencia, antes de modificar el asesor
+    cambios = asesor_update.model_dump(exclude_unset=True)
+    empresa = _empresa_de_referencia(db, cambios.get("empresa_aseguradora_id", db_asesor.empresa_aseguradora_id))
 
     # Actualizar campos
-    for key, value in asesor_update.model_dump(exclude_unset=True).items():
+    for key, value in cambios.items():
         setattr(db_asesor, key, value)
 
-    db.add(db_asesor)
+    # Cédula/email repetidos los rechazan las restricciones de la base
+    username = current_user.username
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "asesores", {
+            "cedula": "La nueva cédula ya existe para otro asesor",
+            "email": "El nuevo email ya existe para otro asesor",
+        }, _FORANEAS_ASESOR)
+
+    updated_asesor_response = asesor_read(db_asesor, empresa)
     db.commit()
-    db.refresh(db_asesor)
-
-    # Cargar la relación para la respuesta
-    asesor_with_relations = db.execute(
-        select(Asesor)
-        .options(selectinload(Asesor.empresa_aseguradora))
-        .filter(Asesor.id == db_asesor.id)
-    ).scalar_one()
-
-    updated_asesor_response = _get_asesor_with_relations_and_map(asesor_with_relations)
+    reference_cache.invalidar(ASESORES)
 
-    print(f"DEBUG BACKEND: [UPDATE_ASESOR] Asesor ID: {asesor_id} actualizado exitosamente por '{current_user.username}'.")
+    print(f"DEBUG BACKEND: [UPDATE_ASESOR] Asesor ID: {asesor_id} actualizado exitosamente por '{username}'.")
     return updated_asesor_response
 
 # Ruta para eliminar un asesor
@@ -191,5 +195,6 @@ async def delete_asesor(asesor_id: int, db: Session = Depends(get_db), current_u
 
     db.delete(db_asesor)
     db.commit()
+    reference_cache.invalidar(ASESORES)
     print(f"DEBUG BACKEND: [DELETE_ASESOR] Asesor ID: {asesor_id} eliminado exitosamente por '{current_user.username}'.")
     return {"message": "Asesor eliminado exitosamente"}
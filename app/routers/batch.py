@@ -0,0 +1,175 @@
+# app/routers/batch.py
+"""
+/api/v1/batch: varias peticiones GET en una sola ida y vuelta.
+
+Al iniciar sesión el frontend dispara en paralelo estadísticas, pólizas próximas a vencer,
+clientes, empresas, asesores, pólizas, reclamaciones y comisiones: ocho peticiones HTTP,
+cada una con su propia verificación del token y búsqueda del usuario. El lote autentica
+una sola vez y despacha cada sub-petición en proceso contra el router de la aplicación
+(mismas rutas, validaciones y respuestas que si se llamaran por separado).
+
+- Cada sub-petición corre en un hilo con su propio event loop: los handlers hacen E/S de
+  base de datos bloqueante, así que en el mismo loop se ejecutarían en serie.
+- BATCH_CONCURRENCY limita cuántas corren a la vez, para no acaparar el pool de conexiones.
+- Los cuerpos JSON de las sub-respuestas se concatenan tal cual en la respuesta, sin
+  decodificarlos ni volver a codificarlos.
+"""
+import asyncio
+import json
+import os
+import urllib.parse
+from typing import Dict, List, Tuple
+
+import anyio
+from fastapi import APIRouter, Depends, Request, Response, status
+from sqlalchemy.orm import Session
+from starlette.exceptions import HTTPException
+
+from app.db.database import get_db, IS_SQLITE
+from app.models.batch import BatchRequest, BatchResponse, BatchSubRequest
+from app.models.user import User
+from app.utils.auth import get_current_active_user, BATCH_USER_SCOPE_KEY
+from app.utils.tracing import span
+
+# Sub-peticiones simultáneas por lote. En SQLite (harness) la conexión es única: una a la vez.
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "1" if IS_SQLITE else "4"))
+API_PREFIX = "/api/v1/"
+BATCH_PATH = "/api/v1/batch"
+# Respuestas que no terminan (Server-Sent Events): no caben en un lote
+EVENTS_PREFIX = "/api/v1/events/"
+_TIPO_STREAMING = "text/event-stream"
+
+router = APIRouter(tags=["Lotes"])
+
+# Claves del scope de la petición del lote que no deben heredar las sub-peticiones
+_CLAVES_POR_PETICION = ("route", "endpoint", "path_params", "fastapi_astack", "fastapi_inner_astack", "fastapi_function_astack")
+
+
+def _validar(sub: BatchSubRequest) -> Tuple[int, str]:
+    """Devuelve (0, '') si la sub-petición es admisible, o (status, detalle) si no."""
+    if sub.method.upper() != "GET":
+        return status.HTTP_405_METHOD_NOT_ALLOWED, "Solo se admiten sub-peticiones GET"
+    ruta = urllib.parse.urlsplit(sub.path).path
+    if not ruta.startswith(API_PREFIX):
+        return status.HTTP_400_BAD_REQUEST, f"La ruta debe empezar por {API_PREFIX}"
+    if ruta.rstrip("/") == BATCH_PATH:
+        return status.HTTP_400_BAD_REQUEST, "No se admiten lotes anidados"
+    if ruta.startswith(EVENTS_PREFIX):
+        return status.HTTP_400_BAD_REQUEST, "No se admiten sub-peticiones de streaming de eventos"
+    return 0, ""
+
+
+def _scope(request: Request, sub: BatchSubRequest, usuario: User) -> dict:
+    partes = urllib.parse.urlsplit(sub.path)
+    consulta = urllib.parse.urlencode(sub.query, doseq=True)
+    if partes.query:
+        consulta = f"{partes.query}&{consulta}" if consulta else partes.query
+    # Se reenvían las cabeceras de la petición original salvo las del cuerpo del lote
+    encabezados = [(n, v) for n, v in request.scope["headers"] if n not in (b"content-length", b"content-type", b"accept-encoding")]
+    scope = {k: v for k, v in request.scope.items() if k not in _CLAVES_POR_PETICION}
+    scope.update({
+        "method": "GET",
+        "path": partes.path,
+        "raw_path": partes.path.encode("utf-8"),
+        "query_string": consulta.encode("latin-1"),
+        "headers": encabezados,
+        "state": dict(request.scope.get("state") or {}),
+        BATCH_USER_SCOPE_KEY: usuario,
+    })
+    return scope
+
+
+class _RespuestaStreaming(Exception):
+    """La sub-respuesta es un stream sin fin: se corta en cuanto envía sus cabeceras."""
+
+
+async def _despachar(app, scope: dict) -> Tuple[int, Dict[str, str], bytes]:
+    status_code = 500
+    encabezados: Dict[str, str] = {}
+    partes: List[bytes] = []
+    cuerpo_entregado = False
+
+    async def receive():
+        # El cuerpo (vacío) se entrega una vez; después el "cliente" se da por desconectado,
+        # para que una respuesta que espera la desconexión (streaming) termine en vez de girar
+        nonlocal cuerpo_entregado
+        if cuerpo_entregado:
+            return {"type": "http.disconnect"}
+        cuerpo_entregado = True
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        nonlocal status_code
+        if message["type"] == "http.response.start":
+            status_code = message["status"]
+            for nombre, valor in message.get("headers", []):
+                encabezados[nombre.decode("latin-1").lower()] = valor.decode("latin-1")
+            if encabezados.get("content-type", "").startswith(_TIPO_STREAMING):
+                raise _RespuestaStreaming()
+        elif message["type"] == "http.response.body":
+            partes.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except HTTPException as e:
+        # Errores que el router lanza fuera de un endpoint (p. ej. 404 de ruta inexistente)
+        return e.status_code, {"content-type": "application/json"}, json.dumps({"detail": e.detail}).encode("utf-8")
+    except _RespuestaStreaming:
+        detalle = {"detail": "No se admiten sub-peticiones con respuesta en streaming"}
+        return status.HTTP_400_BAD_REQUEST, {"content-type": "application/json"}, json.dumps(detalle).encode("utf-8")
+    return status_code, encabezados, b"".join(partes)
+
+
+def _ejecutar_en_hilo(app, scope: dict) -> Tuple[int, Dict[str, str], bytes]:
+    return asyncio.run(_despachar(app, scope))
+
+
+def _cuerpo_json(encabezados: Dict[str, str], cuerpo: bytes) -> bytes:
+    if not cuerpo:
+        return b"null"
+    if encabezados.get("content-type", "").startswith("application/json"):
+        return cuerpo
+    return json.dumps(cuerpo.decode("utf-8", errors="replace")).encode("utf-8")
+
+
+@router.post("/batch", response_model=BatchResponse, summary="Ejecutar varias peticiones GET en una sola llamada")
+async def batch(
+    lote: BatchRequest,
+    request: Request,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    print(f"DEBUG BACKEND: [BATCH] Usuario '{current_user.username}' ejecutando lote de {len(lote.requests)} sub-peticiones.")
+    # El usuario ya está cargado: se libera la conexión del lote para que la usen las sub-peticiones
+    db.close()
+
+    # Se despacha contra el router (no contra la app completa): los middlewares ya se aplicaron al lote
+    app = request.app.router
+    limitador = anyio.CapacityLimiter(max(1, BATCH_CONCURRENCY))
+    resultados: List[Tuple[int, Dict[str, str], bytes]] = [None] * len(lote.requests)
+
+    async def ejecutar(indice: int, sub: BatchSubRequest):
+        codigo, detalle = _validar(sub)
+        if codigo:
+            resultados[indice] = (codigo, {"content-type": "application/json"}, json.dumps({"detail": detalle}).encode("utf-8"))
+            return
+        with span("batch.subrequest", path=sub.path):
+            try:
+                resultados[indice] = await anyio.to_thread.run_sync(
+                    _ejecutar_en_hilo, app, _scope(request, sub, current_user), limiter=limitador
+                )
+            except Exception as e:
+                print(f"ERROR BACKEND: [BATCH] Sub-petición {sub.path} falló: {e}")
+                resultados[indice] = (500, {"content-type": "application/json"}, b'{"detail":"Error interno del servidor"}')
+
+    async with anyio.create_task_group() as tg:
+        for indice, sub in enumerate(lote.requests):
+            tg.start_soon(ejecutar, indice, sub)
+
+    # Respuesta armada a mano: los cuerpos de las sub-respuestas ya son JSON
+    piezas = []
+    for indice, (sub, (codigo, encabezados, cuerpo)) in enumerate(zip(lote.requests, resultados)):
+        identificador = json.dumps(sub.id if sub.id is not None else str(indice)).encode("utf-8")
+        piezas.append(b'{"id":' + identificador + b',"status":' + str(codigo).encode("ascii") + b',"body":' + _cuerpo_json(encabezados, cuerpo) + b"}")
+    print(f"DEBUG BACKEND: [BATCH] Lote completado: {[r[0] for r in resultados]}")
+    return Response(content=b'{"responses":[' + b",".join(piezas) + b"]}", media_type="application/json")
@@ -0,0 +1,69 @@
+# app/routers/changes.py
+"""
+Feed de cambios para sincronización incremental del frontend.
+
+    GET /api/v1/changes                 -> cursor actual, sin cambios (punto de partida tras una carga completa)
+    GET /api/v1/changes?since=<cursor>  -> IDs creados/modificados y eliminados desde ese cursor
+
+El cursor es el id de cambios_sync, que se asigna en orden de confirmación (las filas se
+escriben justo antes del COMMIT, serializadas con un advisory lock en Postgres; ver
+app/models/cambio_sync.py): una transacción confirmada después nunca obtiene un id menor, así
+que el feed no se salta cambios aunque el commit llegue mucho después del flush.
+CHANGE_FEED_SAFETY_LAG (segundos, 0 por defecto) solo añade un margen opcional, p. ej. para
+leer de una réplica con retraso.
+Dentro de cada respuesta se queda la última operación de cada registro (una fila modificada
+y luego borrada aparece solo como borrada).
+"""
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app.db.database import get_db
+from app.models.cambio_sync import CambioSync, ChangeSet, ChangesRead
+from app.models.user import User
+from app.utils.auth import get_current_active_user
+from app.utils.responses import FastJSONResponse
+
+CHANGE_FEED_SAFETY_LAG = float(os.getenv("CHANGE_FEED_SAFETY_LAG", "0"))
+
+router = APIRouter(tags=["Sincronización"])
+
+@router.get("/changes", response_model=ChangesRead, summary="Cambios desde un cursor (sincronización incremental)")
+async def read_changes(
+    since: Optional[int] = Query(None, ge=0, description="Cursor devuelto por la llamada anterior. Sin él se devuelve solo el cursor actual."),
+    limit: int = Query(1000, ge=1, le=10000, description="Máximo de filas del registro de cambios a leer."),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    corte = (datetime.now(timezone.utc) - timedelta(seconds=CHANGE_FEED_SAFETY_LAG)).replace(tzinfo=None)
+
+    if since is None:
+        cursor = db.execute(select(func.max(CambioSync.id)).where(CambioSync.fecha <= corte)).scalar_one_or_none() or 0
+        print(f"DEBUG BACKEND: [CHANGES] Usuario '{current_user.username}' obtiene el cursor inicial: {cursor}")
+        return FastJSONResponse(ChangesRead(cursor=cursor, has_more=False))
+
+    filas = db.execute(
+        select(CambioSync.id, CambioSync.tabla, CambioSync.registro_id, CambioSync.operacion)
+        .where(CambioSync.id > since, CambioSync.fecha <= corte)
+        .order_by(CambioSync.id)
+        .limit(limit + 1)
+    ).all()
+    has_more = len(filas) > limit
+    filas = filas[:limit]
+
+    # Última operación por registro, en orden de escritura
+    ultimas: Dict[tuple, str] = {}
+    for fila in filas:
+        ultimas[(fila.tabla, fila.registro_id)] = fila.operacion
+    cambios: Dict[str, ChangeSet] = {}
+    for (tabla, registro_id), operacion in ultimas.items():
+        conjunto = cambios.setdefault(tabla, ChangeSet())
+        (conjunto.deleted if operacion == "delete" else conjunto.upserted).append(registro_id)
+
+    cursor = filas[-1].id if filas else since
+    print(f"DEBUG BACKEND: [CHANGES] Usuario '{current_user.username}' since={since}: {len(filas)} cambios, cursor={cursor}, has_more={has_more}.")
+    return FastJSONResponse(ChangesRead(cursor=cursor, has_more=has_more, changes=cambios))
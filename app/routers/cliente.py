@@ -1,46 +1,72 @@
 # app/routers/cliente.py
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query
+from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Query, Request, Response
 from sqlalchemy.orm import Session
 from typing import List, Optional
-import pandas as pd
 from io import BytesIO
+import time
 from sqlalchemy import func, select # Importar select y func
+from sqlalchemy.exc import IntegrityError
 
 from app.db.database import get_db
 from app.models.cliente import Cliente, ClienteCreate, ClienteRead, ClienteUpdate, PaginatedClientsRead
 from app.models.user import User # Importar User para el current_user
 from app.utils.auth import get_current_active_user # Importar dependencias de usuario
+from app.utils.metrics import record_import
+from app.utils.responses import FastJSONResponse
+from app.utils.conditional import page_version, conditional_response, cache_headers
+from app.utils.db_errors import integrity_http_error, is_unique_violation, violated_column
 
 router = APIRouter(prefix="/clientes", tags=["Clientes"]) # Añadir prefijo y tags
 
+# Mensajes de los índices únicos de clientes (ver app/utils/db_errors.py)
+_UNICOS_CLIENTE = {"cedula": "La cédula ya existe", "email": "El email ya existe"}
+
 # Ruta para crear un nuevo cliente
 @router.post("/", response_model=ClienteRead, status_code=status.HTTP_201_CREATED, summary="Crear nuevo cliente")
 async def create_cliente(
     cliente: ClienteCreate,
+    response: Response,
+    upsert: bool = Query(False, description="Si ya existe un cliente con esa cédula, actualizarlo (200) en lugar de responder 409. Pensado para integraciones que sincronizan clientes."),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
-    print(f"DEBUG BACKEND: [CREATE_CLIENTE] Usuario '{current_user.username}' intentando crear cliente: {cliente.cedula}")
-
-    # Validar que la cédula y el email sean únicos
-    existing_cliente_cedula = db.execute(select(Cliente).filter(Cliente.cedula == cliente.cedula)).scalar_one_or_none()
-    if existing_cliente_cedula:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La cédula ya existe")
-    
-    existing_cliente_email = db.execute(select(Cliente).filter(Cliente.email == cliente.email)).scalar_one_or_none()
-    if existing_cliente_email:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El email ya existe")
-
-    db_cliente = Cliente(**cliente.model_dump())
-    db.add(db_cliente)
+    username = current_user.username
+    print(f"DEBUG BACKEND: [CREATE_CLIENTE] Usuario '{username}' intentando crear cliente: {cliente.cedula} (upsert={upsert})")
+
+    datos = cliente.model_dump()
+    # La unicidad de cédula y email la garantizan los índices únicos: sin consultas previas
+    for intento in range(2):
+        db_cliente = None
+        if upsert:
+            db_cliente = db.execute(select(Cliente).filter(Cliente.cedula == cliente.cedula).with_for_update()).scalar_one_or_none()
+        creado = db_cliente is None
+        if creado:
+            db_cliente = Cliente(**datos)
+            db.add(db_cliente)
+        else:
+            for key, value in datos.items():
+                setattr(db_cliente, key, value)
+        try:
+            db.flush()
+        except IntegrityError as e:
+            db.rollback()
+            # Otra petición dio de alta la misma cédula entre la lectura y el INSERT: repetir como actualización
+            if upsert and creado and intento == 0 and violated_column(e, "clientes") == "cedula":
+                continue
+            raise integrity_http_error(e, "clientes", _UNICOS_CLIENTE)
+        break
+
+    cliente_response = ClienteRead.model_validate(db_cliente)
     db.commit()
-    db.refresh(db_cliente)
-    print(f"DEBUG BACKEND: [CREATE_CLIENTE] Cliente '{db_cliente.nombre} {db_cliente.apellido}' creado exitosamente por '{current_user.username}'.")
-    return ClienteRead.model_validate(db_cliente)
+    if not creado:
+        response.status_code = status.HTTP_200_OK
+    print(f"DEBUG BACKEND: [CREATE_CLIENTE] Cliente '{cliente_response.nombre} {cliente_response.apellido}' {'creado' if creado else 'actualizado'} exitosamente por '{username}'.")
+    return cliente_response
 
 # Ruta para obtener todos los clientes con paginación y filtro de búsqueda
 @router.get("/", response_model=PaginatedClientsRead, summary="Obtener lista de clientes")
 async def read_clientes(
+    request: Request,
     offset: int = Query(0, ge=0, description="Número de elementos a omitir"),
     limit: int = Query(10, ge=1, description="Número máximo de elementos a devolver"), # ¡CRÍTICO! Eliminado le=100
     search_term: Optional[str] = Query(None, description="Término de búsqueda por nombre, apellido, cédula o email"),
@@ -50,18 +76,11 @@ async def read_clientes(
 ):
     print(f"DEBUG BACKEND: [GET_CLIENTES] Usuario '{current_user.username}' solicitando clientes con offset={offset}, limit={limit}, search_term='{search_term}', email='{email}'.")
 
-    query = select(Cliente)
-    count_query = select(func.count()).select_from(Cliente)
+    filters = []
 
     if search_term:
         search_pattern = f"%{search_term.lower()}%"
-        query = query.filter(
-            (func.lower(Cliente.nombre).like(search_pattern)) |
-            (func.lower(Cliente.apellido).like(search_pattern)) |
-            (func.lower(Cliente.cedula).like(search_pattern)) |
-            (func.lower(Cliente.email).like(search_pattern))
-        )
-        count_query = count_query.filter(
+        filters.append(
             (func.lower(Cliente.nombre).like(search_pattern)) |
             (func.lower(Cliente.apellido).like(search_pattern)) |
             (func.lower(Cliente.cedula).like(search_pattern)) |
@@ -69,21 +88,32 @@ async def read_clientes(
         )
     
     if email:
-        query = query.filter(func.lower(Cliente.email) == email.lower())
-        count_query = count_query.filter(func.lower(Cliente.email) == email.lower())
+        filters.append(func.lower(Cliente.email) == email.lower())
+
+    # Orden estable por id: la consulta de versión y la de la página deben ver las mismas filas
+    query = select(Cliente).filter(*filters).order_by(Cliente.id)
+    count_query = select(func.count()).select_from(Cliente).filter(*filters)
 
     total = db.execute(count_query).scalar_one()
     print(f"DEBUG BACKEND: [GET_CLIENTES] Total de clientes encontrados (con filtro): {total}")
 
+    # GET condicional: si la página no cambió, 304 sin cargarla ni serializarla
+    version_query = select(Cliente.id, Cliente.fecha_actualizacion).filter(*filters).order_by(Cliente.id)
+    etag = page_version(db, version_query.offset(offset).limit(limit), request, total)
+    no_modificado = conditional_response(request, "clientes", etag)
+    if no_modificado is not None:
+        return no_modificado
+
     clientes_db = db.execute(query.offset(offset).limit(limit)).scalars().all()
     print(f"DEBUG BACKEND: [GET_CLIENTES] Se encontraron {len(clientes_db)} clientes para la página actual.")
     
-    return PaginatedClientsRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedClientsRead(
         items=[ClienteRead.model_validate(cliente) for cliente in clientes_db],
         total=total,
         page=offset // limit + 1,
         size=limit
-    )
+    ), headers=cache_headers(etag))
 
 # Ruta para obtener un cliente por ID
 @router.get("/{cliente_id}", response_model=ClienteRead, summary="Obtener cliente por ID")
@@ -109,26 +139,23 @@ async def update_cliente(
     if not db_cliente:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
 
-    # Validar que la cédula o el email no se dupliquen si se están actualizando
-    if cliente_update.cedula and cliente_update.cedula != db_cliente.cedula:
-        existing_cliente_cedula = db.execute(select(Cliente).filter(Cliente.cedula == cliente_update.cedula)).scalar_one_or_none()
-        if existing_cliente_cedula:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="La nueva cédula ya existe para otro cliente")
-
-    if cliente_update.email and cliente_update.email != db_cliente.email:
-        existing_cliente_email = db.execute(select(Cliente).filter(Cliente.email == cliente_update.email)).scalar_one_or_none()
-        if existing_cliente_email:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El nuevo email ya existe para otro cliente")
-
-
     for key, value in cliente_update.model_dump(exclude_unset=True).items():
         setattr(db_cliente, key, value)
 
-    db.add(db_cliente)
+    # Una cédula o un email ya usados por otro cliente los rechaza el índice único
+    username = current_user.username
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "clientes", {
+            "cedula": "La nueva cédula ya existe para otro cliente",
+            "email": "El nuevo email ya existe para otro cliente",
+        })
+    cliente_response = ClienteRead.model_validate(db_cliente)
     db.commit()
-    db.refresh(db_cliente)
-    print(f"DEBUG BACKEND: [UPDATE_CLIENTE] Cliente ID: {cliente_id} actualizado exitosamente por '{current_user.username}'.")
-    return ClienteRead.model_validate(db_cliente)
+    print(f"DEBUG BACKEND: [UPDATE_CLIENTE] Cliente ID: {cliente_id} actualizado exitosamente por '{username}'.")
+    return cliente_response
 
 # Ruta para eliminar un cliente
 @router.delete("/{cliente_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar cliente por ID")
@@ -155,6 +182,10 @@ async def import_clientes_csv(
     if not file.filename.endswith('.csv'):
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Formato de archivo no válido. Se espera un archivo CSV.")
 
+    # pandas tarda en importarse: solo se carga cuando alguien importa un CSV, no en cada arranque
+    import pandas as pd
+
+    inicio_importacion = time.perf_counter()
     try:
         content = await file.read()
         df = pd.read_csv(BytesIO(content))
@@ -174,28 +205,28 @@ async def import_clientes_csv(
                     direccion=row.get("direccion", ""), # Opcional
                     fecha_nacimiento=pd.to_datetime(row["fecha_nacimiento"]).isoformat() if pd.notna(row["fecha_nacimiento"]) else None # Convertir a ISO
                 )
-                
-                # Verificar unicidad de cédula y email antes de añadir
-                existing_cedula = db.execute(select(Cliente).filter(Cliente.cedula == cliente_data.cedula)).scalar_one_or_none()
-                existing_email = db.execute(select(Cliente).filter(Cliente.email == cliente_data.email)).scalar_one_or_none()
-
-                if existing_cedula:
-                    errors.append(f"Fila {index+1}: Cédula '{cliente_data.cedula}' ya existe.")
-                    continue
-                if existing_email:
-                    errors.append(f"Fila {index+1}: Email '{cliente_data.email}' ya existe.")
-                    continue
 
                 db_cliente = Cliente(**cliente_data.model_dump())
                 db.add(db_cliente)
                 db.commit()
-                db.refresh(db_cliente)
                 imported_count += 1
+            except IntegrityError as e:
+                # Cédula o email repetidos: los rechaza el índice único
+                db.rollback()
+                columna = violated_column(e, "clientes")
+                if is_unique_violation(e) and columna == "cedula":
+                    errors.append(f"Fila {index+1}: Cédula '{cliente_data.cedula}' ya existe.")
+                elif is_unique_violation(e) and columna == "email":
+                    errors.append(f"Fila {index+1}: Email '{cliente_data.email}' ya existe.")
+                else:
+                    errors.append(f"Fila {index+1}: Error al procesar - {e.orig}")
             except Exception as e:
                 db.rollback() # Hacer rollback en caso de error en una fila
                 errors.append(f"Fila {index+1}: Error al procesar - {e}")
                 print(f"DEBUG BACKEND: [IMPORT_CLIENTES] Error en fila {index+1}: {e}")
 
+        record_import(imported_count, len(errors), time.perf_counter() - inicio_importacion)
+
         if errors:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
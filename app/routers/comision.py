@@ -3,19 +3,66 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session, joinedload
 from typing import List, Optional
 from datetime import datetime, date, timezone
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, select
+from sqlalchemy.exc import IntegrityError
 
 from app.db.database import get_db
 from app.models.comision import Comision, ComisionCreate, ComisionRead, ComisionUpdate, TipoComision, EstatusPago, PaginatedComisionesRead
-from app.models.poliza import Poliza
-from app.models.asesor import Asesor
+from app.models.poliza import Poliza, PolizaRead
+from app.models.asesor import Asesor, AsesorRead
 from app.models.user import User
 from app.utils.auth import get_current_active_user
+from app.utils.responses import FastJSONResponse
+from app.utils.sparse import SparseList, Derivado, Relacion
+from app.utils.db_errors import integrity_http_error, is_foreign_key_violation
+from app.utils.reference_cache import reference_cache, nombre_asesor, ASESORES
+from app.routers.poliza import _get_poliza_with_relations_and_map
 
 # ¡CORRECCIÓN CRÍTICA! Se ha eliminado el 'prefix="/comisiones"'.
 # El prefijo ya lo establece el main.py, así se evita la duplicidad.
 router = APIRouter(tags=["Comisiones"])
 
+# Campos y relaciones admitidos por ?fields= y ?expand= en el listado
+COMISIONES_SPARSE = SparseList(
+    Comision, ComisionRead,
+    derivados={
+        "poliza_numero_poliza": Derivado(Comision.poliza_id, Poliza, ("numero_poliza",), lambda numero: numero),
+        "asesor_nombre_completo": Derivado(Comision.asesor_id, Asesor, ("nombre", "apellido"), lambda nombre, apellido: f"{nombre} {apellido or ''}".strip()),
+    },
+    relaciones={
+        "poliza": Relacion(Comision.poliza_id, Poliza, PolizaRead),
+        "asesor": Relacion(Comision.asesor_id, Asesor, AsesorRead),
+    },
+)
+
+# Columnas de Comision que ComisionRead copia tal cual (póliza y asesor se anidan aparte)
+_CAMPOS_COMISION_READ = [campo for campo in ComisionRead.model_fields if campo in Comision.__table__.columns]
+
+def _comision_read(db_comision: Comision, db: Session) -> ComisionRead:
+    """ComisionRead con los campos planos, a partir de una comisión con su póliza (y el cliente) ya asignada.
+
+    El asesor de la comisión y la empresa y el asesor de la póliza salen de la caché de referencia.
+    """
+    asesor = reference_cache.asesor(db, db_comision.asesor_id)
+    datos = {campo: getattr(db_comision, campo) for campo in _CAMPOS_COMISION_READ}
+    return ComisionRead.model_validate({
+        **datos,
+        "poliza": _get_poliza_with_relations_and_map(db_comision.poliza, db) if db_comision.poliza else None,
+        "asesor": asesor,
+        "poliza_numero_poliza": db_comision.poliza.numero_poliza if db_comision.poliza else None,
+        "asesor_nombre_completo": nombre_asesor(asesor) if asesor else None,
+    })
+
+def _flush_comision(db: Session):
+    # Un asesor borrado en otro worker puede seguir en la caché: la clave foránea lo rechaza
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if is_foreign_key_violation(e):
+            reference_cache.invalidar(ASESORES)
+        raise integrity_http_error(e, "comisiones", {}, {"asesor_id": "Asesor no encontrado", "poliza_id": "Póliza no encontrada"})
+
 # Ruta para crear una nueva comisión
 @router.post("/", response_model=ComisionRead, status_code=status.HTTP_201_CREATED, summary="Crear nueva comisión")
 async def create_comision(comision_data: ComisionCreate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
@@ -25,34 +72,27 @@ async def create_comision(comision_data: ComisionCreate, db: Session = Depends(g
     """
     print(f"DEBUG BACKEND: [CREATE_COMISION] Usuario '{current_user.username}' intentando crear comisión para póliza: {comision_data.poliza_id}, asesor: {comision_data.asesor_id}")
 
-    db_poliza = db.query(Poliza).filter(Poliza.id == comision_data.poliza_id).first()
-    if not db_poliza:
+    # Una sola consulta: la póliza con su cliente; el asesor se comprueba en la caché de referencia
+    db_poliza = db.execute(
+        select(Poliza).options(joinedload(Poliza.cliente)).where(Poliza.id == comision_data.poliza_id)
+    ).scalar_one_or_none()
+    if db_poliza is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Póliza no encontrada")
-
-    db_asesor = db.query(Asesor).filter(Asesor.id == comision_data.asesor_id).first()
-    if not db_asesor:
+    if reference_cache.asesor(db, comision_data.asesor_id) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
 
     db_comision = Comision(**comision_data.model_dump())
+    db_comision.poliza = db_poliza
     db.add(db_comision)
+    _flush_comision(db) # INSERT ... RETURNING id
+
+    # La respuesta se arma antes del commit, con los objetos ya cargados (el commit los expiraría)
+    respuesta = _comision_read(db_comision, db)
+    username = current_user.username
     db.commit()
-    db.refresh(db_comision)
-    
-    # Recargamos la instancia con las relaciones para una respuesta completa
-    db.refresh(db_comision)
-    db_comision = db.query(Comision).options(
-        joinedload(Comision.poliza),
-        joinedload(Comision.asesor)
-    ).filter(Comision.id == db_comision.id).first()
 
-    # Asignamos valores aplanados para la respuesta (si existen las relaciones)
-    if db_comision.poliza:
-        db_comision.poliza_numero_poliza = db_comision.poliza.numero_poliza
-    if db_comision.asesor:
-        db_comision.asesor_nombre_completo = f"{db_comision.asesor.nombre} {db_comision.asesor.apellido or ''}".strip()
-    
-    print(f"DEBUG BACKEND: [CREATE_COMISION] Comisión ID: {db_comision.id} creada exitosamente por '{current_user.username}'.")
-    return db_comision
+    print(f"DEBUG BACKEND: [CREATE_COMISION] Comisión ID: {respuesta.id} creada exitosamente por '{username}'.")
+    return respuesta
 
 # Ruta para obtener todas las comisiones con paginación y filtros
 @router.get("/", response_model=PaginatedComisionesRead, summary="Obtener todas las comisiones con filtros")
@@ -63,11 +103,15 @@ async def read_comisiones(
     estatus_pago: Optional[EstatusPago] = Query(None, description="Filtrar por estatus de pago."),
     fecha_inicio_filter: Optional[datetime] = Query(None, description="Filtrar comisiones generadas desde esta fecha (ISO 8601)."),
     fecha_fin_filter: Optional[datetime] = Query(None, description="Filtrar comisiones generadas hasta esta fecha (ISO 8601)."),
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (p. ej. id,monto,asesor_nombre_completo). Sin fields ni expand se devuelve la comisión completa."),
+    expand: Optional[str] = Query(None, description="Relaciones a anidar separadas por coma: poliza, asesor."),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)):
     """
     Recupera una lista paginada de comisiones, con opciones de filtrado.
+    Con `fields`/`expand` devuelve solo las columnas y relaciones pedidas.
     """
+    seleccion = COMISIONES_SPARSE.parse(fields, expand) if fields is not None or expand is not None else None
     query = db.query(Comision).options(
         joinedload(Comision.poliza),
         joinedload(Comision.asesor)
@@ -87,6 +131,20 @@ async def read_comisiones(
         query = query.filter(and_(*filters))
 
     total_comisiones = query.count()
+
+    if seleccion is not None:
+        # Solo las columnas y relaciones pedidas: ni la póliza ni el asesor se cargan si no se piden
+        sparse_query = COMISIONES_SPARSE.query(seleccion)
+        if filters:
+            sparse_query = sparse_query.filter(and_(*filters))
+        filas = db.execute(sparse_query.order_by(Comision.id.desc()).offset(offset).limit(limit)).all()
+        return FastJSONResponse({
+            "items": COMISIONES_SPARSE.items(db, filas, seleccion),
+            "total": total_comisiones,
+            "page": (offset // limit) + 1,
+            "size": len(filas),
+            "pages": (total_comisiones + limit - 1) // limit if limit > 0 else 0,
+        })
     comisiones = query.order_by(Comision.id.desc()).offset(offset).limit(limit).all()
 
     for comision in comisiones:
@@ -95,13 +153,14 @@ async def read_comisiones(
         if comision.asesor:
             comision.asesor_nombre_completo = f"{comision.asesor.nombre} {comision.asesor.apellido or ''}".strip()
 
-    return PaginatedComisionesRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedComisionesRead(
         items=comisiones,
         total=total_comisiones,
         page=(offset // limit) + 1,
         size=len(comisiones),
         pages=(total_comisiones + limit - 1) // limit if limit > 0 else 0
-    )
+    ))
 
 # Ruta para obtener una comisión por ID
 @router.get("/{comision_id}", response_model=ComisionRead, summary="Obtener comisión por ID")
@@ -124,29 +183,33 @@ async def read_comision(comision_id: int, db: Session = Depends(get_db), current
 # Ruta para actualizar una comisión
 @router.put("/{comision_id}", response_model=ComisionRead, summary="Actualizar comisión por ID")
 async def update_comision(comision_id: int, comision_update: ComisionUpdate, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
-    db_comision = db.query(Comision).filter(Comision.id == comision_id).first()
-    if not db_comision:
+    update_data = comision_update.model_dump(exclude_unset=True)
+    poliza_id = update_data.get("poliza_id")
+    asesor_id = update_data.get("asesor_id")
+
+    # Una sola consulta: la comisión y la póliza de destino (la nueva si cambia) con su cliente
+    fila = db.execute(
+        select(Comision, Poliza)
+        .outerjoin(Poliza, Poliza.id == (poliza_id if poliza_id is not None else Comision.poliza_id))
+        .options(joinedload(Poliza.cliente))
+        .where(Comision.id == comision_id)
+    ).first()
+    if fila is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comisión no encontrada")
+    if fila.Poliza is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Póliza no encontrada")
+    if reference_cache.asesor(db, asesor_id if asesor_id is not None else fila.Comision.asesor_id) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
 
-    update_data = comision_update.model_dump(exclude_unset=True)
+    db_comision = fila.Comision
     for key, value in update_data.items():
         setattr(db_comision, key, value)
+    db_comision.poliza = fila.Poliza
+    _flush_comision(db) # UPDATE
 
+    respuesta = _comision_read(db_comision, db)
     db.commit()
-    db.refresh(db_comision)
-
-    db.refresh(db_comision)
-    db_comision = db.query(Comision).options(
-        joinedload(Comision.poliza),
-        joinedload(Comision.asesor)
-    ).filter(Comision.id == db_comision.id).first()
-
-    if db_comision.poliza:
-        db_comision.poliza_numero_poliza = db_comision.poliza.numero_poliza
-    if db_comision.asesor:
-        db_comision.asesor_nombre_completo = f"{db_comision.asesor.nombre} {db_comision.asesor.apellido or ''}".strip()
-
-    return db_comision
+    return respuesta
 
 # Ruta para eliminar una comisión
 @router.delete("/{comision_id}", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar comisión por ID")
@@ -1,13 +1,18 @@
 # app/routers/empresa_aseguradora.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from sqlalchemy import func, select # Importar select y func
+from sqlalchemy.exc import IntegrityError
 
 from app.db.database import get_db
-from app.models.empresa_aseguradora import EmpresaAseguradora, EmpresaAseguradoraCreate, EmpresaAseguradoraRead, EmpresaAseguradoraUpdate, PaginatedEmpresasAseguradorasRead
+from app.models.empresa_aseguradora import EmpresaAseguradora, EmpresaAseguradoraCreate, EmpresaAseguradoraRead, EmpresaAseguradoraUpdate, PaginatedEmpresasAseguradorasRead, OpcionReferencia
 from app.models.user import User # Importar User para el current_user
 from app.utils.auth import get_current_active_user # Importar dependencias de usuario
+from app.utils.responses import FastJSONResponse
+from app.utils.conditional import page_version, conditional_response, cache_headers
+from app.utils.db_errors import integrity_http_error
+from app.utils.reference_cache import reference_cache, EMPRESAS
 
 router = APIRouter(prefix="/empresas_aseguradoras", tags=["Empresas Aseguradoras"]) # Añadir prefijo y tags
 
@@ -20,21 +25,25 @@ async def create_empresa_aseguradora(
 ):
     print(f"DEBUG BACKEND: [CREATE_EMPRESA] Usuario '{current_user.username}' intentando crear empresa: {empresa.nombre}")
 
-    # Validar que el RIF sea único
-    existing_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.rif == empresa.rif)).scalar_one_or_none()
-    if existing_empresa:
-        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El RIF ya existe")
-
+    # La unicidad del RIF y del email la garantizan los índices únicos
+    username = current_user.username
     db_empresa = EmpresaAseguradora(**empresa.model_dump())
     db.add(db_empresa)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "empresas_aseguradoras", {"rif": "El RIF ya existe", "email": "El email ya existe"})
+    empresa_response = EmpresaAseguradoraRead.model_validate(db_empresa)
     db.commit()
-    db.refresh(db_empresa)
-    print(f"DEBUG BACKEND: [CREATE_EMPRESA] Empresa '{db_empresa.nombre}' creada exitosamente por '{current_user.username}'.")
-    return EmpresaAseguradoraRead.model_validate(db_empresa)
+    reference_cache.invalidar(EMPRESAS)
+    print(f"DEBUG BACKEND: [CREATE_EMPRESA] Empresa '{empresa_response.nombre}' creada exitosamente por '{username}'.")
+    return empresa_response
 
 # Ruta para obtener todas las empresas aseguradoras con paginación y filtro de búsqueda
 @router.get("/", response_model=PaginatedEmpresasAseguradorasRead, summary="Obtener lista de empresas aseguradoras")
 async def read_empresas_aseguradoras(
+    request: Request,
     offset: int = Query(0, ge=0, description="Número de elementos a omitir"),
     limit: int = Query(10, ge=1, description="Número máximo de elementos a devolver"), # ¡CRÍTICO! Eliminado le=100
     search_term: Optional[str] = Query(None, description="Término de búsqueda por nombre o RIF"),
@@ -43,32 +52,49 @@ async def read_empresas_aseguradoras(
 ):
     print(f"DEBUG BACKEND: [GET_EMPRESAS] Usuario '{current_user.username}' solicitando empresas con offset={offset}, limit={limit}, search_term='{search_term}'.")
 
-    query = select(EmpresaAseguradora)
-    count_query = select(func.count()).select_from(EmpresaAseguradora)
+    filters = []
 
     if search_term:
         search_pattern = f"%{search_term.lower()}%"
-        query = query.filter(
-            (func.lower(EmpresaAseguradora.nombre).like(search_pattern)) |
-            (func.lower(EmpresaAseguradora.rif).like(search_pattern))
-        )
-        count_query = count_query.filter(
+        filters.append(
             (func.lower(EmpresaAseguradora.nombre).like(search_pattern)) |
             (func.lower(EmpresaAseguradora.rif).like(search_pattern))
         )
 
+    # Orden estable por id: la consulta de versión y la de la página deben ver las mismas filas
+    query = select(EmpresaAseguradora).filter(*filters).order_by(EmpresaAseguradora.id)
+    count_query = select(func.count()).select_from(EmpresaAseguradora).filter(*filters)
+
     total = db.execute(count_query).scalar_one()
     print(f"DEBUG BACKEND: [GET_EMPRESAS] Total de empresas encontradas (con filtro): {total}")
 
+    # GET condicional: si la página no cambió, 304 sin cargarla ni serializarla
+    version_query = select(EmpresaAseguradora.id, EmpresaAseguradora.fecha_actualizacion).filter(*filters).order_by(EmpresaAseguradora.id)
+    etag = page_version(db, version_query.offset(offset).limit(limit), request, total)
+    no_modificado = conditional_response(request, "empresas_aseguradoras", etag)
+    if no_modificado is not None:
+        return no_modificado
+
     empresas_db = db.execute(query.offset(offset).limit(limit)).scalars().all()
     print(f"DEBUG BACKEND: [GET_EMPRESAS] Se encontraron {len(empresas_db)} empresas para la página actual.")
     
-    return PaginatedEmpresasAseguradorasRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedEmpresasAseguradorasRead(
         items=[EmpresaAseguradoraRead.model_validate(empresa) for empresa in empresas_db],
         total=total,
         page=offset // limit + 1,
         size=limit
-    )
+    ), headers=cache_headers(etag))
+
+# Typeahead de empresas (selectores del frontend), servido desde la caché de referencia
+@router.get("/typeahead", response_model=List[OpcionReferencia], summary="Buscar empresas aseguradoras por nombre (typeahead)")
+async def typeahead_empresas_aseguradoras(
+    q: Optional[str] = Query(None, description="Texto contenido en el nombre (sin distinguir mayúsculas)"),
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    return FastJSONResponse(reference_cache.buscar(db, EMPRESAS, q, limit))
 
 # Ruta para obtener una empresa aseguradora por ID
 @router.get("/{empresa_id}/", response_model=EmpresaAseguradoraRead, summary="Obtener empresa aseguradora por ID")
@@ -94,20 +120,24 @@ async def update_empresa_aseguradora(
     if not db_empresa:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
 
-    # Validar que el RIF no se duplique si se está actualizando
-    if empresa_update.rif and empresa_update.rif != db_empresa.rif:
-        existing_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.rif == empresa_update.rif)).scalar_one_or_none()
-        if existing_empresa:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El nuevo RIF ya existe para otra empresa")
-
     for key, value in empresa_update.model_dump(exclude_unset=True).items():
         setattr(db_empresa, key, value)
 
-    db.add(db_empresa)
+    # Un RIF o email ya usados por otra empresa los rechaza el índice único
+    username = current_user.username
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "empresas_aseguradoras", {
+            "rif": "El nuevo RIF ya existe para otra empresa",
+            "email": "El nuevo email ya existe para otra empresa",
+        })
+    empresa_response = EmpresaAseguradoraRead.model_validate(db_empresa)
     db.commit()
-    db.refresh(db_empresa)
-    print(f"DEBUG BACKEND: [UPDATE_EMPRESA] Empresa ID: {empresa_id} actualizada exitosamente por '{current_user.username}'.")
-    return EmpresaAseguradoraRead.model_validate(db_empresa)
+    reference_cache.invalidar(EMPRESAS)
+    print(f"DEBUG BACKEND: [UPDATE_EMPRESA] Empresa ID: {empresa_id} actualizada exitosamente por '{username}'.")
+    return empresa_response
 
 # Ruta para eliminar una empresa aseguradora
 @router.delete("/{empresa_id}/", status_code=status.HTTP_204_NO_CONTENT, summary="Eliminar empresa aseguradora por ID")
@@ -120,5 +150,6 @@ async def delete_empresa_aseguradora(empresa_id: int, db: Session = Depends(get_
 
     db.delete(db_empresa)
     db.commit()
+    reference_cache.invalidar(EMPRESAS)
     print(f"DEBUG BACKEND: [DELETE_EMPRESA] Empresa ID: {empresa_id} eliminada exitosamente por '{current_user.username}'.")
     return {"message": "Empresa Aseguradora eliminada exitosamente"}
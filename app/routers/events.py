@@ -0,0 +1,86 @@
+# app/routers/events.py
+"""
+/api/v1/events/stream: notificaciones de cambios por Server-Sent Events.
+
+El dashboard consultaba /statistics/summary/ periódicamente y las listas se recargaban tras
+cada escritura. Con este canal el frontend recibe un aviso compacto cuando se crea, modifica
+o borra una póliza, reclamación o comisión, y solo entonces recarga lo afectado:
+
+    event: change
+    data: [{"t":"polizas","op":"updated","id":42}]
+
+    event: reset      (se perdieron eventos: recargar todo)
+
+EventSource no permite enviar cabeceras, así que el token va en ?token=. La conexión a la base
+de datos solo se usa para autenticar y se libera antes de empezar a transmitir.
+"""
+import asyncio
+import json
+import os
+
+from fastapi import APIRouter, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
+
+from app.db.database import SessionLocal
+from app.utils.auth import get_current_user
+from app.utils.pubsub import bus
+
+# Comentario de keep-alive cada SSE_HEARTBEAT segundos (proxies y balanceadores cortan conexiones ociosas)
+SSE_HEARTBEAT = float(os.getenv("SSE_HEARTBEAT", "15"))
+# Máximo de conexiones SSE abiertas por worker
+SSE_MAX_CLIENTS = int(os.getenv("SSE_MAX_CLIENTS", "200"))
+# Tras recibir un evento se espera este tiempo para agrupar los que lleguen juntos (un lote de escrituras)
+SSE_COALESCE_SECONDS = float(os.getenv("SSE_COALESCE_SECONDS", "0.1"))
+
+router = APIRouter(tags=["Eventos"])
+
+def _mensaje(tipo: str, datos) -> str:
+    return f"event: {tipo}\ndata: {json.dumps(datos, separators=(',', ':'))}\n\n"
+
+@router.get("/events/stream", summary="Notificaciones de cambios (Server-Sent Events)")
+async def events_stream(request: Request, token: str = Query(..., description="Token de acceso (EventSource no envía cabeceras).")):
+    if bus.suscriptores >= SSE_MAX_CLIENTS:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Demasiadas conexiones de eventos abiertas")
+
+    db = SessionLocal()
+    try:
+        current_user = await get_current_user(request, token=token, db=db)
+        if not current_user.is_active:
+            raise HTTPException(status_code=400, detail="Usuario inactivo")
+        username = current_user.username
+    finally:
+        db.close()
+    print(f"DEBUG BACKEND: [EVENTS] Usuario '{username}' abre el canal de eventos ({bus.suscriptores + 1} conectados).")
+
+    async def flujo():
+        # La suscripción se crea dentro del generador: si nunca llega a arrancar (cliente que se
+        # desconecta antes del primer fragmento) no queda registrada en el bus
+        with bus.suscribir() as suscripcion:
+            # El navegador reconecta solo tras 5 s si se corta
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(suscripcion.cola.get(), timeout=SSE_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                if SSE_COALESCE_SECONDS > 0:
+                    await asyncio.sleep(SSE_COALESCE_SECONDS)
+                eventos = [evento]
+                while not suscripcion.cola.empty():
+                    eventos.append(suscripcion.cola.get_nowait())
+                if suscripcion.desbordada:
+                    suscripcion.desbordada = False
+                    yield _mensaje("reset", {})
+                    continue
+                # Un mismo registro tocado varias veces en el lote se notifica una sola vez
+                yield _mensaje("change", list({(e["t"], e["id"]): e for e in eventos}.values()))
+        print(f"DEBUG BACKEND: [EVENTS] Usuario '{username}' cerró el canal de eventos.")
+
+    return StreamingResponse(
+        flujo(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -0,0 +1,48 @@
+# app/routers/health.py
+from fastapi import APIRouter, status
+from fastapi.responses import JSONResponse
+from sqlalchemy import text
+
+from app.db.database import engine
+from app.utils.warmup import estado as estado_calentamiento
+
+router = APIRouter(tags=["Salud"])
+
+@router.get("/healthz", include_in_schema=False, summary="Liveness: el proceso está vivo")
+def healthz():
+    """No toca la base de datos: solo indica que el proceso responde."""
+    return {"status": "ok"}
+
+@router.get("/readyz", include_in_schema=False, summary="Readiness: la instancia puede recibir tráfico")
+def readyz():
+    """
+    Lista solo si la base de datos responde, el calentamiento terminó y no hay migraciones pendientes.
+    Devuelve 503 con el detalle de cada comprobación en caso contrario.
+    """
+    checks = {"database": "ok", "warmup": "ok", "schema": "ok"}
+    try:
+        with engine.connect() as conexion:
+            conexion.execute(text("SELECT 1"))
+    except Exception as e:
+        checks["database"] = f"error: {e}"
+
+    if not estado_calentamiento.completado:
+        checks["warmup"] = "pending"
+    elif estado_calentamiento.error:
+        checks["warmup"] = f"error: {estado_calentamiento.error}"
+
+    if checks["database"] == "ok":
+        try:
+            if not estado_calentamiento.esquema_al_dia():
+                checks["schema"] = "migrations pending"
+        except Exception as e:
+            checks["schema"] = f"error: {e}"
+    else:
+        checks["schema"] = "unknown"
+
+    # Un error del calentamiento no bloquea el tráfico: la instancia funciona, solo sin precalentar
+    listo = checks["database"] == "ok" and checks["schema"] == "ok" and checks["warmup"] != "pending"
+    return JSONResponse(
+        status_code=status.HTTP_200_OK if listo else status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"status": "ready" if listo else "not_ready", "checks": checks},
+    )
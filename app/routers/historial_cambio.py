@@ -1,13 +1,17 @@
 # app/routers/historial_cambio.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_, select
 from typing import List, Optional
 from datetime import datetime, timezone
+import base64
 
 from app.db.database import get_db
-from app.models.historial_cambio import HistorialCambio, HistorialCambioCreate, HistorialCambioRead
+from app.models.historial_cambio import HistorialCambio, HistorialCambioCreate, HistorialCambioRead, HistorialAsOfRead
 from app.models.user import User # Necesario para la dependencia de usuario
 from app.utils.auth import get_current_active_user # Dependencia para usuario autenticado
+from app.utils.responses import FastJSONResponse
+from app.utils.auditoria import TABLAS_AUDITADAS, reconstruir
 
 router = APIRouter()
 
@@ -30,11 +34,22 @@ async def create_historial_cambio(historial_data: HistorialCambioCreate, db: Ses
     print(f"DEBUG BACKEND: [CREATE_HISTORIAL_CAMBIO] Registro de historial creado exitosamente por '{current_user.username}'.")
     return db_historial
 
+def _codificar_cursor(fecha_cambio: datetime, historial_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{fecha_cambio.isoformat()}|{historial_id}".encode()).decode().rstrip("=")
+
+def _decodificar_cursor(cursor: str):
+    try:
+        fecha, _, historial_id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().partition("|")
+        return datetime.fromisoformat(fecha), int(historial_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor de paginación no válido")
+
 # Ruta para obtener todos los registros de historial de cambio
 @router.get("/", response_model=List[HistorialCambioRead], summary="Obtener todos los registros de historial de cambio")
 async def get_all_historial_cambios(
-    skip: int = 0,
-    limit: int = 100,
+    skip: int = Query(0, ge=0, description="Registros a omitir (obsoleto: usar cursor, que no recorre las filas omitidas)."),
+    limit: int = Query(100, ge=1, le=1000, description="Número máximo de registros a devolver."),
+    cursor: Optional[str] = Query(None, description="Valor del encabezado X-Next-Cursor de la página anterior."),
     tabla_afectada: Optional[str] = None,
     registro_id: Optional[int] = None,
     usuario_id: Optional[int] = None,
@@ -42,23 +57,75 @@ async def get_all_historial_cambios(
     current_user: User = Depends(get_current_active_user)
 ):
     """
-    Obtiene una lista de todos los registros de historial de cambio, con opciones de filtrado.
+    Obtiene los registros de historial de cambio, del más reciente al más antiguo, con opciones de filtrado.
+    Si hay más resultados, el encabezado X-Next-Cursor trae el cursor de la página siguiente.
     Requiere que el usuario esté autenticado.
     """
     # Eliminamos la referencia a 'Rol' en el print de depuración
-    print(f"DEBUG BACKEND: [GET_HISTORIAL_CAMBIOS] Usuario '{current_user.username}' solicitando historial de cambios con filtros: Tabla={tabla_afectada}, Registro ID={registro_id}, Usuario ID={usuario_id}")
-
-    query = db.query(HistorialCambio)
+    print(f"DEBUG BACKEND: [GET_HISTORIAL_CAMBIOS] Usuario '{current_user.username}' solicitando historial de cambios con filtros: Tabla={tabla_afectada}, Registro ID={registro_id}, Usuario ID={usuario_id}, cursor={cursor}")
 
+    filters = []
     if tabla_afectada:
-        query = query.filter(HistorialCambio.tabla_afectada == tabla_afectada)
+        filters.append(HistorialCambio.tabla_afectada == tabla_afectada)
     if registro_id:
-        query = query.filter(HistorialCambio.registro_id == registro_id)
+        filters.append(HistorialCambio.registro_id == registro_id)
     if usuario_id:
-        query = query.filter(HistorialCambio.usuario_id == usuario_id)
+        filters.append(HistorialCambio.usuario_id == usuario_id)
+    if cursor:
+        # Paginación por cursor sobre (fecha_cambio, id): cada página es un recorrido de rango en el índice
+        fecha_cursor, id_cursor = _decodificar_cursor(cursor)
+        filters.append(or_(
+            HistorialCambio.fecha_cambio < fecha_cursor,
+            and_(HistorialCambio.fecha_cambio == fecha_cursor, HistorialCambio.id < id_cursor),
+        ))
+
+    query = (
+        select(HistorialCambio)
+        .filter(*filters)
+        .order_by(HistorialCambio.fecha_cambio.desc(), HistorialCambio.id.desc())
+        .limit(limit + 1)
+    )
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    historial_cambios = db.execute(query).scalars().all()
+    headers = {}
+    if len(historial_cambios) > limit:
+        historial_cambios = historial_cambios[:limit]
+        ultimo = historial_cambios[-1]
+        headers["X-Next-Cursor"] = _codificar_cursor(ultimo.fecha_cambio, ultimo.id)
+    return FastJSONResponse([HistorialCambioRead.model_validate(h) for h in historial_cambios], headers=headers)
+
+# Ruta para reconstruir el estado de un registro en una fecha
+@router.get("/{tabla}/{registro_id}/as_of", response_model=HistorialAsOfRead, summary="Estado de un registro en una fecha")
+async def get_registro_as_of(
+    tabla: str,
+    registro_id: int,
+    ts: datetime = Query(..., description="Fecha y hora (ISO 8601; sin zona se interpreta como UTC)."),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """
+    Reconstruye cómo era un registro auditado (póliza, cliente, reclamación o comisión) en la fecha `ts`,
+    a partir del último snapshot anterior y los cambios del historial posteriores a él.
+    Requiere que el usuario esté autenticado.
+    """
+    print(f"DEBUG BACKEND: [HISTORIAL_AS_OF] Usuario '{current_user.username}' solicitando {tabla} ID: {registro_id} a fecha {ts.isoformat()}")
+    if tabla not in TABLAS_AUDITADAS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Tabla no auditada. Opciones: {', '.join(TABLAS_AUDITADAS)}")
 
-    historial_cambios = query.offset(skip).limit(limit).all()
-    return historial_cambios
+    # Las fechas del historial se guardan en UTC sin zona
+    if ts.tzinfo is not None:
+        ts = ts.astimezone(timezone.utc).replace(tzinfo=None)
+    resultado = reconstruir(db, tabla, registro_id, ts)
+    if resultado is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="El registro no existía en esa fecha")
+    estado, snapshot_fecha, cambios_aplicados = resultado
+    print(f"DEBUG BACKEND: [HISTORIAL_AS_OF] Reconstruido desde {'snapshot ' + snapshot_fecha.isoformat() if snapshot_fecha else 'el estado posterior'} con {cambios_aplicados} cambios.")
+    return FastJSONResponse(HistorialAsOfRead(
+        tabla=tabla, registro_id=registro_id, as_of=ts, estado=estado,
+        snapshot_fecha=snapshot_fecha, cambios_aplicados=cambios_aplicados,
+    ))
 
 # Ruta para obtener un registro de historial de cambio por ID
 @router.get("/{historial_id}", response_model=HistorialCambioRead, summary="Obtener registro de historial de cambio por ID")
@@ -0,0 +1,21 @@
+# app/routers/metrics.py
+import os
+from fastapi import APIRouter, HTTPException, Request, Response, status
+
+from app.utils.metrics import CONTENT_TYPE_LATEST, render_metrics
+
+router = APIRouter(tags=["Métricas"])
+
+# Token opcional para proteger el endpoint de métricas (ej. METRICS_TOKEN en Render)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+@router.get("/metrics", include_in_schema=False, summary="Métricas en formato de texto de Prometheus")
+def read_metrics(request: Request):
+    """
+    Expone las métricas en formato de texto de Prometheus. Con varios workers (app.serve)
+    devuelve la suma de todos, así que basta con scrapear cualquiera de ellos.
+    Si METRICS_TOKEN está configurado, requiere 'Authorization: Bearer <token>'.
+    """
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="No autorizado")
+    return Response(content=render_metrics(), media_type=CONTENT_TYPE_LATEST)
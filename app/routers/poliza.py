@@ -1,35 +1,124 @@
 # app/routers/poliza.py
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload, selectinload # Usar selectinload
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Request
+from sqlalchemy.orm import Session, selectinload, aliased # Usar selectinload
 from typing import List, Optional
 from datetime import datetime, timedelta, timezone
-from sqlalchemy import func, or_, and_, select # Importar select y func
+from sqlalchemy import func, or_, and_, select, literal # Importar select y func
+from sqlalchemy.exc import IntegrityError
 
 from app.db.database import get_db
 from app.models.poliza import Poliza, PolizaCreate, PolizaRead, PolizaUpdate, PaginatedPolizasRead
-from app.models.cliente import Cliente # Importar Cliente para validación si es necesario
-from app.models.empresa_aseguradora import EmpresaAseguradora # Importar EmpresaAseguradora para validación
-from app.models.asesor import Asesor # Importar Asesor para validación
+from app.models.cliente import Cliente, ClienteRead # Importar Cliente para validación si es necesario
+from app.models.empresa_aseguradora import EmpresaAseguradora, EmpresaAseguradoraRead # Importar EmpresaAseguradora para validación
+from app.models.asesor import Asesor, AsesorRead # Importar Asesor para validación
 from app.models.user import User # Importar User para el current_user
 from app.utils.auth import get_current_active_user # Importar dependencias de usuario
+from app.utils.tracing import span
+from app.utils.responses import FastJSONResponse
+from app.utils.conditional import page_version, conditional_response, cache_headers, weak_etag
+from app.utils.sparse import SparseList, Derivado, Relacion
+from app.utils.db_errors import integrity_http_error, is_foreign_key_violation
+from app.utils.reference_cache import reference_cache, EMPRESAS
 
 router = APIRouter(prefix="/polizas", tags=["Pólizas"]) # Añadir prefijo y tags
 
-# Función auxiliar para cargar póliza con relaciones y mapear a PolizaRead
-def _get_poliza_with_relations_and_map(db_poliza: Poliza) -> PolizaRead:
-    """Carga las relaciones de una póliza y mapea a PolizaRead, incluyendo campos planos."""
-    poliza_read_item = PolizaRead.model_validate(db_poliza)
+# Columnas de Poliza que PolizaRead copia tal cual (las relaciones se anidan aparte)
+_CAMPOS_POLIZA_READ = [campo for campo in PolizaRead.model_fields if campo in Poliza.__table__.columns]
+
+# Función auxiliar para mapear una póliza a PolizaRead
+def _get_poliza_with_relations_and_map(db_poliza: Poliza, db: Optional[Session] = None) -> PolizaRead:
+    """Mapea una póliza (con el cliente cargado) a PolizaRead, incluyendo campos planos.
+
+    Con sesión, la empresa y el asesor salen de la caché de referencia y sus relaciones no se
+    cargan; sin ella (objetos transitorios del bench) se usan las relaciones del objeto.
+    """
+    if db is not None:
+        empresa = reference_cache.empresa(db, db_poliza.empresa_aseguradora_id)
+        asesor = reference_cache.asesor(db, db_poliza.asesor_id)
+    else:
+        empresa = EmpresaAseguradoraRead.model_validate(db_poliza.empresa_aseguradora) if db_poliza.empresa_aseguradora else None
+        asesor = AsesorRead.model_validate(db_poliza.asesor) if db_poliza.asesor else None
+    with span("serialize.poliza_read"):
+        datos = {campo: getattr(db_poliza, campo) for campo in _CAMPOS_POLIZA_READ}
+        poliza_read_item = PolizaRead.model_validate({
+            **datos,
+            "cliente": ClienteRead.model_validate(db_poliza.cliente) if db_poliza.cliente else None,
+            "empresa_aseguradora": empresa,
+            "asesor": asesor,
+        })
     
     # Añadir campos planos para facilitar la visualización en tablas del frontend
     if db_poliza.cliente:
         poliza_read_item.cliente_nombre_completo = f"{db_poliza.cliente.nombre} {db_poliza.cliente.apellido}"
-    if db_poliza.empresa_aseguradora:
-        poliza_read_item.empresa_aseguradora_nombre = db_poliza.empresa_aseguradora.nombre
-    if db_poliza.asesor:
-        poliza_read_item.asesor_nombre_completo = f"{db_poliza.asesor.nombre} {db_poliza.asesor.apellido}"
+    if empresa:
+        poliza_read_item.empresa_aseguradora_nombre = empresa.nombre
+    if asesor:
+        poliza_read_item.asesor_nombre_completo = f"{asesor.nombre} {asesor.apellido}"
     
     return poliza_read_item
 
+# Campos y relaciones admitidos por ?fields= y ?expand= en el listado
+POLIZAS_SPARSE = SparseList(
+    Poliza, PolizaRead,
+    derivados={
+        "cliente_nombre_completo": Derivado(Poliza.cliente_id, Cliente, ("nombre", "apellido"), lambda nombre, apellido: f"{nombre} {apellido}"),
+        "empresa_aseguradora_nombre": Derivado(Poliza.empresa_aseguradora_id, EmpresaAseguradora, ("nombre",), lambda nombre: nombre),
+        "asesor_nombre_completo": Derivado(Poliza.asesor_id, Asesor, ("nombre", "apellido"), lambda nombre, apellido: f"{nombre} {apellido}"),
+    },
+    relaciones={
+        "cliente": Relacion(Poliza.cliente_id, Cliente, ClienteRead),
+        "empresa_aseguradora": Relacion(Poliza.empresa_aseguradora_id, EmpresaAseguradora, EmpresaAseguradoraRead),
+        "asesor": Relacion(Poliza.asesor_id, Asesor, AsesorRead),
+    },
+)
+
+def _numero_duplicado(numero_poliza: str, excluir_id: Optional[int] = None):
+    """EXISTS de otra póliza con ese número (para combinarlo en la consulta de validación)."""
+    consulta = select(Poliza.id).where(Poliza.numero_poliza == numero_poliza)
+    if excluir_id is not None:
+        consulta = consulta.where(Poliza.id != excluir_id)
+    return consulta.exists()
+
+def _diagnosticar_relaciones(db: Session, numero_poliza: str):
+    """Camino de error de create_poliza: número repetido o cliente inexistente."""
+    if db.execute(_numero_duplicado(numero_poliza).select()).scalar():
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El número de póliza ya existe")
+    raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
+
+# Mensajes de las restricciones de pólizas (ver app/utils/db_errors.py); cubren el caso de una
+# empresa o asesor borrados en otro worker que aún figuran en su caché de referencia
+_UNICOS_POLIZA = {"numero_poliza": "El número de póliza ya existe"}
+_FORANEAS_POLIZA = {
+    "cliente_id": "Cliente no encontrado",
+    "empresa_aseguradora_id": "Empresa Aseguradora no encontrada",
+    "asesor_id": "Asesor no encontrado",
+}
+
+def _flush_poliza(db: Session):
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        if is_foreign_key_violation(e):
+            reference_cache.invalidar(EMPRESAS)
+        raise integrity_http_error(e, "polizas", _UNICOS_POLIZA, _FORANEAS_POLIZA)
+
+def _poliza_version_query():
+    """Columnas de versión de pólizas y de las relaciones que se anidan en PolizaRead.
+
+    Se usan alias para que los EXISTS de los filtros (Poliza.cliente.has...) no se correlacionen con estos JOIN.
+    """
+    cliente_v, empresa_v, asesor_v = aliased(Cliente), aliased(EmpresaAseguradora), aliased(Asesor)
+    return (
+        select(
+            Poliza.id, Poliza.fecha_creacion, Poliza.fecha_actualizacion,
+            cliente_v.fecha_actualizacion, empresa_v.fecha_actualizacion, asesor_v.fecha_actualizacion,
+        )
+        .outerjoin(cliente_v, Poliza.cliente_id == cliente_v.id)
+        .outerjoin(empresa_v, Poliza.empresa_aseguradora_id == empresa_v.id)
+        .outerjoin(asesor_v, Poliza.asesor_id == asesor_v.id)
+    )
+
 # Ruta para crear una nueva póliza
 @router.post("/", response_model=PolizaRead, status_code=status.HTTP_201_CREATED, summary="Crear nueva póliza") # ¡CRÍTICO! Ruta corregida
 async def create_poliza(
@@ -39,51 +128,38 @@ async def create_poliza(
 ):
     print(f"DEBUG BACKEND: [CREATE_POLIZA] Usuario '{current_user.username}' intentando crear póliza: {poliza.numero_poliza}")
 
-    # Validar unicidad del número de póliza
-    existing_poliza = db.execute(select(Poliza).filter(Poliza.numero_poliza == poliza.numero_poliza)).scalar_one_or_none()
-    if existing_poliza:
+    # Una sola consulta: unicidad del número y el cliente; la empresa y el asesor salen de la caché de referencia
+    fila = db.execute(
+        select(Cliente, _numero_duplicado(poliza.numero_poliza).label("duplicada"))
+        .where(Cliente.id == poliza.cliente_id)
+    ).first()
+    if fila is None:
+        # Falta el cliente: solo queda por saber si además el número está repetido
+        _diagnosticar_relaciones(db, poliza.numero_poliza)
+    if fila.duplicada:
         raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El número de póliza ya existe")
-
-    # Validar que el cliente exista
-    db_cliente = db.execute(select(Cliente).filter(Cliente.id == poliza.cliente_id)).scalar_one_or_none()
-    if not db_cliente:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
-
-    # Validar que la empresa aseguradora exista
-    db_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.id == poliza.empresa_aseguradora_id)).scalar_one_or_none()
-    if not db_empresa:
+    if reference_cache.empresa(db, poliza.empresa_aseguradora_id) is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
-
-    # Validar que el asesor exista
-    if poliza.asesor_id: # El asesor puede ser opcional
-        db_asesor = db.execute(select(Asesor).filter(Asesor.id == poliza.asesor_id)).scalar_one_or_none()
-        if not db_asesor:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
+    if poliza.asesor_id and reference_cache.asesor(db, poliza.asesor_id) is None: # El asesor puede ser opcional
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
 
     db_poliza = Poliza(**poliza.model_dump())
+    # El cliente ya está cargado: la respuesta se arma sin volver a consultar
+    db_poliza.cliente = fila.Cliente
     db.add(db_poliza)
-    db.commit()
-    db.refresh(db_poliza)
+    _flush_poliza(db) # INSERT ... RETURNING id
 
-    # Cargar las relaciones para la respuesta
-    poliza_with_relations = db.execute(
-        select(Poliza)
-        .options(
-            selectinload(Poliza.cliente),
-            selectinload(Poliza.empresa_aseguradora),
-            selectinload(Poliza.asesor)
-        )
-        .filter(Poliza.id == db_poliza.id)
-    ).scalar_one()
-
-    poliza_response = _get_poliza_with_relations_and_map(poliza_with_relations)
+    poliza_response = _get_poliza_with_relations_and_map(db_poliza, db)
+    username = current_user.username # el commit expira también al usuario de la sesión
+    db.commit()
 
-    print(f"DEBUG BACKEND: [CREATE_POLIZA] Póliza '{db_poliza.numero_poliza}' creada exitosamente por '{current_user.username}'.")
+    print(f"DEBUG BACKEND: [CREATE_POLIZA] Póliza '{poliza_response.numero_poliza}' creada exitosamente por '{username}'.")
     return poliza_response
 
 # Ruta para obtener todas las pólizas con paginación y filtros
 @router.get("/", response_model=PaginatedPolizasRead, summary="Obtener lista de pólizas") # ¡CRÍTICO! Ruta corregida
 async def read_polizas(
+    request: Request,
     offset: int = Query(0, ge=0, description="Número de elementos a omitir"),
     limit: int = Query(10, ge=1, description="Número máximo de elementos a devolver"),
     search_term: Optional[str] = Query(None, description="Término de búsqueda por número de póliza, nombre o cédula de cliente/asesor"),
@@ -94,15 +170,17 @@ async def read_polizas(
     asesor_id: Optional[int] = Query(None, description="Filtrar por ID de asesor"),
     fecha_inicio_filter: Optional[datetime] = Query(None, description="Filtrar pólizas que inician en o después de esta fecha"),
     fecha_fin_filter: Optional[datetime] = Query(None, description="Filtrar pólizas que finalizan en o antes de esta fecha"),
+    fields: Optional[str] = Query(None, description="Columnas a devolver separadas por coma (p. ej. id,numero_poliza,cliente_nombre_completo). Sin fields ni expand se devuelve la póliza completa."),
+    expand: Optional[str] = Query(None, description="Relaciones a anidar separadas por coma: cliente, empresa_aseguradora, asesor."),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
+    # Listado parcial: se valida antes de tocar la base de datos
+    seleccion = POLIZAS_SPARSE.parse(fields, expand) if fields is not None or expand is not None else None
     print(f"DEBUG BACKEND: [GET_POLIZAS] Usuario '{current_user.username}' solicitando pólizas con offset={offset}, limit={limit}, search_term='{search_term}', tipo='{tipo_poliza}', estado='{estado}', cliente_id='{cliente_id}', empresa_id='{empresa_id}', asesor_id='{asesor_id}', fecha_inicio_filter='{fecha_inicio_filter}', fecha_fin_filter='{fecha_fin_filter}'.")
 
     query = select(Poliza).options(
-        selectinload(Poliza.cliente),
-        selectinload(Poliza.empresa_aseguradora),
-        selectinload(Poliza.asesor)
+        selectinload(Poliza.cliente) # empresa y asesor: caché de referencia
     )
     count_query = select(func.count()).select_from(Poliza)
 
@@ -150,38 +228,75 @@ async def read_polizas(
     if fecha_fin_filter:
         filters.append(Poliza.fecha_fin <= fecha_fin_filter)
 
+    version_query = _poliza_version_query()
     if filters:
         query = query.filter(and_(*filters))
         count_query = count_query.filter(and_(*filters))
+        version_query = version_query.filter(and_(*filters))
+
+    # Orden estable por id: la consulta de versión y la de la página deben ver las mismas filas
+    query = query.order_by(Poliza.id)
+    version_query = version_query.order_by(Poliza.id)
 
     total = db.execute(count_query).scalar_one()
     print(f"DEBUG BACKEND: [GET_POLIZAS] Total de pólizas encontradas (con filtro): {total}")
 
+    # GET condicional: si la página (o un cliente, empresa o asesor anidado) no cambió, 304 sin cargarla ni serializarla
+    # El cuerpo anida empresa y asesor de la caché de referencia: su firma también forma parte del ETag
+    etag = page_version(db, version_query.offset(offset).limit(limit), request, total, reference_cache.firma(db))
+    no_modificado = conditional_response(request, "polizas", etag)
+    if no_modificado is not None:
+        return no_modificado
+
+    if seleccion is not None:
+        # Solo las columnas y relaciones pedidas: las demás relaciones no se consultan
+        sparse_query = POLIZAS_SPARSE.query(seleccion)
+        if filters:
+            sparse_query = sparse_query.filter(and_(*filters))
+        filas = db.execute(sparse_query.order_by(Poliza.id).offset(offset).limit(limit)).all()
+        print(f"DEBUG BACKEND: [GET_POLIZAS] Listado parcial: {len(filas)} pólizas, fields={seleccion.columnas + seleccion.derivados}, expand={seleccion.relaciones}.")
+        return FastJSONResponse({
+            "items": POLIZAS_SPARSE.items(db, filas, seleccion),
+            "total": total,
+            "page": offset // limit + 1,
+            "size": limit,
+        }, headers=cache_headers(etag))
+
     polizas_db = db.execute(query.offset(offset).limit(limit)).scalars().all()
     print(f"DEBUG BACKEND: [GET_POLIZAS] Se encontraron {len(polizas_db)} pólizas para la página actual.")
     
     polizas_response_items = []
     for poliza in polizas_db:
-        polizas_response_items.append(_get_poliza_with_relations_and_map(poliza))
+        polizas_response_items.append(_get_poliza_with_relations_and_map(poliza, db))
 
-    return PaginatedPolizasRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedPolizasRead(
         items=polizas_response_items,
         total=total,
         page=offset // limit + 1,
         size=limit
-    )
+    ), headers=cache_headers(etag))
 
 # Ruta para obtener una póliza por ID
 @router.get("/{poliza_id}", response_model=PolizaRead, summary="Obtener póliza por ID") # ¡CRÍTICO! Ruta corregida
-async def get_poliza_by_id(poliza_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
+async def get_poliza_by_id(poliza_id: int, request: Request, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_user)):
     print(f"DEBUG BACKEND: [GET_POLIZA_BY_ID] Usuario '{current_user.username}' solicitando póliza ID: {poliza_id}")
+
+    # GET condicional (ETag / Last-Modified) con solo las columnas de versión
+    version = db.execute(_poliza_version_query().filter(Poliza.id == poliza_id)).first()
+    if version is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Póliza no encontrada")
+    etag = weak_etag(request.url.path, tuple(version), reference_cache.firma(db))
+    fechas = [fecha for fecha in tuple(version)[1:] if fecha is not None]
+    last_modified = max(fechas) if fechas else None
+    no_modificado = conditional_response(request, "poliza", etag, last_modified)
+    if no_modificado is not None:
+        return no_modificado
     
     poliza = db.execute(
         select(Poliza)
         .options(
-            selectinload(Poliza.cliente),
-            selectinload(Poliza.empresa_aseguradora),
-            selectinload(Poliza.asesor)
+            selectinload(Poliza.cliente) # empresa y asesor: caché de referencia
         )
         .filter(Poliza.id == poliza_id)
     ).scalar_one_or_none()
@@ -189,9 +304,9 @@ async def get_poliza_by_id(poliza_id: int, db: Session = Depends(get_db), curren
     if not poliza:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Póliza no encontrada")
     
-    poliza_response = _get_poliza_with_relations_and_map(poliza)
+    poliza_response = _get_poliza_with_relations_and_map(poliza, db)
     print(f"DEBUG BACKEND: [GET_POLIZA_BY_ID] Póliza '{poliza.numero_poliza}' (ID: {poliza_id}) encontrada.")
-    return poliza_response
+    return FastJSONResponse(poliza_response, headers=cache_headers(etag, last_modified))
 
 # Ruta para actualizar una póliza
 @router.put("/{poliza_id}", response_model=PolizaRead, summary="Actualizar póliza por ID") # ¡CRÍTICO! Ruta corregida
@@ -203,55 +318,43 @@ async def update_poliza(
 ):
     print(f"DEBUG BACKEND: [UPDATE_POLIZA] Usuario '{current_user.username}' intentando actualizar póliza ID: {poliza_id}")
 
-    db_poliza = db.execute(select(Poliza).filter(Poliza.id == poliza_id)).scalar_one_or_none()
-    if not db_poliza:
+    cambios = poliza_update.model_dump(exclude_unset=True)
+
+    # Relaciones de destino: las nuevas si vienen en la petición, si no las actuales de la póliza
+    cliente_id = cambios.get("cliente_id")
+    numero_nuevo = cambios.get("numero_poliza")
+
+    # Una sola consulta: la póliza, unicidad del nuevo número y el cliente de destino
+    fila = db.execute(
+        select(Poliza, Cliente,
+               (_numero_duplicado(numero_nuevo, excluir_id=poliza_id) if numero_nuevo else literal(False)).label("duplicada"))
+        .outerjoin(Cliente, Cliente.id == (cliente_id if cliente_id is not None else Poliza.cliente_id))
+        .where(Poliza.id == poliza_id)
+    ).first()
+    if fila is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Póliza no encontrada")
+    if fila.duplicada:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El nuevo número de póliza ya existe")
+    if fila.Cliente is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
+    # Empresa y asesor de destino: existencia desde la caché de referencia
+    if cambios.get("empresa_aseguradora_id") is not None and reference_cache.empresa(db, cambios["empresa_aseguradora_id"]) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
+    if cambios.get("asesor_id") is not None and reference_cache.asesor(db, cambios["asesor_id"]) is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
 
-    # Validar unicidad del número de póliza si se está actualizando
-    if poliza_update.numero_poliza and poliza_update.numero_poliza != db_poliza.numero_poliza:
-        existing_poliza = db.execute(select(Poliza).filter(Poliza.numero_poliza == poliza_update.numero_poliza)).scalar_one_or_none()
-        if existing_poliza:
-            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="El nuevo número de póliza ya existe")
-
-    # Validar que el cliente exista si se proporciona
-    if poliza_update.cliente_id is not None:
-        db_cliente = db.execute(select(Cliente).filter(Cliente.id == poliza_update.cliente_id)).scalar_one_or_none()
-        if not db_cliente:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Cliente no encontrado")
-
-    # Validar que la empresa aseguradora exista si se proporciona
-    if poliza_update.empresa_aseguradora_id is not None:
-        db_empresa = db.execute(select(EmpresaAseguradora).filter(EmpresaAseguradora.id == poliza_update.empresa_aseguradora_id)).scalar_one_or_none()
-        if not db_empresa:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Empresa Aseguradora no encontrada")
-
-    # Validar que el asesor exista si se proporciona
-    if poliza_update.asesor_id is not None:
-        db_asesor = db.execute(select(Asesor).filter(Asesor.id == poliza_update.asesor_id)).scalar_one_or_none()
-        if not db_asesor:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Asesor no encontrado")
-
-    for key, value in poliza_update.model_dump(exclude_unset=True).items():
+    db_poliza = fila.Poliza
+    for key, value in cambios.items():
         setattr(db_poliza, key, value)
+    db_poliza.cliente = fila.Cliente
+    _flush_poliza(db) # UPDATE
 
-    db.add(db_poliza)
+    # La respuesta se arma antes del commit, con los objetos ya cargados (el commit los expiraría)
+    updated_poliza_response = _get_poliza_with_relations_and_map(db_poliza, db)
+    username = current_user.username # el commit expira también al usuario de la sesión
     db.commit()
-    db.refresh(db_poliza)
-
-    # Cargar las relaciones para la respuesta
-    poliza_with_relations = db.execute(
-        select(Poliza)
-        .options(
-            selectinload(Poliza.cliente),
-            selectinload(Poliza.empresa_aseguradora),
-            selectinload(Poliza.asesor)
-        )
-        .filter(Poliza.id == db_poliza.id)
-    ).scalar_one()
-
-    updated_poliza_response = _get_poliza_with_relations_and_map(poliza_with_relations)
 
-    print(f"DEBUG BACKEND: [UPDATE_POLIZA] Póliza ID: {poliza_id} actualizada exitosamente por '{current_user.username}'.")
+    print(f"DEBUG BACKEND: [UPDATE_POLIZA] Póliza ID: {poliza_id} actualizada exitosamente por '{username}'.")
     return updated_poliza_response
 
 # Ruta para eliminar una póliza
@@ -289,9 +392,7 @@ async def get_polizas_proximas_a_vencer(
     polizas_proximas = db.execute(
         select(Poliza)
         .options(
-            selectinload(Poliza.cliente),
-            selectinload(Poliza.empresa_aseguradora),
-            selectinload(Poliza.asesor)
+            selectinload(Poliza.cliente) # empresa y asesor: caché de referencia
         )
         .filter(Poliza.fecha_fin <= fecha_limite, Poliza.estado == "Activa")
         .offset(skip)
@@ -300,7 +401,7 @@ async def get_polizas_proximas_a_vencer(
 
     polizas_response_items = []
     for poliza in polizas_proximas:
-        polizas_response_items.append(_get_poliza_with_relations_and_map(poliza))
+        polizas_response_items.append(_get_poliza_with_relations_and_map(poliza, db))
         
     print(f"DEBUG BACKEND: [POLIZAS_VENCER] Se encontraron {len(polizas_response_items)} pólizas próximas a vencer.")
     return polizas_response_items
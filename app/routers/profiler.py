@@ -0,0 +1,33 @@
+# app/routers/profiler.py
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import FileResponse
+from typing import List
+
+from app.models.user import User
+from app.utils.auth import get_current_active_user
+from app.utils.profiler import is_profiler_admin, list_profiles, profile_path
+
+router = APIRouter(prefix="/profiles", tags=["Perfilado"])
+
+def _require_profiler_admin(current_user: User = Depends(get_current_active_user)) -> User:
+    """Permite el acceso solo a los usuarios listados en PROFILER_ADMINS."""
+    if not is_profiler_admin(current_user.username):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Acceso restringido a administradores de perfilado")
+    return current_user
+
+@router.get("/", summary="Listar perfiles guardados")
+def read_profiles(current_user: User = Depends(_require_profiler_admin)) -> List[dict]:
+    return list_profiles()
+
+@router.get("/{profile_id}", summary="Descargar un perfil guardado")
+def download_profile(
+    profile_id: str,
+    format: str = Query("txt", pattern="^(txt|prof)$", description="'txt' para el resumen legible, 'prof' para pstats/snakeviz"),
+    current_user: User = Depends(_require_profiler_admin)
+):
+    ruta = profile_path(profile_id, format)
+    if not ruta:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Perfil no encontrado")
+    if format == "txt":
+        return FileResponse(ruta, media_type="text/plain; charset=utf-8")
+    return FileResponse(ruta, media_type="application/octet-stream", filename=f"{profile_id}.prof")
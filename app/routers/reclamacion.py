@@ -10,6 +10,7 @@ from app.models.poliza import Poliza # Importar Poliza para validación
 from app.models.cliente import Cliente # Importar Cliente para validación
 from app.models.user import User # Importar User para el current_user
 from app.utils.auth import get_current_active_user # Importar dependencias de usuario
+from app.utils.responses import FastJSONResponse
 
 router = APIRouter()
 
@@ -95,12 +96,13 @@ async def get_all_reclamaciones(
     print(f"DEBUG BACKEND: [GET_RECLAMACIONES] Total de reclamaciones encontradas (con filtro): {total_reclamaciones}")
     print(f"DEBUG BACKEND: [GET_RECLAMACIONES] Se encontraron {len(reclamaciones_read)} reclamaciones para la página actual.")
 
-    return PaginatedReclamacionesRead(
+    # Se devuelve la respuesta ya construida: FastAPI no revalida ni convierte a dict antes de codificar
+    return FastJSONResponse(PaginatedReclamacionesRead(
         items=reclamaciones_read,
         total=total_reclamaciones,
         page=offset // limit + 1,
         size=len(reclamaciones_read)
-    )
+    ))
 
 # Ruta para obtener una reclamación por ID
 @router.get("/{reclamacion_id}", response_model=ReclamacionRead, summary="Obtener reclamación por ID")
@@ -1,8 +1,10 @@
 # app/routers/user.py
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from app.db.database import get_db
 from app.models.user import User, UserCreate, UserRead, Token, LicenseStatusResponse 
+from app.utils.db_errors import integrity_http_error
 from app.utils.auth import get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, get_current_active_user
 from datetime import timedelta, datetime, timezone # Necesario para la lógica de licencia
 
@@ -15,12 +17,6 @@ MASTER_LICENSE_KEY = "KEYLA-ALEIKA-HIJAS-2025"
 async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
     print(f"DEBUG BACKEND: [REGISTER] Intentando registrar usuario: {user_data.username}, Email: {user_data.email}")
 
-    # Verificar si el username o email ya existen
-    if db.query(User).filter(User.username == user_data.username).first():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Nombre de usuario ya registrado")
-    if db.query(User).filter(User.email == user_data.email).first():
-        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Email ya registrado")
-
     hashed_password = get_password_hash(user_data.password)
 
     # Lógica de licencia basada en master_license_key
@@ -46,11 +42,21 @@ async def register_user(user_data: UserCreate, db: Session = Depends(get_db)):
         is_trial=is_trial_user,
     )
 
+    # Username o email ya registrados los rechazan los índices únicos (sin consultas previas)
     db.add(db_user)
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        error = integrity_http_error(e, "users", {"username": "Nombre de usuario ya registrado", "email": "Email ya registrado"})
+        if isinstance(error, HTTPException):
+            # El registro respondía 400 (no 409) a un usuario o email repetidos: se mantiene para el frontend
+            error.status_code = status.HTTP_400_BAD_REQUEST
+        raise error
+    user_response = UserRead.model_validate(db_user)
     db.commit()
-    db.refresh(db_user)
-    print(f"DEBUG BACKEND: [REGISTER] Usuario '{db_user.username}' (ID: {db_user.id}) registrado exitosamente.")
-    return db_user
+    print(f"DEBUG BACKEND: [REGISTER] Usuario '{user_response.username}' (ID: {user_response.id}) registrado exitosamente.")
+    return user_response
 
 @router.get("/users/me/", response_model=UserRead, summary="Obtener información del usuario actual")
 async def read_users_me(current_user: User = Depends(get_current_active_user)):
@@ -0,0 +1,147 @@
+# app/serve.py
+"""
+Punto de entrada de producción: gunicorn con workers de uvicorn.
+
+    python -m app.serve
+
+- Workers: WEB_CONCURRENCY si está definida; si no, uno por CPU disponible
+  (respetando la afinidad del proceso y la cuota de CPU del cgroup del contenedor).
+- La app se carga una vez en el proceso maestro (preload) y se congela el GC antes
+  del fork, para que los workers compartan esa memoria por copy-on-write.
+- Cada worker se recicla tras WORKER_MAX_REQUESTS peticiones (con jitter) para contener fugas.
+- Apagado ordenado: las peticiones en curso tienen GRACEFUL_TIMEOUT segundos para terminar
+  y el pool de conexiones se vacía al salir cada worker.
+- Métricas: cada worker vuelca su registro en METRICS_MULTIPROC_DIR y /metrics devuelve la
+  suma de todos (ver app/utils/metrics.py), sin importar qué worker atienda el scrape.
+"""
+import gc
+import math
+import os
+import sys
+import tempfile
+
+from gunicorn.app.base import BaseApplication
+
+PORT = os.getenv("PORT", "8001")
+WORKER_MAX_REQUESTS = int(os.getenv("WORKER_MAX_REQUESTS", "5000"))
+WORKER_MAX_REQUESTS_JITTER = int(os.getenv("WORKER_MAX_REQUESTS_JITTER", str(WORKER_MAX_REQUESTS // 10)))
+GRACEFUL_TIMEOUT = int(os.getenv("GRACEFUL_TIMEOUT", "30"))
+WORKER_TIMEOUT = int(os.getenv("WORKER_TIMEOUT", "60"))
+KEEPALIVE = int(os.getenv("KEEPALIVE", "5"))
+# Directorio donde los workers comparten sus métricas; uno por proceso maestro si no se define
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR") or os.path.join(tempfile.gettempdir(), f"insurtech-metrics-{os.getpid()}")
+
+
+def _cuota_cgroup() -> float:
+    """CPUs permitidas por la cuota del cgroup (v2 o v1); infinito si no hay cuota."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            cuota, periodo = f.read().split()
+        if cuota != "max":
+            return int(cuota) / int(periodo)
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            cuota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            periodo = int(f.read())
+        if cuota > 0 and periodo > 0:
+            return cuota / periodo
+    except (OSError, ValueError):
+        pass
+    return math.inf
+
+
+def available_cpus() -> int:
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    return max(1, min(cpus, math.ceil(_cuota_cgroup())))
+
+
+def worker_count() -> int:
+    if os.getenv("WEB_CONCURRENCY"):
+        return max(1, int(os.environ["WEB_CONCURRENCY"]))
+    # Workers asíncronos: uno por CPU basta (cada uno atiende muchas conexiones)
+    return available_cpus()
+
+
+# --- Hooks de gunicorn ---
+
+def on_starting(server):
+    # Antes de crear los workers: vaciar las métricas que haya dejado una ejecución anterior
+    from app.utils.metrics import prepare_multiprocess_dir
+    prepare_multiprocess_dir()
+
+
+def when_ready(server):
+    # La app ya está cargada en el maestro: congelar los objetos vivos para que el GC de los
+    # workers no los toque (tocarlos rompería el copy-on-write y duplicaría la memoria)
+    gc.collect()
+    gc.freeze()
+    server.log.info("App precargada; GC congelado (%d objetos). Iniciando %d workers.", gc.get_freeze_count(), server.num_workers)
+
+
+def post_fork(server, worker):
+    # Las conexiones abiertas en el maestro no deben compartirse entre procesos:
+    # cada worker empieza con su propio pool sin cerrar las del padre
+    from app.db.database import engine
+    engine.dispose(close=False)
+    from app.utils.metrics import start_metrics_flusher
+    start_metrics_flusher()
+
+
+def worker_exit(server, worker):
+    # Cerrar las conexiones del pool al salir (reciclaje o apagado) y dejar el último volcado
+    # de métricas, que /metrics sigue sumando después de que el worker termine
+    from app.db.database import engine
+    engine.dispose()
+    from app.utils.metrics import flush_metrics
+    flush_metrics()
+
+
+class InsurtechServer(BaseApplication):
+    def __init__(self, opciones: dict):
+        self.opciones = opciones
+        super().__init__()
+
+    def load_config(self):
+        for clave, valor in self.opciones.items():
+            self.cfg.set(clave, valor)
+
+    def load(self):
+        from app.main import app
+        return app
+
+
+def options() -> dict:
+    return {
+        "bind": f"0.0.0.0:{PORT}",
+        "workers": worker_count(),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": WORKER_MAX_REQUESTS,
+        "max_requests_jitter": WORKER_MAX_REQUESTS_JITTER,
+        "graceful_timeout": GRACEFUL_TIMEOUT,
+        "timeout": WORKER_TIMEOUT,
+        "keepalive": KEEPALIVE,
+        "accesslog": None,
+        "on_starting": on_starting,
+        "when_ready": when_ready,
+        "post_fork": post_fork,
+        "worker_exit": worker_exit,
+    }
+
+
+def main():
+    # Antes de cargar la app (preload): app.utils.metrics lee la variable al importarse
+    os.environ["METRICS_MULTIPROC_DIR"] = METRICS_MULTIPROC_DIR
+    opciones = options()
+    print(f"DEBUG BACKEND: [SERVE] {opciones['workers']} workers en {opciones['bind']} (max_requests={WORKER_MAX_REQUESTS}, graceful_timeout={GRACEFUL_TIMEOUT}s)")
+    InsurtechServer(opciones).run()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
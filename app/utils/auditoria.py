@@ -0,0 +1,271 @@
+# app/utils/auditoria.py
+"""
+Auditoría automática en historial_cambios.
+
+Cada UPDATE de pólizas, clientes, reclamaciones y comisiones hecho con el ORM deja una fila
+por campo modificado (valor anterior y nuevo) con el usuario que lo hizo:
+
+- Las diferencias se calculan en before_flush con el historial de atributos del ORM, sin
+  consultas extra para leer los valores anteriores.
+- Todas las filas de un flush se escriben con un único INSERT multi-fila en la misma
+  transacción: el coste es constante por petición, no uno por campo.
+- El usuario se toma de session.info["usuario_id"], que fija get_current_user. Las sesiones
+  sin usuario (scripts, seed, migraciones) no se auditan.
+
+Además se guarda el estado completo del registro en historial_snapshots al crearlo y al
+eliminarlo, y periódicamente para los registros con muchos cambios (tomar_snapshots). El estado
+en una fecha (reconstruir) parte del último snapshot anterior y aplica solo los cambios
+posteriores a él.
+"""
+import enum
+import json
+import os
+from datetime import date, datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.orm import Session
+
+from app.db.database import Base
+from app.models.historial_cambio import HistorialCambio, HistorialSnapshot
+
+AUDIT_ENABLED = os.getenv("AUDIT_ENABLED", "1") == "1"
+TABLAS_AUDITADAS = ("polizas", "clientes", "reclamaciones", "comisiones")
+# Columnas que cambian en cada UPDATE y no aportan nada al historial
+CAMPOS_EXCLUIDOS = {"id", "fecha_actualizacion"}
+# Columnas que no se guardan en los snapshots (los cambios de historial no las siguen)
+CAMPOS_SNAPSHOT_EXCLUIDOS = {"fecha_actualizacion"}
+# Columna con la fecha de alta de cada tabla auditada: acota la reconstrucción de registros
+# anteriores a la auditoría, que no tienen snapshot de alta
+CAMPOS_CREACION = {
+    "polizas": "fecha_creacion",
+    "clientes": "fecha_registro",
+    "reclamaciones": "fecha_reclamacion",
+    "comisiones": "fecha_calculo",
+}
+# Clave de session.info con el id del usuario que hace la petición
+USUARIO_INFO_KEY = "usuario_id"
+# Filas por INSERT (SQLite limita los parámetros por sentencia)
+_LOTE = 500
+
+
+def _utc_sin_zona(valor: datetime) -> datetime:
+    return valor.astimezone(timezone.utc).replace(tzinfo=None) if valor.tzinfo else valor
+
+
+def valor_auditado(valor) -> Optional[str]:
+    """Representación en texto de un valor de columna (los enums se guardan por su valor)."""
+    if valor is None:
+        return None
+    if isinstance(valor, enum.Enum):
+        return str(valor.value)
+    if isinstance(valor, datetime):
+        # Siempre UTC sin zona, como se leen de la base (las columnas son DateTime sin zona)
+        return _utc_sin_zona(valor).isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor)
+
+
+def diferencias(objeto) -> List[Tuple[str, Optional[str], Optional[str]]]:
+    """(campo, valor_anterior, valor_nuevo) de cada columna modificada y aún no escrita de `objeto`."""
+    estado = inspect(objeto)
+    cambios = []
+    for columna in estado.mapper.column_attrs:
+        if columna.key in CAMPOS_EXCLUIDOS:
+            continue
+        historia = estado.attrs[columna.key].history
+        if not historia.has_changes():
+            continue
+        anterior = valor_auditado(historia.deleted[0]) if historia.deleted else None
+        nuevo = valor_auditado(historia.added[0]) if historia.added else None
+        # Asignar el mismo valor también queda en el historial del atributo
+        if anterior != nuevo:
+            cambios.append((columna.key, anterior, nuevo))
+    return cambios
+
+
+@event.listens_for(Session, "before_flush")
+def _auditar_cambios(session, flush_context, instances):
+    if not AUDIT_ENABLED:
+        return
+    usuario_id = session.info.get(USUARIO_INFO_KEY)
+    if usuario_id is None:
+        return
+    ahora = _ahora()
+    filas = []
+    for objeto in session.dirty:
+        tabla = getattr(type(objeto), "__tablename__", None)
+        if tabla not in TABLAS_AUDITADAS:
+            continue
+        for campo, anterior, nuevo in diferencias(objeto):
+            filas.append({
+                "tabla_afectada": tabla, "registro_id": objeto.id, "campo_modificado": campo,
+                "valor_anterior": anterior, "valor_nuevo": nuevo, "fecha_cambio": ahora, "usuario_id": usuario_id,
+            })
+    if not filas:
+        return
+    _insertar(session.connection(), HistorialCambio, filas)
+    print(f"DEBUG BACKEND: [AUDITORIA] {len(filas)} cambios registrados en historial_cambios (usuario {usuario_id}).")
+
+
+@event.listens_for(Session, "after_flush")
+def _snapshots_alta_baja(session, flush_context):
+    """Snapshot de los registros auditados que el flush creó (ya tienen id) o eliminó."""
+    if not AUDIT_ENABLED or session.info.get(USUARIO_INFO_KEY) is None:
+        return
+    ahora = _ahora()
+    filas = [
+        _fila_snapshot(type(objeto).__tablename__, objeto.id, tipo, ahora, estado_registro(objeto))
+        for tipo, objetos in (("alta", session.new), ("baja", session.deleted))
+        for objeto in objetos
+        if getattr(type(objeto), "__tablename__", None) in TABLAS_AUDITADAS
+    ]
+    if filas:
+        _insertar(session.connection(), HistorialSnapshot, filas)
+
+
+def _ahora() -> datetime:
+    # Mismo criterio que fecha_cambio: UTC sin zona (las columnas son DateTime sin zona)
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _insertar(conexion, modelo, filas: List[dict]):
+    for inicio in range(0, len(filas), _LOTE):
+        conexion.execute(modelo.__table__.insert().values(filas[inicio:inicio + _LOTE]))
+
+
+def _fila_snapshot(tabla: str, registro_id: int, tipo: str, fecha: datetime, estado: Dict[str, Optional[str]]) -> dict:
+    return {"tabla": tabla, "registro_id": registro_id, "tipo": tipo, "fecha": fecha,
+            "datos": json.dumps(estado, ensure_ascii=False, separators=(",", ":"))}
+
+
+def estado_registro(objeto) -> Dict[str, Optional[str]]:
+    """Estado completo de `objeto` en memoria, sin cargar los atributos que no se hayan leído."""
+    estado = inspect(objeto)
+    return {
+        columna.key: valor_auditado(estado.dict.get(columna.key))
+        for columna in estado.mapper.column_attrs
+        if columna.key not in CAMPOS_SNAPSHOT_EXCLUIDOS
+    }
+
+
+def modelo_de_tabla(tabla: str):
+    for mapper in Base.registry.mappers:
+        if mapper.class_.__tablename__ == tabla:
+            return mapper.class_
+    return None
+
+
+def reconstruir(db: Session, tabla: str, registro_id: int, fecha: datetime):
+    """
+    Estado de un registro auditado en `fecha` (UTC sin zona).
+    Devuelve (estado, fecha_del_snapshot_de_partida, cambios_aplicados), o None si el registro no
+    existía en esa fecha.
+
+    Hacia delante: último snapshot <= fecha más los cambios posteriores a él.
+    Si no lo hay (registro anterior a la auditoría), hacia atrás: primer snapshot posterior, o el
+    estado actual, deshaciendo los cambios posteriores a `fecha` con su valor anterior. Sin snapshot
+    de alta, la existencia en `fecha` se decide por su columna de alta (CAMPOS_CREACION).
+    """
+    anterior = db.execute(
+        select(HistorialSnapshot.tipo, HistorialSnapshot.fecha, HistorialSnapshot.datos)
+        .where(HistorialSnapshot.tabla == tabla, HistorialSnapshot.registro_id == registro_id, HistorialSnapshot.fecha <= fecha)
+        .order_by(HistorialSnapshot.fecha.desc(), HistorialSnapshot.id.desc())
+        .limit(1)
+    ).first()
+    filtro = [HistorialCambio.tabla_afectada == tabla, HistorialCambio.registro_id == registro_id]
+
+    if anterior is not None:
+        if anterior.tipo == "baja":
+            return None
+        estado = json.loads(anterior.datos)
+        cambios = db.execute(
+            select(HistorialCambio.campo_modificado, HistorialCambio.valor_nuevo)
+            .where(*filtro, HistorialCambio.fecha_cambio > anterior.fecha, HistorialCambio.fecha_cambio <= fecha)
+            .order_by(HistorialCambio.fecha_cambio, HistorialCambio.id)
+        ).all()
+        for cambio in cambios:
+            estado[cambio.campo_modificado] = cambio.valor_nuevo
+        return estado, anterior.fecha, len(cambios)
+
+    posterior = db.execute(
+        select(HistorialSnapshot.tipo, HistorialSnapshot.fecha, HistorialSnapshot.datos)
+        .where(HistorialSnapshot.tabla == tabla, HistorialSnapshot.registro_id == registro_id, HistorialSnapshot.fecha > fecha)
+        .order_by(HistorialSnapshot.fecha, HistorialSnapshot.id)
+        .limit(1)
+    ).first()
+    if posterior is not None and posterior.tipo == "alta":
+        return None # Se creó después de `fecha`
+    if posterior is not None:
+        estado, hasta = json.loads(posterior.datos), posterior.fecha
+    else:
+        modelo = modelo_de_tabla(tabla)
+        objeto = db.get(modelo, registro_id) if modelo is not None else None
+        if objeto is None:
+            return None
+        estado, hasta = estado_registro(objeto), None
+    condiciones = [*filtro, HistorialCambio.fecha_cambio > fecha]
+    if hasta is not None:
+        condiciones.append(HistorialCambio.fecha_cambio <= hasta)
+    cambios = db.execute(
+        select(HistorialCambio.campo_modificado, HistorialCambio.valor_anterior)
+        .where(*condiciones)
+        .order_by(HistorialCambio.fecha_cambio.desc(), HistorialCambio.id.desc())
+    ).all()
+    for cambio in cambios:
+        estado[cambio.campo_modificado] = cambio.valor_anterior
+    if _creado_despues(tabla, estado, fecha):
+        return None # Registro anterior a la auditoría, pero creado después de `fecha`
+    return estado, None, len(cambios)
+
+
+def _creado_despues(tabla: str, estado: Dict[str, Optional[str]], fecha: datetime) -> bool:
+    valor = estado.get(CAMPOS_CREACION.get(tabla, ""))
+    if not valor:
+        return False
+    try:
+        creacion = _utc_sin_zona(datetime.fromisoformat(valor))
+    except ValueError:
+        return False
+    return fecha < creacion
+
+
+def _registros_a_compactar(db: Session, tabla: str, hasta: datetime, minimo_cambios: int) -> List[int]:
+    """IDs con al menos `minimo_cambios` cambios <= hasta posteriores a su último snapshot <= hasta."""
+    ultimos = (
+        select(HistorialSnapshot.registro_id, func.max(HistorialSnapshot.fecha).label("fecha"))
+        .where(HistorialSnapshot.tabla == tabla, HistorialSnapshot.fecha <= hasta)
+        .group_by(HistorialSnapshot.registro_id)
+        .subquery()
+    )
+    return db.execute(
+        select(HistorialCambio.registro_id)
+        .outerjoin(ultimos, ultimos.c.registro_id == HistorialCambio.registro_id)
+        .where(
+            HistorialCambio.tabla_afectada == tabla,
+            HistorialCambio.fecha_cambio <= hasta,
+            or_(ultimos.c.fecha.is_(None), HistorialCambio.fecha_cambio > ultimos.c.fecha),
+        )
+        .group_by(HistorialCambio.registro_id)
+        .having(func.count() >= minimo_cambios)
+    ).scalars().all()
+
+
+def tomar_snapshots(db: Session, minimo_cambios: int = 50, fecha: Optional[datetime] = None, tipo: str = "periodico") -> int:
+    """
+    Guarda el estado en `fecha` (por defecto, ahora) de los registros con al menos `minimo_cambios`
+    cambios desde su último snapshot. Acota el número de cambios a aplicar al reconstruir.
+    """
+    fecha = fecha or _ahora()
+    filas = []
+    for tabla in TABLAS_AUDITADAS:
+        for registro_id in _registros_a_compactar(db, tabla, fecha, minimo_cambios):
+            resultado = reconstruir(db, tabla, registro_id, fecha)
+            if resultado is not None:
+                filas.append(_fila_snapshot(tabla, registro_id, tipo, fecha, resultado[0]))
+    if filas:
+        _insertar(db.connection(), HistorialSnapshot, filas)
+    db.commit()
+    print(f"DEBUG BACKEND: [AUDITORIA] {len(filas)} snapshots '{tipo}' guardados a fecha {fecha.isoformat()}.")
+    return len(filas)
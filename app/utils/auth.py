@@ -1,16 +1,20 @@
 # app/utils/auth.py
+import os
 from datetime import datetime, timedelta, timezone
 from typing import Optional, Type, Any
 from jose import JWTError, jwt
 from passlib.context import CryptContext
 from fastapi.security import OAuth2PasswordBearer
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 
 # Lazy import para evitar dependencia circular
 from app.db.database import get_db
 from app.models.user import User as UserModel # Importar el modelo User como UserModel
+from app.utils.metrics import AUTH_TOKEN_CACHE
+from app.utils.tracing import span
+from app.utils.auditoria import USUARIO_INFO_KEY # Importarlo registra también la auditoría automática
 
 # Configuración de seguridad
 SECRET_KEY = "tu_super_secreto_ultra_seguro_y_largo" # ¡CAMBIA ESTO EN PRODUCCIÓN POR UNA VARIABLE DE ENTORNO SEGURA!
@@ -21,6 +25,31 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7 # Token expira en 7 días (ajustable)
 pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/token") # Asegúrate de que la URL coincida con tu ruta de login
 
+# Caché de payloads JWT ya decodificados: el frontend reenvía el mismo token en cada
+# petición, así que evitamos verificar la firma una y otra vez. La expiración se
+# sigue comprobando en cada uso en get_current_user.
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "1024"))
+_token_payload_cache: dict = {}
+
+# Clave del scope ASGI donde /batch deja el usuario ya autenticado para sus sub-peticiones.
+# Solo se puede fijar desde el propio proceso (no llega desde la petición del cliente).
+BATCH_USER_SCOPE_KEY = "insurtech.batch_user"
+
+def decode_access_token(token: str) -> dict:
+    """Decodifica un token JWT reutilizando la caché de payloads cuando es posible."""
+    payload = _token_payload_cache.get(token)
+    if payload is not None:
+        AUTH_TOKEN_CACHE.labels("hit").inc()
+        return payload
+    AUTH_TOKEN_CACHE.labels("miss").inc()
+    payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    if AUTH_TOKEN_CACHE_SIZE > 0:
+        if len(_token_payload_cache) >= AUTH_TOKEN_CACHE_SIZE:
+            # Los dict conservan el orden de inserción: se descarta el más antiguo
+            _token_payload_cache.pop(next(iter(_token_payload_cache)), None)
+        _token_payload_cache[token] = payload
+    return payload
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica si una contraseña en texto plano coincide con una hash."""
     return pwd_context.verify(plain_password, hashed_password)
@@ -57,15 +86,21 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
         
     return user
 
-async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Any:
+async def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> Any:
     """Obtiene el usuario actual a partir del token JWT."""
+    # Sub-petición de /batch: el lote ya autenticó al usuario una vez, no se repite la búsqueda
+    usuario_lote = request.scope.get(BATCH_USER_SCOPE_KEY)
+    if usuario_lote is not None:
+        return usuario_lote
+
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        with span("auth.jwt_decode"):
+            payload = decode_access_token(token)
         username: str = payload.get("sub")
         if username is None:
             print("DEBUG BACKEND: [GET CURRENT USER] Payload no contiene 'sub'.") # DEBUG
@@ -92,10 +127,13 @@ async def get_current_user(token: str = Depends(oauth2_scheme), db: Session = De
         print(f"DEBUG BACKEND: [GET CURRENT USER] Error inesperado: {e}") # DEBUG
         raise credentials_exception
 
-    user = db.execute(select(UserModel).where(UserModel.username == username)).scalar_one_or_none()
+    with span("auth.user_lookup"):
+        user = db.execute(select(UserModel).where(UserModel.username == username)).scalar_one_or_none()
     if user is None:
         print(f"DEBUG BACKEND: [GET CURRENT USER] Usuario '{username}' no encontrado en DB.") # DEBUG
         raise credentials_exception
+    # La auditoría atribuye a este usuario lo que se escriba con esta sesión
+    db.info[USUARIO_INFO_KEY] = user.id
     print(f"DEBUG BACKEND: [GET CURRENT USER] Usuario '{user.username}' obtenido exitosamente.")
     return user
 
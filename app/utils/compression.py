@@ -0,0 +1,207 @@
+# app/utils/compression.py
+"""
+Compresión de respuestas (gzip, y brotli/zstd si las librerías están instaladas).
+
+- Solo se comprimen respuestas de tipos de contenido textuales (JSON, texto, CSV...) y de
+  al menos COMPRESSION_MIN_SIZE bytes; las de streaming (SSE, archivos) pasan intactas.
+- El algoritmo se elige según Accept-Encoding, prefiriendo br > zstd > gzip.
+- Los cuerpos comprimidos se guardan en una caché LRU indexada por el digest del cuerpo:
+  una respuesta caliente que se repite idéntica (catálogos, dashboard) no se recomprime.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional, Tuple
+
+import anyio
+
+from app.utils.metrics import REGISTRY
+from app.utils.tracing import span
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSION_ENABLED = os.getenv("COMPRESSION_ENABLED", "1") == "1"
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_ZSTD_LEVEL = int(os.getenv("COMPRESSION_ZSTD_LEVEL", "3"))
+COMPRESSION_CACHE_SIZE = int(os.getenv("COMPRESSION_CACHE_SIZE", "256"))
+# Cuerpos más grandes que esto no se guardan en caché (no vale la pena ocupar memoria)
+COMPRESSION_CACHE_MAX_BODY = int(os.getenv("COMPRESSION_CACHE_MAX_BODY", str(2 * 1024 * 1024)))
+# Cuerpos más grandes que esto se comprimen en el threadpool para no bloquear el event loop
+COMPRESSION_THREAD_THRESHOLD = int(os.getenv("COMPRESSION_THREAD_THRESHOLD", str(256 * 1024)))
+
+TIPOS_COMPRIMIBLES = (
+    "application/json", "application/problem+json", "application/javascript", "application/xml",
+    "text/plain", "text/html", "text/csv", "text/css", "text/xml",
+)
+
+COMPRESSION_CACHE = REGISTRY.counter(
+    "http_compression_cache_total", "Consultas a la caché de cuerpos comprimidos.", ("result",)
+)
+COMPRESSION_BYTES = REGISTRY.counter(
+    "http_compression_bytes_total", "Bytes antes y después de comprimir.", ("encoding", "stage")
+)
+
+
+def _compresores() -> Dict[str, Callable[[bytes], bytes]]:
+    compresores = {}
+    if brotli is not None:
+        compresores["br"] = lambda datos: brotli.compress(datos, quality=COMPRESSION_BROTLI_QUALITY)
+    if zstandard is not None:
+        # ZstdCompressor no es seguro entre hilos: uno por llamada es barato
+        compresores["zstd"] = lambda datos: zstandard.ZstdCompressor(level=COMPRESSION_ZSTD_LEVEL).compress(datos)
+    compresores["gzip"] = lambda datos: gzip.compress(datos, compresslevel=COMPRESSION_GZIP_LEVEL, mtime=0)
+    return compresores
+
+
+COMPRESORES = _compresores()
+# Orden de preferencia del servidor ante pesos iguales
+PREFERENCIA = [codificacion for codificacion in ("br", "zstd", "gzip") if codificacion in COMPRESORES]
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Elige la codificación soportada con mayor peso q en Accept-Encoding."""
+    pesos: Dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        nombre = nombre.strip().lower()
+        q = 1.0
+        parametros = parametros.strip()
+        if parametros.startswith("q="):
+            try:
+                q = float(parametros[2:])
+            except ValueError:
+                q = 0.0
+        if nombre:
+            pesos[nombre] = q
+    comodin = pesos.get("*", 0.0)
+    candidatas = [(pesos.get(c, comodin), -i, c) for i, c in enumerate(PREFERENCIA)]
+    q, _, codificacion = max(candidatas, default=(0.0, 0, None))
+    return codificacion if q > 0 else None
+
+
+class _CacheComprimidos:
+    """LRU de cuerpos comprimidos indexada por (codificación, digest del cuerpo)."""
+
+    def __init__(self, capacidad: int):
+        self.capacidad = capacidad
+        self._datos: "OrderedDict[Tuple[str, bytes], bytes]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def obtener(self, clave) -> Optional[bytes]:
+        with self._lock:
+            valor = self._datos.get(clave)
+            if valor is not None:
+                self._datos.move_to_end(clave)
+            return valor
+
+    def guardar(self, clave, valor: bytes):
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.capacidad:
+                self._datos.popitem(last=False)
+
+
+_cache = _CacheComprimidos(COMPRESSION_CACHE_SIZE)
+
+
+def compress_body(cuerpo: bytes, codificacion: str) -> bytes:
+    usar_cache = COMPRESSION_CACHE_SIZE > 0 and len(cuerpo) <= COMPRESSION_CACHE_MAX_BODY
+    if usar_cache:
+        clave = (codificacion, hashlib.blake2b(cuerpo, digest_size=16).digest())
+        comprimido = _cache.obtener(clave)
+        if comprimido is not None:
+            COMPRESSION_CACHE.labels("hit").inc()
+            return comprimido
+        COMPRESSION_CACHE.labels("miss").inc()
+    with span("compress.body", encoding=codificacion, size=len(cuerpo)):
+        comprimido = COMPRESORES[codificacion](cuerpo)
+    if usar_cache:
+        _cache.guardar(clave, comprimido)
+    COMPRESSION_BYTES.labels(codificacion, "in").inc(len(cuerpo))
+    COMPRESSION_BYTES.labels(codificacion, "out").inc(len(comprimido))
+    return comprimido
+
+
+def _es_comprimible(encabezados) -> bool:
+    tipo = b""
+    for nombre, valor in encabezados:
+        if nombre == b"content-encoding":
+            return False
+        if nombre == b"content-type":
+            tipo = valor
+    tipo = tipo.split(b";", 1)[0].strip().decode("latin-1").lower()
+    return tipo in TIPOS_COMPRIMIBLES
+
+
+class CompressionMiddleware:
+    """Middleware ASGI que comprime respuestas completas según Accept-Encoding."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not COMPRESSION_ENABLED or scope.get("method") == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        codificacion = None
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"accept-encoding":
+                codificacion = choose_encoding(valor.decode("latin-1"))
+                break
+        if codificacion is None:
+            await self.app(scope, receive, send)
+            return
+
+        inicio_respuesta = None
+        transmitiendo = False
+
+        async def send_comprimido(message):
+            nonlocal inicio_respuesta, transmitiendo
+            if message["type"] == "http.response.start":
+                if message["status"] in (204, 304) or not _es_comprimible(message.get("headers", [])):
+                    transmitiendo = True
+                    await send(message)
+                else:
+                    # Esperar el cuerpo para decidir
+                    inicio_respuesta = message
+                return
+            if message["type"] != "http.response.body" or transmitiendo:
+                await send(message)
+                return
+
+            cuerpo = message.get("body", b"")
+            if message.get("more_body", False):
+                # Respuesta en streaming: se envía sin comprimir
+                transmitiendo = True
+                await send(inicio_respuesta)
+                await send(message)
+                return
+
+            encabezados = [(n, v) for n, v in inicio_respuesta.get("headers", []) if n not in (b"content-length", b"vary")]
+            vary = [v for n, v in inicio_respuesta.get("headers", []) if n == b"vary"]
+            if len(cuerpo) >= COMPRESSION_MIN_SIZE:
+                if len(cuerpo) >= COMPRESSION_THREAD_THRESHOLD:
+                    cuerpo = await anyio.to_thread.run_sync(compress_body, cuerpo, codificacion)
+                else:
+                    cuerpo = compress_body(cuerpo, codificacion)
+                encabezados.append((b"content-encoding", codificacion.encode("latin-1")))
+            encabezados.append((b"content-length", str(len(cuerpo)).encode("latin-1")))
+            encabezados.append((b"vary", b", ".join(vary + [b"Accept-Encoding"])))
+            await send({**inicio_respuesta, "headers": encabezados})
+            await send({"type": "http.response.body", "body": cuerpo})
+
+        await self.app(scope, receive, send_comprimido)
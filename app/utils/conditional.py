@@ -0,0 +1,112 @@
+# app/utils/conditional.py
+"""
+GET condicionales: ETag débil, If-None-Match, Last-Modified e If-Modified-Since.
+
+El frontend vuelve a pedir las mismas páginas de clientes, pólizas y empresas en cada
+navegación. En vez de cargar y serializar la página completa, el router ejecuta primero
+una consulta de versión (solo id y fecha_actualizacion de las filas de la página y de sus
+relaciones) y deriva de ella el ETag. Si coincide con If-None-Match se responde 304 sin
+cuerpo; si no, se responde normalmente con el ETag para la próxima vez.
+
+Las respuestas llevan `Cache-Control: private, no-cache`: el navegador puede guardarlas,
+pero debe revalidarlas siempre (los datos cambian y dependen del usuario autenticado).
+"""
+import hashlib
+import os
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Iterable, Optional
+
+from fastapi import Request, Response
+
+from app.utils.metrics import REGISTRY
+from app.utils.tracing import span
+
+CONDITIONAL_GET_ENABLED = os.getenv("CONDITIONAL_GET_ENABLED", "1") == "1"
+# Cambiarlo invalida todos los ETag emitidos (p. ej. si cambia el formato de las respuestas)
+ETAG_VERSION = "1"
+
+CONDITIONAL_REQUESTS = REGISTRY.counter(
+    "http_conditional_requests_total", "GET condicionales por endpoint y resultado.", ("endpoint", "result")
+)
+
+
+def weak_etag(*partes) -> str:
+    """ETag débil (W/"...") a partir de cualquier secuencia de valores con repr estable."""
+    digest = hashlib.blake2b(repr((ETAG_VERSION,) + partes).encode("utf-8"), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+
+def page_version(db, version_query, request: Request, total: int, *extra) -> Optional[str]:
+    """ETag de una página: parámetros de la petición, total y versiones de sus filas.
+
+    `version_query` debe seleccionar las mismas filas (mismos filtros, orden, offset y limit)
+    que la consulta de la página, pero solo con columnas de versión (ids y fecha_actualizacion).
+    `extra`: otras versiones de las que depende el cuerpo (p. ej. la firma de la caché de referencia).
+    Con CONDITIONAL_GET_ENABLED=0 no se ejecuta y devuelve None.
+    """
+    if not CONDITIONAL_GET_ENABLED:
+        return None
+    with span("etag.version", path=request.url.path):
+        filas = db.execute(version_query).all()
+    return weak_etag(request.url.path, request.url.query, total, [tuple(fila) for fila in filas], *extra)
+
+
+def _etags(cabecera: str) -> Iterable[str]:
+    for valor in cabecera.split(","):
+        valor = valor.strip()
+        # Comparación débil (RFC 9110 §8.8.3.2): se ignora el prefijo W/
+        yield valor[2:] if valor.startswith("W/") else valor
+
+
+def _truncar(fecha: datetime) -> datetime:
+    """Fecha en UTC con resolución de segundos (la de las fechas HTTP)."""
+    if fecha.tzinfo is None:
+        # Las columnas DateTime se guardan sin zona horaria, en UTC
+        fecha = fecha.replace(tzinfo=timezone.utc)
+    return fecha.astimezone(timezone.utc).replace(microsecond=0)
+
+
+def http_date(fecha: datetime) -> str:
+    return format_datetime(_truncar(fecha), usegmt=True)
+
+
+def not_modified(request: Request, etag: Optional[str], last_modified: Optional[datetime] = None) -> bool:
+    """True si la copia del cliente sigue vigente. If-None-Match tiene prioridad sobre If-Modified-Since."""
+    if not CONDITIONAL_GET_ENABLED:
+        return False
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if etag is None:
+            return False
+        valor = etag[2:] if etag.startswith("W/") else etag
+        return any(candidato in ("*", valor) for candidato in _etags(if_none_match))
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if desde.tzinfo is None:
+            return False
+        return _truncar(last_modified) <= desde
+    return False
+
+
+def cache_headers(etag: Optional[str], last_modified: Optional[datetime] = None) -> Dict[str, str]:
+    encabezados = {"Cache-Control": "private, no-cache"}
+    if etag is not None:
+        encabezados["ETag"] = etag
+    if last_modified is not None:
+        encabezados["Last-Modified"] = http_date(last_modified)
+    return encabezados
+
+
+def conditional_response(request: Request, endpoint: str, etag: Optional[str],
+                         last_modified: Optional[datetime] = None) -> Optional[Response]:
+    """Respuesta 304 si el cliente ya tiene la versión vigente; None si hay que responder completo."""
+    if not_modified(request, etag, last_modified):
+        CONDITIONAL_REQUESTS.labels(endpoint, "not_modified").inc()
+        return Response(status_code=304, headers=cache_headers(etag, last_modified))
+    CONDITIONAL_REQUESTS.labels(endpoint, "full").inc()
+    return None
@@ -0,0 +1,87 @@
+# app/utils/db_errors.py
+"""
+Traducción de IntegrityError a respuestas HTTP.
+
+La unicidad (cédula, email, RIF, username) y la existencia de las claves foráneas las
+garantizan los índices y restricciones de la base de datos: los handlers escriben
+directamente y, si el flush viola una restricción, responden con el mismo 409/404 que antes
+daban las consultas previas. Así se ahorra un viaje a la base por cada comprobación y dos
+altas concurrentes con la misma cédula ya no pueden pasar ambas la validación.
+
+    try:
+        db.flush()
+    except IntegrityError as e:
+        db.rollback()
+        raise integrity_http_error(e, "clientes", {"cedula": "La cédula ya existe"})
+"""
+import re
+from typing import Dict, Optional
+
+from fastapi import HTTPException, status
+from sqlalchemy.exc import IntegrityError
+
+# SQLSTATE de Postgres
+_UNIQUE_VIOLATION = "23505"
+_FOREIGN_KEY_VIOLATION = "23503"
+
+
+def _pgcode(error: IntegrityError) -> Optional[str]:
+    return getattr(error.orig, "pgcode", None)
+
+
+def is_unique_violation(error: IntegrityError) -> bool:
+    codigo = _pgcode(error)
+    if codigo:
+        return codigo == _UNIQUE_VIOLATION
+    return "UNIQUE constraint failed" in str(error.orig)
+
+
+def is_foreign_key_violation(error: IntegrityError) -> bool:
+    codigo = _pgcode(error)
+    if codigo:
+        return codigo == _FOREIGN_KEY_VIOLATION
+    return "FOREIGN KEY constraint failed" in str(error.orig)
+
+
+def violated_column(error: IntegrityError, tabla: str) -> Optional[str]:
+    """Columna de la restricción violada, si el mensaje del driver permite identificarla."""
+    mensaje = str(error.orig)
+    # SQLite: "UNIQUE constraint failed: clientes.cedula"
+    coincidencia = re.search(rf"\b{re.escape(tabla)}\.(\w+)", mensaje)
+    if coincidencia:
+        return coincidencia.group(1)
+    # Postgres: "DETAIL:  Key (cedula)=(V123) already exists." / "Key (empresa_aseguradora_id)=(9) is not present ..."
+    coincidencia = re.search(r"Key \((\w+)\)=", mensaje)
+    if coincidencia:
+        return coincidencia.group(1)
+    # Nombre de la restricción: ix_clientes_cedula (unique=True, index=True), clientes_cedula_key, asesores_empresa_aseguradora_id_fkey
+    diag = getattr(error.orig, "diag", None)
+    nombre = getattr(diag, "constraint_name", None) or ""
+    coincidencia = re.match(rf"(?:ix_)?{re.escape(tabla)}_(\w+?)(?:_key|_fkey)?$", nombre)
+    return coincidencia.group(1) if coincidencia else None
+
+
+def integrity_http_error(error: IntegrityError, tabla: str, unicos: Dict[str, str],
+                         foraneas: Optional[Dict[str, str]] = None) -> Exception:
+    """
+    Excepción a lanzar para un IntegrityError del flush de `tabla`:
+    409 con el mensaje de `unicos[columna]`, 404 con el de `foraneas[columna]`, o el propio
+    error (500) si no corresponde a ninguna de las restricciones conocidas.
+    El llamador debe hacer rollback antes de lanzarla.
+    """
+    foraneas = foraneas or {}
+    columna = violated_column(error, tabla)
+    if is_unique_violation(error):
+        mensajes, codigo = unicos, status.HTTP_409_CONFLICT
+    elif is_foreign_key_violation(error):
+        mensajes, codigo = foraneas, status.HTTP_404_NOT_FOUND
+    else:
+        return error
+    if columna not in mensajes and len(mensajes) == 1:
+        # SQLite no indica la columna de una clave foránea violada
+        columna = next(iter(mensajes))
+    if columna not in mensajes:
+        print(f"ERROR DB: [INTEGRITY] Restricción no reconocida en '{tabla}': {error.orig}")
+        return error
+    print(f"DEBUG BACKEND: [INTEGRITY] Restricción violada en '{tabla}.{columna}' -> {codigo}")
+    return HTTPException(status_code=codigo, detail=mensajes[columna])
@@ -0,0 +1,287 @@
+# app/utils/idempotency.py
+"""
+Soporte de Idempotency-Key para los POST de alta (pólizas, reclamaciones, comisiones).
+
+Los clientes móviles reintentan el POST cuando vence el timeout, aunque el servidor sí lo
+haya procesado. Con el encabezado `Idempotency-Key: <uuid>`:
+
+- La primera petición reserva la clave (fila "en_proceso" en claves_idempotencia, única por
+  usuario y clave), ejecuta el handler y guarda la respuesta durante IDEMPOTENCY_TTL segundos.
+- Un reintento con la misma clave recibe la respuesta guardada, con `Idempotent-Replayed: true`,
+  sin volver a ejecutar el handler.
+- Un duplicado que llega mientras la primera sigue en curso espera a que termine (evento local
+  si está en el mismo worker; si no, consultando la tabla) y recibe la misma respuesta.
+- La misma clave con otro cuerpo u otra ruta responde 422.
+
+Solo se guardan respuestas definitivas: un 5xx o un error de autenticación liberan la clave
+para que el reintento se ejecute de nuevo. Sin el encabezado, nada cambia.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+import anyio
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app.db.database import SessionLocal
+from app.models.idempotencia import ClaveIdempotencia
+from app.utils.auth import decode_access_token
+from app.utils.metrics import REGISTRY
+
+IDEMPOTENCY_ENABLED = os.getenv("IDEMPOTENCY_ENABLED", "1") == "1"
+# Rutas (exactas) de los POST que aceptan Idempotency-Key
+IDEMPOTENCY_PATHS = tuple(
+    ruta.strip() for ruta in os.getenv(
+        "IDEMPOTENCY_PATHS", "/api/v1/polizas/polizas/,/api/v1/reclamaciones/,/api/v1/comisiones/"
+    ).split(",") if ruta.strip()
+)
+# Tiempo durante el que se guarda una respuesta para reintentos
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", str(24 * 3600)))
+# Una reserva "en_proceso" más antigua que esto se considera abandonada (worker caído)
+IDEMPOTENCY_LOCK_TIMEOUT = int(os.getenv("IDEMPOTENCY_LOCK_TIMEOUT", "60"))
+# Máximo que espera un duplicado concurrente antes de responder 409
+IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+# Intervalo de consulta a la tabla cuando la primera ejecución está en otro worker
+IDEMPOTENCY_POLL_INTERVAL = float(os.getenv("IDEMPOTENCY_POLL_INTERVAL", "0.25"))
+# Respuestas más grandes que esto no se guardan
+IDEMPOTENCY_MAX_BODY = int(os.getenv("IDEMPOTENCY_MAX_BODY", str(1024 * 1024)))
+# Cada cuánto se borran las claves expiradas (como mucho)
+IDEMPOTENCY_PURGE_INTERVAL = float(os.getenv("IDEMPOTENCY_PURGE_INTERVAL", "300"))
+
+_MAX_LONGITUD_CLAVE = 255
+# Respuestas que no se guardan: el reintento debe ejecutarse de nuevo
+_NO_DEFINITIVAS = {401, 403, 408, 429}
+# Encabezados de la respuesta que no se guardan para el replay
+_ENCABEZADOS_EXCLUIDOS = {b"content-length", b"set-cookie", b"server-timing", b"date"}
+
+IDEMPOTENCY_REQUESTS = REGISTRY.counter(
+    "http_idempotency_requests_total",
+    "Peticiones con Idempotency-Key por resultado (executed, replayed, waited, mismatch, conflict).",
+    ("result",),
+)
+
+# Ejecuciones en curso en este worker: los duplicados esperan al evento en lugar de consultar la tabla
+_en_curso: Dict[Tuple[str, str], asyncio.Event] = {}
+_ultima_purga = 0.0
+
+
+def _ahora() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _reservar(usuario: str, clave: str, huella: str):
+    """
+    Intenta reservar la clave. Devuelve ("reservada", None), ("existente", fila) o
+    ("reintentar", None) si la fila que lo impedía ya expiró y se borró.
+    """
+    ahora = _ahora()
+    with SessionLocal() as db:
+        try:
+            db.execute(insert(ClaveIdempotencia).values(
+                usuario=usuario, clave=clave, huella=huella, estado="en_proceso",
+                fecha_creacion=ahora, expira=ahora + timedelta(seconds=IDEMPOTENCY_LOCK_TIMEOUT),
+            ))
+            db.commit()
+            return "reservada", None
+        except IntegrityError:
+            db.rollback()
+        fila = db.execute(
+            select(ClaveIdempotencia.id, ClaveIdempotencia.huella, ClaveIdempotencia.estado, ClaveIdempotencia.expira,
+                   ClaveIdempotencia.status_code, ClaveIdempotencia.encabezados, ClaveIdempotencia.cuerpo)
+            .where(ClaveIdempotencia.usuario == usuario, ClaveIdempotencia.clave == clave)
+        ).first()
+        if fila is None:
+            return "reintentar", None
+        if fila.expira <= ahora:
+            db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.id == fila.id, ClaveIdempotencia.expira <= ahora))
+            db.commit()
+            return "reintentar", None
+        return "existente", fila
+
+
+def _guardar(usuario: str, clave: str, status_code: int, encabezados, cuerpo: bytes):
+    global _ultima_purga
+    ahora = _ahora()
+    with SessionLocal() as db:
+        db.execute(
+            update(ClaveIdempotencia)
+            .where(ClaveIdempotencia.usuario == usuario, ClaveIdempotencia.clave == clave)
+            .values(estado="completada", status_code=status_code, cuerpo=cuerpo,
+                    encabezados=json.dumps([[n.decode("latin-1"), v.decode("latin-1")] for n, v in encabezados]),
+                    expira=ahora + timedelta(seconds=IDEMPOTENCY_TTL))
+        )
+        if time.monotonic() - _ultima_purga >= IDEMPOTENCY_PURGE_INTERVAL:
+            _ultima_purga = time.monotonic()
+            borradas = db.execute(delete(ClaveIdempotencia).where(ClaveIdempotencia.expira <= ahora)).rowcount
+            if borradas:
+                print(f"DEBUG BACKEND: [IDEMPOTENCY] {borradas} claves expiradas eliminadas.")
+        db.commit()
+
+
+def _liberar(usuario: str, clave: str):
+    with SessionLocal() as db:
+        db.execute(delete(ClaveIdempotencia).where(
+            ClaveIdempotencia.usuario == usuario, ClaveIdempotencia.clave == clave, ClaveIdempotencia.estado == "en_proceso"
+        ))
+        db.commit()
+
+
+async def _liberar_sin_error(usuario: str, clave: str):
+    try:
+        await anyio.to_thread.run_sync(_liberar, usuario, clave)
+    except Exception as e:
+        print(f"ERROR DB: [IDEMPOTENCY] No se pudo liberar la clave '{clave}': {e}")
+
+
+async def _responder(send, status_code: int, encabezados, cuerpo: bytes):
+    encabezados = list(encabezados) + [(b"content-length", str(len(cuerpo)).encode("latin-1"))]
+    await send({"type": "http.response.start", "status": status_code, "headers": encabezados})
+    await send({"type": "http.response.body", "body": cuerpo})
+
+
+async def _error(send, status_code: int, detalle: str, extra=()):
+    cuerpo = json.dumps({"detail": detalle}).encode("utf-8")
+    await _responder(send, status_code, [(b"content-type", b"application/json"), *extra], cuerpo)
+
+
+def _usuario(scope) -> Optional[str]:
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            if esquema.lower() != "bearer" or not token:
+                return None
+            try:
+                return decode_access_token(token.strip()).get("sub")
+            except Exception:
+                return None
+    return None
+
+
+class IdempotencyMiddleware:
+    """Middleware ASGI que aplica Idempotency-Key a los POST de IDEMPOTENCY_PATHS."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or not IDEMPOTENCY_ENABLED or scope.get("method") != "POST"
+                or scope.get("path") not in IDEMPOTENCY_PATHS):
+            await self.app(scope, receive, send)
+            return
+
+        clave = None
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"idempotency-key":
+                clave = valor.decode("latin-1").strip()
+                break
+        if clave is None:
+            await self.app(scope, receive, send)
+            return
+        if not clave or len(clave) > _MAX_LONGITUD_CLAVE:
+            await _error(send, 400, f"Idempotency-Key debe tener entre 1 y {_MAX_LONGITUD_CLAVE} caracteres")
+            return
+        usuario = _usuario(scope)
+        if usuario is None:
+            # Sin token válido el handler responderá 401: no hay nada que reservar
+            await self.app(scope, receive, send)
+            return
+
+        # El cuerpo se lee completo para calcular la huella y luego se entrega tal cual al handler
+        partes = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            partes.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        cuerpo_peticion = b"".join(partes)
+        huella = hashlib.sha256(
+            b"\n".join([scope["method"].encode(), scope["path"].encode(), scope.get("query_string", b""), cuerpo_peticion])
+        ).hexdigest()
+
+        limite = time.monotonic() + IDEMPOTENCY_WAIT_TIMEOUT
+        espero = False
+        while True:
+            resultado, fila = await anyio.to_thread.run_sync(_reservar, usuario, clave, huella)
+            if resultado == "reservada":
+                break
+            if resultado == "reintentar":
+                continue
+            if fila.huella != huella:
+                IDEMPOTENCY_REQUESTS.labels("mismatch").inc()
+                await _error(send, 422, "Idempotency-Key ya usada con otra petición (ruta o cuerpo distintos)")
+                return
+            if fila.estado == "completada":
+                IDEMPOTENCY_REQUESTS.labels("waited" if espero else "replayed").inc()
+                print(f"DEBUG BACKEND: [IDEMPOTENCY] Respuesta guardada reenviada a '{usuario}' (clave {clave}).")
+                encabezados = [(n.encode("latin-1"), v.encode("latin-1")) for n, v in json.loads(fila.encabezados or "[]")]
+                encabezados.append((b"idempotent-replayed", b"true"))
+                await _responder(send, fila.status_code, encabezados, fila.cuerpo or b"")
+                return
+            # La primera ejecución sigue en curso: esperar a que termine
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                IDEMPOTENCY_REQUESTS.labels("conflict").inc()
+                await _error(send, 409, "Hay una petición en curso con la misma Idempotency-Key", [(b"retry-after", b"1")])
+                return
+            espero = True
+            evento = _en_curso.get((usuario, clave))
+            if evento is not None:
+                try:
+                    await asyncio.wait_for(evento.wait(), timeout=restante)
+                except asyncio.TimeoutError:
+                    pass
+            else:
+                await asyncio.sleep(min(IDEMPOTENCY_POLL_INTERVAL, restante))
+
+        IDEMPOTENCY_REQUESTS.labels("executed").inc()
+        evento = _en_curso[(usuario, clave)] = asyncio.Event()
+        entregado = False
+
+        async def receive_con_cuerpo():
+            nonlocal entregado
+            if not entregado:
+                entregado = True
+                return {"type": "http.request", "body": cuerpo_peticion, "more_body": False}
+            return await receive()
+
+        inicio_respuesta = None
+        cuerpo_respuesta = []
+
+        async def send_capturando(message):
+            nonlocal inicio_respuesta
+            if message["type"] == "http.response.start":
+                inicio_respuesta = message
+            elif message["type"] == "http.response.body":
+                cuerpo_respuesta.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            try:
+                await self.app(scope, receive_con_cuerpo, send_capturando)
+            except BaseException:
+                # El handler falló: liberar la clave para que el reintento se ejecute
+                with anyio.CancelScope(shield=True):
+                    await _liberar_sin_error(usuario, clave)
+                raise
+            cuerpo = b"".join(cuerpo_respuesta)
+            codigo = inicio_respuesta["status"] if inicio_respuesta else 500
+            if codigo < 500 and codigo not in _NO_DEFINITIVAS and len(cuerpo) <= IDEMPOTENCY_MAX_BODY:
+                encabezados = [(n, v) for n, v in inicio_respuesta.get("headers", []) if n.lower() not in _ENCABEZADOS_EXCLUIDOS]
+                try:
+                    await anyio.to_thread.run_sync(_guardar, usuario, clave, codigo, encabezados, cuerpo)
+                except Exception as e:
+                    # La respuesta ya se envió: solo se pierde la protección frente a reintentos
+                    print(f"ERROR DB: [IDEMPOTENCY] No se pudo guardar la respuesta de la clave '{clave}': {e}")
+                    await _liberar_sin_error(usuario, clave)
+            else:
+                await _liberar_sin_error(usuario, clave)
+        finally:
+            _en_curso.pop((usuario, clave), None)
+            evento.set()
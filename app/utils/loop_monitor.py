@@ -0,0 +1,134 @@
+# app/utils/loop_monitor.py
+"""
+Monitor de lag del event loop.
+
+Los routers son `async def` pero hacen trabajo síncrono (SQL, argon2, pandas, pydantic),
+lo que bloquea el event loop. Este monitor:
+- mide el lag con una corrutina que duerme LOOP_LAG_INTERVAL_MS y compara el tiempo real;
+- vigila desde un hilo aparte: si el loop no "late" en LOOP_LAG_THRESHOLD_MS, registra
+  la ruta de la petición en curso y la pila del hilo del loop en ese momento;
+- expone percentiles del lag y el conteo de bloqueos por ruta en /metrics.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from typing import Optional
+
+from app.utils.metrics import REGISTRY
+
+LOOP_LAG_ENABLED = os.getenv("LOOP_LAG_ENABLED", "1") == "1"
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv("LOOP_LAG_THRESHOLD_MS", "200"))
+
+# Muestras recientes de lag (segundos) para calcular percentiles
+_muestras = deque(maxlen=4096)
+
+# Tarea asyncio -> scope ASGI de la petición que atiende (para saber qué ruta bloqueó)
+_scopes_por_tarea: "weakref.WeakKeyDictionary[asyncio.Task, dict]" = weakref.WeakKeyDictionary()
+
+LOOP_BLOCKED_TOTAL = REGISTRY.counter(
+    "event_loop_blocked_total", "Veces que el event loop quedó bloqueado por encima del umbral.", ("route",)
+)
+
+
+def _percentiles():
+    muestras = sorted(_muestras)
+    if not muestras:
+        return
+    for cuantil in (0.5, 0.9, 0.99):
+        indice = min(len(muestras) - 1, int(cuantil * len(muestras)))
+        yield (str(cuantil),), muestras[indice]
+    yield ("max",), muestras[-1]
+
+
+REGISTRY.callback_gauge(
+    "event_loop_lag_seconds", "Percentiles del lag del event loop sobre las muestras recientes.", ("quantile",), _percentiles
+)
+
+
+def _ruta_de_scope(scope: Optional[dict]) -> str:
+    if not scope:
+        return "<sin_peticion>"
+    ruta = getattr(scope.get("route"), "path", None)
+    return f"{scope.get('method', '')} {ruta or scope.get('path', '')}"
+
+
+class LoopLagMonitor:
+    def __init__(self, intervalo: float, umbral: float):
+        self.intervalo = intervalo
+        self.umbral = umbral
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._hilo_loop: Optional[int] = None
+        self._tarea: Optional[asyncio.Task] = None
+        self._vigilante: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._ultimo_latido = time.monotonic()
+        self._latido_reportado = 0.0
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._hilo_loop = threading.get_ident()
+        self._ultimo_latido = time.monotonic()
+        self._detener.clear()
+        self._tarea = self._loop.create_task(self._medir())
+        self._vigilante = threading.Thread(target=self._vigilar, name="loop-lag-watchdog", daemon=True)
+        self._vigilante.start()
+        print(f"DEBUG BACKEND: [LOOP_LAG] Monitor iniciado (intervalo={self.intervalo * 1000:.0f}ms, umbral={self.umbral * 1000:.0f}ms).")
+
+    async def stop(self):
+        self._detener.set()
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+
+    async def _medir(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            inicio = loop.time()
+            await asyncio.sleep(self.intervalo)
+            lag = max(0.0, loop.time() - inicio - self.intervalo)
+            _muestras.append(lag)
+            self._ultimo_latido = time.monotonic()
+
+    def _vigilar(self):
+        while not self._detener.wait(self.intervalo / 2):
+            latido = self._ultimo_latido
+            bloqueado = time.monotonic() - latido - self.intervalo
+            if bloqueado < self.umbral or latido == self._latido_reportado:
+                continue
+            # Un solo reporte por bloqueo
+            self._latido_reportado = latido
+            self._reportar(bloqueado)
+
+    def _reportar(self, bloqueado: float):
+        tarea = asyncio.current_task(self._loop)
+        ruta = _ruta_de_scope(_scopes_por_tarea.get(tarea) if tarea is not None else None)
+        frame = sys._current_frames().get(self._hilo_loop)
+        pila = "".join(traceback.format_stack(frame)) if frame is not None else "<pila no disponible>"
+        LOOP_BLOCKED_TOTAL.labels(ruta).inc()
+        print(f"DEBUG BACKEND: [LOOP_LAG] Event loop bloqueado {bloqueado * 1000:.0f}ms+ en '{ruta}'. Pila actual:\n{pila}")
+
+
+monitor = LoopLagMonitor(LOOP_LAG_INTERVAL_MS / 1000, LOOP_LAG_THRESHOLD_MS / 1000)
+
+
+class LoopLagMiddleware:
+    """Asocia cada tarea asyncio con la petición que atiende para poder reportar la ruta que bloquea."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and LOOP_LAG_ENABLED:
+            tarea = asyncio.current_task()
+            if tarea is not None:
+                _scopes_por_tarea[tarea] = scope
+        await self.app(scope, receive, send)
@@ -0,0 +1,551 @@
+# app/utils/metrics.py
+"""
+Registro de métricas en proceso con exposición en formato de texto de Prometheus.
+
+El registro de observaciones es "lock-light": cada contador o histograma acumula
+sus observaciones en un deque (append es atómico en CPython) y solo se consolidan
+bajo lock al momento del scrape o cuando la cola pendiente crece demasiado.
+Así el camino caliente de cada petición nunca espera por un lock.
+
+Con varios workers (app.serve) cada proceso tiene su propio registro. Si METRICS_MULTIPROC_DIR
+está definido, cada worker vuelca su registro en ese directorio cada METRICS_FLUSH_INTERVAL
+segundos y al salir, y /metrics devuelve la suma de todos: counters e histogramas sumados
+(los de workers ya reciclados se conservan, así las series no vuelven a cero) y los gauges
+de los workers vivos con una etiqueta pid.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE_LATEST = "text/plain; version=0.0.4; charset=utf-8"
+
+# Buckets por defecto para latencias en segundos
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Directorio compartido por los workers (lo define app.serve); sin él, /metrics expone solo este proceso
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", "5"))
+
+# Cantidad de observaciones pendientes a partir de la cual se intenta consolidar en caliente
+_UMBRAL_CONSOLIDACION = 1024
+
+
+def _escapar_valor(valor: str) -> str:
+    return valor.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _formatear_etiquetas(nombres: Sequence[str], valores: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pares = [f'{nombre}="{_escapar_valor(valor)}"' for nombre, valor in zip(nombres, valores)]
+    if extra:
+        pares.append(f'{extra[0]}="{_escapar_valor(extra[1])}"')
+    return "{" + ",".join(pares) + "}" if pares else ""
+
+
+def _formatear_numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    if valor == int(valor):
+        return f"{int(valor)}.0"
+    return repr(float(valor))
+
+
+def _formatear_muestras(nombre: str, tipo: str, etiquetas: Sequence[str], muestras, buckets: Sequence[float] = ()) -> List[str]:
+    lineas = []
+    for clave, valor in muestras:
+        if tipo != "histogram":
+            lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas, clave)} {_formatear_numero(valor)}")
+            continue
+        conteos, suma, total = valor
+        acumulado = 0
+        for limite, conteo in zip(buckets, conteos):
+            acumulado += conteo
+            lineas.append(f"{nombre}_bucket{_formatear_etiquetas(etiquetas, clave, ('le', _formatear_numero(limite)))} {_formatear_numero(acumulado)}")
+        lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas, clave)} {_formatear_numero(suma)}")
+        lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas, clave)} {_formatear_numero(total)}")
+    return lineas
+
+
+class _Pendientes:
+    """Cola de observaciones sin consolidar, compartida por contadores e histogramas."""
+
+    __slots__ = ("_cola", "_lock")
+
+    def __init__(self):
+        self._cola = deque()
+        self._lock = threading.Lock()
+
+    def agregar(self, valor: float, consolidar: Callable[[float], None]):
+        self._cola.append(valor)
+        # Solo consolidamos en caliente si nadie más lo está haciendo (sin bloquear)
+        if len(self._cola) >= _UMBRAL_CONSOLIDACION and self._lock.acquire(False):
+            try:
+                self._vaciar(consolidar)
+            finally:
+                self._lock.release()
+
+    def consolidar(self, consolidar: Callable[[float], None]):
+        with self._lock:
+            self._vaciar(consolidar)
+
+    def _vaciar(self, consolidar: Callable[[float], None]):
+        cola = self._cola
+        while True:
+            try:
+                valor = cola.popleft()
+            except IndexError:
+                return
+            consolidar(valor)
+
+
+class _ContadorHijo:
+    __slots__ = ("_pendientes", "_total")
+
+    def __init__(self):
+        self._pendientes = _Pendientes()
+        self._total = 0.0
+
+    def inc(self, cantidad: float = 1.0):
+        self._pendientes.agregar(cantidad, self._sumar)
+
+    def _sumar(self, cantidad: float):
+        self._total += cantidad
+
+    def valor(self) -> float:
+        self._pendientes.consolidar(self._sumar)
+        return self._total
+
+
+class _GaugeHijo:
+    __slots__ = ("_valor",)
+
+    def __init__(self):
+        self._valor = 0.0
+
+    def set(self, valor: float):
+        # La asignación de un atributo es atómica; no hace falta lock
+        self._valor = float(valor)
+
+    def valor(self) -> float:
+        return self._valor
+
+
+class _HistogramaHijo:
+    __slots__ = ("_pendientes", "_limites", "_conteos", "_suma", "_total")
+
+    def __init__(self, limites: Sequence[float]):
+        self._pendientes = _Pendientes()
+        self._limites = limites
+        self._conteos = [0] * len(limites)
+        self._suma = 0.0
+        self._total = 0
+
+    def observe(self, valor: float):
+        self._pendientes.agregar(valor, self._registrar)
+
+    def _registrar(self, valor: float):
+        for indice, limite in enumerate(self._limites):
+            if valor <= limite:
+                self._conteos[indice] += 1
+                break
+        self._suma += valor
+        self._total += 1
+
+    def instantanea(self) -> Tuple[List[int], float, int]:
+        self._pendientes.consolidar(self._registrar)
+        return list(self._conteos), self._suma, self._total
+
+
+class _Metrica:
+    tipo = "untyped"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()):
+        self.nombre = nombre
+        self.descripcion = descripcion
+        self.etiquetas = tuple(etiquetas)
+        self._hijos: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *valores):
+        clave = tuple(str(valor) for valor in valores)
+        hijo = self._hijos.get(clave)
+        if hijo is None:
+            # Solo se toma el lock la primera vez que aparece una combinación de etiquetas
+            with self._lock:
+                hijo = self._hijos.get(clave)
+                if hijo is None:
+                    hijo = self._nuevo_hijo()
+                    self._hijos[clave] = hijo
+        return hijo
+
+    def _nuevo_hijo(self):
+        raise NotImplementedError
+
+    def _sin_etiquetas(self):
+        return self.labels()
+
+    def _encabezado(self) -> List[str]:
+        return [f"# HELP {self.nombre} {self.descripcion}", f"# TYPE {self.nombre} {self.tipo}"]
+
+    def muestras(self) -> List[Tuple[Tuple[str, ...], object]]:
+        return [(clave, hijo.valor()) for clave, hijo in list(self._hijos.items())]
+
+    def exponer(self) -> List[str]:
+        return self._encabezado() + _formatear_muestras(self.nombre, self.tipo, self.etiquetas, self.muestras())
+
+
+class Counter(_Metrica):
+    tipo = "counter"
+
+    def _nuevo_hijo(self):
+        return _ContadorHijo()
+
+    def inc(self, cantidad: float = 1.0):
+        self._sin_etiquetas().inc(cantidad)
+
+
+class Gauge(_Metrica):
+    tipo = "gauge"
+
+    def _nuevo_hijo(self):
+        return _GaugeHijo()
+
+    def set(self, valor: float):
+        self._sin_etiquetas().set(valor)
+
+
+class CallbackGauge(_Metrica):
+    """Gauge cuyo valor se calcula en el momento del scrape (ej. estado del pool de conexiones)."""
+
+    tipo = "gauge"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str], funcion: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        super().__init__(nombre, descripcion, etiquetas)
+        self._funcion = funcion
+
+    def muestras(self) -> List[Tuple[Tuple[str, ...], float]]:
+        try:
+            return [(tuple(str(v) for v in valores), valor) for valores, valor in self._funcion()]
+        except Exception as e:
+            print(f"DEBUG BACKEND: [METRICS] Error calculando '{self.nombre}': {e}")
+            return []
+
+
+class Histogram(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(nombre, descripcion, etiquetas)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def _nuevo_hijo(self):
+        return _HistogramaHijo(self.buckets)
+
+    def observe(self, valor: float):
+        self._sin_etiquetas().observe(valor)
+
+    def muestras(self) -> List[Tuple[Tuple[str, ...], Tuple[List[int], float, int]]]:
+        return [(clave, hijo.instantanea()) for clave, hijo in list(self._hijos.items())]
+
+    def exponer(self) -> List[str]:
+        return self._encabezado() + _formatear_muestras(self.nombre, self.tipo, self.etiquetas, self.muestras(), self.buckets)
+
+
+class MetricsRegistry:
+    """Registro de todas las métricas del proceso."""
+
+    def __init__(self):
+        self._metricas: Dict[str, _Metrica] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, metrica: _Metrica) -> _Metrica:
+        with self._lock:
+            existente = self._metricas.get(metrica.nombre)
+            if existente is not None:
+                return existente
+            self._metricas[metrica.nombre] = metrica
+            return metrica
+
+    def counter(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()) -> Counter:
+        return self._registrar(Counter(nombre, descripcion, etiquetas))
+
+    def gauge(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = ()) -> Gauge:
+        return self._registrar(Gauge(nombre, descripcion, etiquetas))
+
+    def callback_gauge(self, nombre: str, descripcion: str, etiquetas: Sequence[str], funcion) -> CallbackGauge:
+        return self._registrar(CallbackGauge(nombre, descripcion, etiquetas, funcion))
+
+    def histogram(self, nombre: str, descripcion: str, etiquetas: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._registrar(Histogram(nombre, descripcion, etiquetas, buckets))
+
+    def render(self) -> bytes:
+        lineas: List[str] = []
+        for metrica in list(self._metricas.values()):
+            lineas.extend(metrica.exponer())
+        return ("\n".join(lineas) + "\n").encode("utf-8")
+
+    def instantanea(self) -> dict:
+        """Estado de todas las métricas en un dict serializable a JSON (para agregar entre workers)."""
+        return {
+            metrica.nombre: {
+                "tipo": metrica.tipo,
+                "descripcion": metrica.descripcion,
+                "etiquetas": list(metrica.etiquetas),
+                # Sin el +Inf final, que no es JSON válido
+                "buckets": list(metrica.buckets[:-1]) if isinstance(metrica, Histogram) else [],
+                "muestras": [[list(clave), valor] for clave, valor in metrica.muestras()],
+            }
+            for metrica in list(self._metricas.values())
+        }
+
+
+REGISTRY = MetricsRegistry()
+
+# --- Métricas HTTP ---
+HTTP_REQUESTS_TOTAL = REGISTRY.counter(
+    "http_requests_total", "Total de peticiones HTTP atendidas.", ("method", "route", "status")
+)
+HTTP_REQUEST_DURATION = REGISTRY.histogram(
+    "http_request_duration_seconds", "Latencia de las peticiones HTTP en segundos.", ("method", "route")
+)
+
+# --- Métricas de autenticación ---
+AUTH_TOKEN_CACHE = REGISTRY.counter(
+    "auth_token_cache_requests_total", "Búsquedas en la caché de tokens JWT decodificados.", ("result",)
+)
+
+# --- Métricas de importación de clientes ---
+IMPORT_ROWS_TOTAL = REGISTRY.counter(
+    "clientes_import_rows_total", "Filas procesadas por la importación de clientes.", ("result",)
+)
+IMPORT_DURATION = REGISTRY.histogram(
+    "clientes_import_duration_seconds", "Duración de cada importación de clientes en segundos.",
+    buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+IMPORT_ROWS_PER_SECOND = REGISTRY.gauge(
+    "clientes_import_rows_per_second", "Throughput (filas/segundo) de la última importación de clientes."
+)
+
+# Ruta usada cuando la petición no coincidió con ninguna ruta (evita cardinalidad infinita)
+RUTA_SIN_COINCIDENCIA = "<sin_ruta>"
+
+
+def register_db_pool_metrics(engine):
+    """Registra gauges que leen el estado del pool de conexiones en cada scrape."""
+
+    def _estado_pool():
+        pool = engine.pool
+        for nombre in ("size", "checkedin", "checkedout", "overflow"):
+            funcion = getattr(pool, nombre, None)
+            if callable(funcion):
+                yield (nombre,), funcion()
+
+    REGISTRY.callback_gauge("db_pool_connections", "Estado del pool de conexiones de la base de datos.", ("state",), _estado_pool)
+
+
+def record_import(importadas: int, errores: int, duracion: float):
+    """Registra el resultado de una importación masiva de clientes."""
+    IMPORT_ROWS_TOTAL.labels("imported").inc(importadas)
+    IMPORT_ROWS_TOTAL.labels("error").inc(errores)
+    IMPORT_DURATION.observe(duracion)
+    if duracion > 0:
+        IMPORT_ROWS_PER_SECOND.set((importadas + errores) / duracion)
+
+
+# --- Agregación entre workers (METRICS_MULTIPROC_DIR) ---
+
+# Counters e histogramas de los workers que ya salieron (reciclados o caídos)
+_ACUMULADO = "acumulado.json"
+_PREFIJO_WORKER = "worker-"
+
+
+def _ruta(nombre: str) -> str:
+    return os.path.join(METRICS_MULTIPROC_DIR, nombre)
+
+
+def _escribir_json(ruta: str, datos: dict):
+    # Escritura atómica: quien lee nunca ve un archivo a medio escribir
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    with open(temporal, "w") as f:
+        json.dump(datos, f)
+    os.replace(temporal, ruta)
+
+
+def _leer_json(ruta: str) -> dict:
+    try:
+        with open(ruta) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _archivos_workers() -> List[Tuple[int, str]]:
+    archivos = []
+    for nombre in os.listdir(METRICS_MULTIPROC_DIR):
+        if nombre.startswith(_PREFIJO_WORKER) and nombre.endswith(".json"):
+            try:
+                archivos.append((int(nombre[len(_PREFIJO_WORKER):-len(".json")]), _ruta(nombre)))
+            except ValueError:
+                continue
+    return archivos
+
+
+def _proceso_vivo(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@contextmanager
+def _bloqueo_directorio():
+    # fcntl solo existe en Unix, igual que gunicorn: se importa solo en modo multi-worker
+    import fcntl
+    with open(_ruta(".lock"), "w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+
+def _sumar(destino: dict, instantanea: dict, pid: Optional[int] = None):
+    """
+    Suma en `destino` los counters e histogramas de una instantánea. Los gauges no se suman:
+    se agregan con la etiqueta pid si el worker sigue vivo y se descartan si no (pid None).
+    """
+    for nombre, metrica in instantanea.items():
+        es_gauge = metrica["tipo"] == "gauge"
+        if es_gauge and pid is None:
+            continue
+        agregada = destino.get(nombre)
+        if agregada is None:
+            etiquetas = list(metrica["etiquetas"]) + (["pid"] if es_gauge else [])
+            agregada = destino[nombre] = {**metrica, "etiquetas": etiquetas, "muestras": {}}
+        muestras = agregada["muestras"]
+        for clave, valor in metrica["muestras"]:
+            clave = tuple(clave) + ((str(pid),) if es_gauge else ())
+            previo = muestras.get(clave)
+            if previo is None:
+                muestras[clave] = valor
+            elif metrica["tipo"] == "histogram":
+                muestras[clave] = [[a + b for a, b in zip(previo[0], valor[0])], previo[1] + valor[1], previo[2] + valor[2]]
+            elif not es_gauge:
+                muestras[clave] = previo + valor
+
+
+def _a_instantanea(agregado: dict) -> dict:
+    return {
+        nombre: {**metrica, "muestras": [[list(clave), valor] for clave, valor in metrica["muestras"].items()]}
+        for nombre, metrica in agregado.items()
+    }
+
+
+def prepare_multiprocess_dir():
+    """Deja vacío el directorio compartido. La llama el proceso maestro antes de crear los workers."""
+    if not METRICS_MULTIPROC_DIR:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    for nombre in os.listdir(METRICS_MULTIPROC_DIR):
+        try:
+            os.remove(_ruta(nombre))
+        except OSError:
+            pass
+    print(f"DEBUG BACKEND: [METRICS] Directorio de métricas multi-worker: {METRICS_MULTIPROC_DIR}")
+
+
+def flush_metrics():
+    """Vuelca el registro de este worker al directorio compartido."""
+    if not METRICS_MULTIPROC_DIR:
+        return
+    try:
+        _escribir_json(_ruta(f"{_PREFIJO_WORKER}{os.getpid()}.json"), REGISTRY.instantanea())
+    except OSError as e:
+        print(f"DEBUG BACKEND: [METRICS] No se pudo volcar el registro del worker {os.getpid()}: {e}")
+
+
+def start_metrics_flusher():
+    """Arranca (en cada worker, tras el fork) el hilo que vuelca el registro periódicamente."""
+    if not METRICS_MULTIPROC_DIR:
+        return
+
+    def _volcar_periodicamente():
+        while True:
+            time.sleep(METRICS_FLUSH_INTERVAL)
+            flush_metrics()
+
+    threading.Thread(target=_volcar_periodicamente, name="metrics-flush", daemon=True).start()
+
+
+def render_metrics() -> bytes:
+    """
+    Métricas en formato de texto de Prometheus: las de todos los workers si hay directorio
+    compartido (las de los demás con hasta METRICS_FLUSH_INTERVAL s de retraso), o las del proceso.
+    """
+    if not METRICS_MULTIPROC_DIR:
+        return REGISTRY.render()
+    flush_metrics()
+    agregado: dict = {}
+    with _bloqueo_directorio():
+        acumulado = _leer_json(_ruta(_ACUMULADO))
+        _sumar(agregado, acumulado)
+        muertos = []
+        for pid, ruta in _archivos_workers():
+            if _proceso_vivo(pid):
+                _sumar(agregado, _leer_json(ruta), pid)
+            else:
+                muertos.append(ruta)
+        if muertos:
+            # Los workers que ya salieron pasan al acumulado: sus totales se conservan y los
+            # archivos no crecen con cada reciclaje
+            plegado: dict = {}
+            _sumar(plegado, acumulado)
+            for ruta in muertos:
+                instantanea = _leer_json(ruta)
+                _sumar(plegado, instantanea)
+                _sumar(agregado, instantanea)
+            _escribir_json(_ruta(_ACUMULADO), _a_instantanea(plegado))
+            for ruta in muertos:
+                os.remove(ruta)
+    lineas: List[str] = []
+    for nombre, metrica in agregado.items():
+        lineas.append(f"# HELP {nombre} {metrica['descripcion']}")
+        lineas.append(f"# TYPE {nombre} {metrica['tipo']}")
+        buckets = tuple(metrica["buckets"]) + (float("inf"),)
+        lineas.extend(_formatear_muestras(nombre, metrica["tipo"], metrica["etiquetas"], metrica["muestras"].items(), buckets))
+    return ("\n".join(lineas) + "\n").encode("utf-8")
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que registra conteo, código de estado y latencia por ruta.
+    Usa la plantilla de la ruta (ej. /api/v1/clientes/{cliente_id}) como etiqueta.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        inicio = time.perf_counter()
+        estado = [500]
+
+        async def send_con_estado(message):
+            if message["type"] == "http.response.start":
+                estado[0] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_estado)
+        finally:
+            duracion = time.perf_counter() - inicio
+            ruta = getattr(scope.get("route"), "path", None) or RUTA_SIN_COINCIDENCIA
+            metodo = scope.get("method", "")
+            HTTP_REQUESTS_TOTAL.labels(metodo, ruta, estado[0]).inc()
+            HTTP_REQUEST_DURATION.labels(metodo, ruta).observe(duracion)
@@ -0,0 +1,160 @@
+# app/utils/profiler.py
+"""
+Perfilado bajo demanda de peticiones individuales.
+
+Una petición con `X-Profile: 1` enviada por un usuario listado en PROFILER_ADMINS se
+ejecuta bajo cProfile. El perfil (.prof para snakeviz/pstats y un resumen .txt) se
+guarda en PROFILE_DIR y se descarga desde /api/v1/profiles/{profile_id}.
+Las peticiones sin el encabezado no pagan ningún costo adicional.
+
+Nota: cProfile mide el hilo del event loop, así que si otras peticiones se intercalan
+con la perfilada también aparecerán en el perfil. El código que corre en el threadpool
+(dependencias y endpoints síncronos) no queda capturado.
+"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import List, Optional
+
+from jose import JWTError
+
+from app.utils.auth import decode_access_token
+
+PROFILER_ADMINS = {nombre.strip() for nombre in os.getenv("PROFILER_ADMINS", "").split(",") if nombre.strip()}
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "insurtech-profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+# Cantidad de funciones incluidas en el resumen de texto
+PROFILE_TEXT_LINES = 60
+
+PROFILE_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+
+# cProfile no admite dos perfiladores activos a la vez en el mismo intérprete
+_perfilando = threading.Lock()
+
+
+def is_profiler_admin(username: Optional[str]) -> bool:
+    return bool(username) and username in PROFILER_ADMINS
+
+
+def profile_path(profile_id: str, extension: str) -> Optional[str]:
+    """Devuelve la ruta de un perfil guardado, o None si el ID no es válido o no existe."""
+    if not PROFILE_ID_RE.match(profile_id) or extension not in ("prof", "txt"):
+        return None
+    ruta = os.path.join(PROFILE_DIR, f"{profile_id}.{extension}")
+    return ruta if os.path.exists(ruta) else None
+
+
+def list_profiles() -> List[dict]:
+    """Lista los perfiles guardados, del más reciente al más antiguo."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    perfiles = []
+    for nombre in os.listdir(PROFILE_DIR):
+        if nombre.endswith(".txt"):
+            ruta = os.path.join(PROFILE_DIR, nombre)
+            with open(ruta, encoding="utf-8") as f:
+                titulo = f.readline().strip()
+            perfiles.append({"profile_id": nombre[:-4], "descripcion": titulo, "creado": os.path.getmtime(ruta)})
+    return sorted(perfiles, key=lambda p: p["creado"], reverse=True)
+
+
+def _guardar_perfil(profile_id: str, perfilador: cProfile.Profile, titulo: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    perfilador.dump_stats(os.path.join(PROFILE_DIR, f"{profile_id}.prof"))
+
+    salida = io.StringIO()
+    estadisticas = pstats.Stats(perfilador, stream=salida)
+    estadisticas.strip_dirs().sort_stats("cumulative").print_stats(PROFILE_TEXT_LINES)
+    with open(os.path.join(PROFILE_DIR, f"{profile_id}.txt"), "w", encoding="utf-8") as f:
+        f.write(titulo + "\n\n" + salida.getvalue())
+
+    # Conservar solo los últimos PROFILE_MAX_STORED perfiles
+    antiguos = list_profiles()[PROFILE_MAX_STORED:]
+    for perfil in antiguos:
+        for extension in ("prof", "txt"):
+            ruta = os.path.join(PROFILE_DIR, f"{perfil['profile_id']}.{extension}")
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+
+def _usuario_del_token(scope) -> Optional[str]:
+    for nombre, valor in scope.get("headers", []):
+        if nombre == b"authorization":
+            esquema, _, token = valor.decode("latin-1").partition(" ")
+            if esquema.lower() != "bearer" or not token:
+                return None
+            try:
+                payload = decode_access_token(token)
+            except JWTError:
+                return None
+            if payload.get("exp") and payload["exp"] < time.time():
+                return None
+            return payload.get("sub")
+    return None
+
+
+class ProfilerMiddleware:
+    """Middleware ASGI que perfila las peticiones marcadas con X-Profile por un administrador."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        solicitado = False
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"x-profile":
+                solicitado = valor.strip() not in (b"", b"0")
+                break
+        if not solicitado:
+            await self.app(scope, receive, send)
+            return
+
+        username = _usuario_del_token(scope)
+        if not is_profiler_admin(username):
+            await self.app(scope, receive, self._con_estado(send, b"denied"))
+            return
+        if not _perfilando.acquire(blocking=False):
+            await self.app(scope, receive, self._con_estado(send, b"busy"))
+            return
+
+        profile_id = uuid.uuid4().hex
+        titulo = f"{scope.get('method')} {scope.get('path')}?{scope.get('query_string', b'').decode('latin-1')} (usuario: {username})"
+        print(f"DEBUG BACKEND: [PROFILER] Perfilando {titulo} como {profile_id}")
+
+        async def send_con_perfil(message):
+            if message["type"] == "http.response.start":
+                encabezados = list(message.get("headers", []))
+                encabezados.append((b"x-profile-status", b"stored"))
+                encabezados.append((b"x-profile-id", profile_id.encode("latin-1")))
+                encabezados.append((b"x-profile-url", f"/api/v1/profiles/{profile_id}".encode("latin-1")))
+                message = {**message, "headers": encabezados}
+            await send(message)
+
+        perfilador = cProfile.Profile()
+        try:
+            perfilador.enable()
+            try:
+                await self.app(scope, receive, send_con_perfil)
+            finally:
+                perfilador.disable()
+            _guardar_perfil(profile_id, perfilador, titulo)
+        finally:
+            _perfilando.release()
+
+    @staticmethod
+    def _con_estado(send, estado: bytes):
+        async def send_con_estado(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"x-profile-status", estado)]}
+            await send(message)
+        return send_con_estado
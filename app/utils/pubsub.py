@@ -0,0 +1,208 @@
+# app/utils/pubsub.py
+"""
+Pub/sub en proceso de cambios en pólizas, reclamaciones y comisiones (alimenta /api/v1/events/stream).
+
+- Cada flush de la sesión anota qué filas de esas tablas creó, modificó o borró.
+- En Postgres los eventos se envían con pg_notify dentro de la misma transacción: Postgres
+  solo los entrega si hay COMMIT, y los entrega a todos los workers que escuchan el canal
+  (incluido el propio), cada uno con su hilo LISTEN.
+- En SQLite (harness, un solo proceso) se publican directamente tras el commit.
+
+Los suscriptores (una conexión SSE cada uno) reciben los eventos en una cola asyncio acotada.
+Si la cola se llena, la suscripción se marca como desbordada y el cliente debe recargar todo.
+"""
+import asyncio
+import json
+import os
+import select
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from app.db.database import engine, IS_SQLITE
+from app.models.cambio_sync import filas_escritas
+
+PUBSUB_ENABLED = os.getenv("PUBSUB_ENABLED", "1") == "1"
+PUBSUB_CHANNEL = os.getenv("PUBSUB_CHANNEL", "insurtech_eventos")
+# Eventos pendientes por suscriptor antes de declararlo desbordado
+PUBSUB_QUEUE_SIZE = int(os.getenv("PUBSUB_QUEUE_SIZE", "1000"))
+TABLAS_EVENTOS = ("polizas", "reclamaciones", "comisiones")
+# pg_notify admite payloads de hasta 8000 bytes
+_MAX_PAYLOAD = 7500
+_OPERACIONES = {"insert": "created", "update": "updated", "delete": "deleted"}
+
+
+class Suscripcion:
+    def __init__(self, bus: "Bus", loop: asyncio.AbstractEventLoop):
+        self.bus = bus
+        self.loop = loop
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=PUBSUB_QUEUE_SIZE)
+        self.desbordada = False
+
+    def entregar(self, eventos: List[Dict]):
+        # Se puede llamar desde cualquier hilo (commit en el threadpool, hilo LISTEN)
+        self.loop.call_soon_threadsafe(self._encolar, eventos)
+
+    def _encolar(self, eventos: List[Dict]):
+        for evento in eventos:
+            try:
+                self.cola.put_nowait(evento)
+            except asyncio.QueueFull:
+                self.desbordada = True
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.bus.cancelar(self)
+
+
+class Bus:
+    def __init__(self):
+        self._suscripciones = set()
+        self._lock = threading.Lock()
+
+    def suscribir(self) -> Suscripcion:
+        suscripcion = Suscripcion(self, asyncio.get_running_loop())
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._suscripciones)
+
+    def publicar(self, eventos: List[Dict]):
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+        for suscripcion in suscripciones:
+            suscripcion.entregar(eventos)
+
+
+bus = Bus()
+
+
+def _payloads(eventos: List[Dict]) -> List[str]:
+    """Agrupa los eventos en payloads JSON que no superen el límite de pg_notify."""
+    payloads, actual, tamano = [], [], 2
+    for evento in eventos:
+        codificado = json.dumps(evento, separators=(",", ":"))
+        if actual and tamano + len(codificado) + 1 > _MAX_PAYLOAD:
+            payloads.append("[" + ",".join(actual) + "]")
+            actual, tamano = [], 2
+        actual.append(codificado)
+        tamano += len(codificado) + 1
+    if actual:
+        payloads.append("[" + ",".join(actual) + "]")
+    return payloads
+
+
+@event.listens_for(Session, "after_flush")
+def _recolectar_eventos(session, flush_context):
+    if not PUBSUB_ENABLED:
+        return
+    eventos = [
+        {"t": tabla, "op": _OPERACIONES[operacion], "id": registro_id}
+        for tabla, registro_id, operacion in filas_escritas(session, TABLAS_EVENTOS)
+    ]
+    if not eventos:
+        return
+    if IS_SQLITE:
+        session.info.setdefault("eventos_pubsub", []).extend(eventos)
+        return
+    # NOTIFY es transaccional: se entrega en el COMMIT y se descarta en el ROLLBACK
+    conexion = session.connection()
+    for payload in _payloads(eventos):
+        conexion.execute(text("SELECT pg_notify(:canal, :payload)"), {"canal": PUBSUB_CHANNEL, "payload": payload})
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_tras_commit(session):
+    eventos = session.info.pop("eventos_pubsub", None)
+    if eventos:
+        bus.publicar(eventos)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_tras_rollback(session):
+    session.info.pop("eventos_pubsub", None)
+
+
+class EscuchaPostgres:
+    """Hilo con una conexión dedicada en LISTEN que reenvía las notificaciones al bus local."""
+
+    def __init__(self, canal: str = PUBSUB_CHANNEL):
+        self.canal = canal
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+
+    def start(self):
+        if self._hilo is not None and self._hilo.is_alive():
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._ejecutar, name="pubsub-listen", daemon=True)
+        self._hilo.start()
+
+    def stop(self):
+        self._detener.set()
+
+    def _conectar(self):
+        conexion = engine.raw_connection()
+        # Se saca del pool: la conexión queda dedicada a LISTEN y no ocupa un lugar del pool
+        conexion.detach()
+        dbapi = conexion.connection
+        dbapi.autocommit = True
+        with dbapi.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.canal}"')
+        return dbapi
+
+    def _ejecutar(self):
+        espera = 1.0
+        while not self._detener.is_set():
+            dbapi = None
+            try:
+                dbapi = self._conectar()
+                print(f"DEBUG BACKEND: [PUBSUB] Escuchando el canal '{self.canal}'.")
+                espera = 1.0
+                while not self._detener.is_set():
+                    # Despertar periódicamente para poder detener el hilo
+                    if select.select([dbapi], [], [], 5.0) == ([], [], []):
+                        continue
+                    dbapi.poll()
+                    eventos = []
+                    while dbapi.notifies:
+                        notificacion = dbapi.notifies.pop(0)
+                        eventos.extend(json.loads(notificacion.payload))
+                    if eventos:
+                        bus.publicar(eventos)
+            except Exception as e:
+                print(f"ERROR DB: [PUBSUB] Conexión LISTEN perdida: {e}. Reintentando en {espera:.0f}s.")
+                time.sleep(espera)
+                espera = min(espera * 2, 30.0)
+            finally:
+                if dbapi is not None:
+                    try:
+                        dbapi.close()
+                    except Exception:
+                        pass
+
+
+escucha = EscuchaPostgres()
+
+
+def start():
+    """Arranca la escucha de Postgres en este worker (llamar en el startup, después del fork)."""
+    if PUBSUB_ENABLED and not IS_SQLITE:
+        escucha.start()
+
+
+def stop():
+    escucha.stop()
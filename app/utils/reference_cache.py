@@ -0,0 +1,176 @@
+# app/utils/reference_cache.py
+"""
+Caché en proceso de los datos de referencia: empresas aseguradoras y asesores.
+
+Son tablas pequeñas que casi no cambian y que se consultan en casi cada petición de pólizas y
+comisiones (validar la clave foránea, anidar la empresa y el asesor, nombres para las tablas del
+frontend). La caché sirve esas lecturas sin ir a la base:
+
+- Cada tabla se carga completa la primera vez que se pide y se vuelve a cargar al invalidarla o
+  al pasar REFERENCE_CACHE_TTL segundos.
+- Invalidación write-through: los routers de empresas y asesores llaman a invalidar() tras el
+  commit, así que el propio worker ve sus escrituras en la siguiente petición. Cada catálogo tiene
+  una versión que invalidar() incrementa; una carga que empezó antes de la invalidación no se
+  guarda (no puede reinstalar datos anteriores a la escritura).
+- Los demás workers ven los cambios como mucho tras el TTL. firma() va en los ETag de las
+  respuestas armadas con la caché, para que una copia vieja nunca quede validada con un 304.
+- Un id que no está en la caché se busca en la base antes de responder 404 (un alta hecha en
+  otro worker no se rechaza), y la restricción de clave foránea sigue siendo la garantía final
+  al escribir.
+"""
+import hashlib
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models.empresa_aseguradora import EmpresaAseguradora, EmpresaAseguradoraRead
+from app.models.asesor import Asesor, AsesorRead
+
+REFERENCE_CACHE_ENABLED = os.getenv("REFERENCE_CACHE_ENABLED", "1") == "1"
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "60"))
+
+EMPRESAS = "empresas_aseguradoras"
+ASESORES = "asesores"
+# Los asesores anidan su empresa: invalidar las empresas invalida también los asesores
+_DEPENDIENTES = {EMPRESAS: (ASESORES,), ASESORES: ()}
+
+# Columnas de AsesorRead que se copian de la fila (la empresa se anida desde la caché)
+_CAMPOS_ASESOR = [campo for campo in AsesorRead.model_fields if campo in Asesor.__table__.columns]
+
+
+def nombre_asesor(asesor) -> str:
+    return f"{asesor.nombre} {asesor.apellido or ''}".strip()
+
+
+def asesor_read(fila, empresa: Optional[EmpresaAseguradoraRead]) -> AsesorRead:
+    """AsesorRead de una fila (ORM o Row) con la empresa ya resuelta, sin cargar la relación."""
+    datos = {campo: getattr(fila, campo) for campo in _CAMPOS_ASESOR}
+    return AsesorRead.model_validate({**datos, "empresa_aseguradora": empresa})
+
+
+class _Catalogo:
+    __slots__ = ("version", "cargado_en", "datos", "firma")
+
+    def __init__(self):
+        self.version = 0
+        self.cargado_en = 0.0
+        self.datos: Optional[Dict[int, object]] = None
+        self.firma: Optional[str] = None
+
+
+class ReferenceCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._catalogos = {EMPRESAS: _Catalogo(), ASESORES: _Catalogo()}
+
+    # --- Lectura ---
+
+    def empresas(self, db: Session) -> Dict[int, EmpresaAseguradoraRead]:
+        return self._vigente(db, EMPRESAS)
+
+    def asesores(self, db: Session) -> Dict[int, AsesorRead]:
+        return self._vigente(db, ASESORES)
+
+    def empresa(self, db: Session, empresa_id: Optional[int]) -> Optional[EmpresaAseguradoraRead]:
+        """La empresa con ese id, o None si no existe."""
+        if empresa_id is None:
+            return None
+        empresa = self.empresas(db).get(empresa_id)
+        if empresa is None:
+            fila = db.execute(select(*EmpresaAseguradora.__table__.columns).where(EmpresaAseguradora.id == empresa_id)).first()
+            if fila is not None:
+                empresa = self._fallo(EMPRESAS, empresa_id, EmpresaAseguradoraRead.model_validate(fila))
+        return empresa
+
+    def asesor(self, db: Session, asesor_id: Optional[int]) -> Optional[AsesorRead]:
+        """El asesor con ese id (con su empresa anidada), o None si no existe."""
+        if asesor_id is None:
+            return None
+        asesor = self.asesores(db).get(asesor_id)
+        if asesor is None:
+            fila = db.execute(select(*Asesor.__table__.columns).where(Asesor.id == asesor_id)).first()
+            if fila is not None:
+                asesor = self._fallo(ASESORES, asesor_id, asesor_read(fila, self.empresa(db, fila.empresa_aseguradora_id)))
+        return asesor
+
+    def buscar(self, db: Session, tabla: str, termino: Optional[str], limite: int) -> List[dict]:
+        """Typeahead: [{id, nombre}] cuyo nombre contiene `termino` (sin distinguir mayúsculas), por nombre."""
+        termino = (termino or "").strip().lower()
+        if tabla == EMPRESAS:
+            opciones = ((item.id, item.nombre) for item in self.empresas(db).values())
+        else:
+            opciones = ((item.id, nombre_asesor(item)) for item in self.asesores(db).values())
+        coincidencias = sorted(
+            ((nombre, id_) for id_, nombre in opciones if termino in nombre.lower()),
+            # Primero los que empiezan por el término
+            key=lambda opcion: (not opcion[0].lower().startswith(termino), opcion[0].lower(), opcion[1]),
+        )
+        return [{"id": id_, "nombre": nombre} for nombre, id_ in coincidencias[:limite]]
+
+    def firma(self, db: Session) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Firma del contenido de los catálogos que se están sirviendo (ids y fecha_actualizacion).
+        Va en el ETag de las respuestas que anidan datos de la caché: mientras este worker sirve
+        una copia vieja su ETag difiere del de una copia al día, y cambia al recargarla, así que
+        un cliente no queda con un 304 sobre nombres obsoletos. Es igual en todos los workers
+        que tengan los mismos datos.
+        """
+        self.empresas(db)
+        self.asesores(db)
+        return self._catalogos[EMPRESAS].firma, self._catalogos[ASESORES].firma
+
+    # --- Invalidación ---
+
+    def invalidar(self, tabla: str):
+        """Descarta el catálogo de `tabla` (y los que dependen de él) tras una escritura."""
+        with self._lock:
+            for nombre in (tabla, *_DEPENDIENTES[tabla]):
+                catalogo = self._catalogos[nombre]
+                catalogo.version += 1
+                catalogo.datos = catalogo.firma = None
+        print(f"DEBUG BACKEND: [REFERENCE_CACHE] Catálogo '{tabla}' invalidado.")
+
+    def version(self, tabla: str) -> int:
+        return self._catalogos[tabla].version
+
+    # --- Carga ---
+
+    def _vigente(self, db: Session, tabla: str) -> Dict[int, object]:
+        catalogo = self._catalogos[tabla]
+        with self._lock:
+            datos, version = catalogo.datos, catalogo.version
+            if datos is not None and REFERENCE_CACHE_ENABLED and time.monotonic() - catalogo.cargado_en < REFERENCE_CACHE_TTL:
+                return datos
+        # La consulta se hace fuera del lock; si otra carga termina antes, gana cualquiera de las dos
+        inicio = time.perf_counter()
+        datos, firma = self._cargar(db, tabla)
+        with self._lock:
+            if catalogo.version == version:
+                catalogo.datos, catalogo.firma, catalogo.cargado_en = datos, firma, time.monotonic()
+        print(f"DEBUG BACKEND: [REFERENCE_CACHE] Catálogo '{tabla}' cargado: {len(datos)} filas en {(time.perf_counter() - inicio) * 1000:.1f} ms.")
+        return datos
+
+    def _cargar(self, db: Session, tabla: str) -> Tuple[Dict[int, object], str]:
+        # Columnas, no entidades: la carga no llena el identity map de la sesión de la petición
+        if tabla == EMPRESAS:
+            filas = db.execute(select(*EmpresaAseguradora.__table__.columns)).all()
+            datos = {fila.id: EmpresaAseguradoraRead.model_validate(fila) for fila in filas}
+        else:
+            empresas = self.empresas(db)
+            filas = db.execute(select(*Asesor.__table__.columns)).all()
+            datos = {fila.id: asesor_read(fila, empresas.get(fila.empresa_aseguradora_id)) for fila in filas}
+        versiones = sorted((fila.id, fila.fecha_actualizacion) for fila in filas)
+        return datos, hashlib.blake2b(repr(versiones).encode("utf-8"), digest_size=8).hexdigest()
+
+    def _fallo(self, tabla: str, id_: int, item):
+        """Un id que existe en la base pero no en la caché (alta de otro worker): se recarga el catálogo."""
+        print(f"DEBUG BACKEND: [REFERENCE_CACHE] ID {id_} de '{tabla}' no estaba en caché; se recargará.")
+        self.invalidar(tabla)
+        return item
+
+
+reference_cache = ReferenceCache()
@@ -0,0 +1,36 @@
+# app/utils/responses.py
+"""
+Respuesta JSON rápida basada en pydantic-core.
+
+JSONResponse pasaba cada respuesta por jsonable_encoder (recorrido en Python de todo el árbol)
+y json.dumps. FastJSONResponse serializa directamente a bytes con el serializador en Rust de
+pydantic-core, que ya conoce el esquema de los modelos Read.
+
+- Como `default_response_class`, acelera la codificación final de todas las respuestas.
+- Los listados devuelven `FastJSONResponse(modelo)` directamente: así FastAPI además se salta
+  la revalidación del response_model y el volcado intermedio a dict (el response_model se
+  conserva en el decorador para la documentación OpenAPI).
+"""
+import pydantic_core
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.utils.tracing import span
+
+# Permite volver a la codificación clásica (jsonable_encoder + json.dumps) para comparar en benchmarks
+FAST_JSON = True
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse que codifica modelos Pydantic, listas y dicts con pydantic-core (span 'json.encode')."""
+
+    def render(self, content) -> bytes:
+        with span("json.encode"):
+            if not FAST_JSON:
+                return super().render(jsonable_encoder(content))
+            try:
+                # by_alias como FastAPI (ComisionRead expone 'poliza'/'asesor'); NaN/Infinity -> null, JSON válido
+                return pydantic_core.to_json(content, by_alias=True, inf_nan_mode="null")
+            except pydantic_core.PydanticSerializationError:
+                # Tipos que pydantic-core no sabe serializar: camino clásico
+                return super().render(jsonable_encoder(content))
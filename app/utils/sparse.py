@@ -0,0 +1,131 @@
+# app/utils/sparse.py
+"""
+Listados parciales: `fields=` (qué columnas) y `expand=` (qué relaciones anidar).
+
+    GET /api/v1/polizas/polizas/?fields=id,numero_poliza,cliente_nombre_completo
+    GET /api/v1/comisiones/?fields=id,monto,estatus_pago&expand=asesor
+
+- Solo se seleccionan las columnas pedidas (más el id y las FK internas que hagan falta).
+- Los campos de visualización (p. ej. cliente_nombre_completo) salen de un JOIN con las
+  columnas justas de la tabla relacionada, sin cargar la relación.
+- Cada relación pedida en `expand` se carga con una sola consulta IN por página, sin sus
+  propias relaciones (noload): una relación no pedida nunca se consulta.
+
+Sin `fields` ni `expand` los routers conservan la respuesta completa de siempre.
+"""
+from typing import Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException, status
+from sqlalchemy import select
+from sqlalchemy.orm import aliased, noload
+
+
+class Relacion:
+    """Relación anidable con `expand`: se carga por su FK y se serializa con `esquema`."""
+
+    def __init__(self, fk, modelo, esquema):
+        self.fk = fk
+        self.modelo = modelo
+        self.esquema = esquema
+
+
+class Derivado:
+    """Campo de visualización calculado con columnas de una tabla relacionada (vía JOIN)."""
+
+    def __init__(self, fk, modelo, columnas: Sequence[str], formato: Callable[..., Optional[str]]):
+        self.fk = fk
+        self.modelo = modelo
+        self.columnas = tuple(columnas)
+        self.formato = formato
+
+
+class Seleccion:
+    def __init__(self, columnas: List[str], derivados: List[str], relaciones: List[str]):
+        self.columnas = columnas
+        self.derivados = derivados
+        self.relaciones = relaciones
+
+
+def _lista(valor: Optional[str]) -> Optional[List[str]]:
+    if valor is None:
+        return None
+    return [parte.strip() for parte in valor.split(",") if parte.strip()]
+
+
+class SparseList:
+    """Describe qué columnas, campos derivados y relaciones admite un listado."""
+
+    def __init__(self, modelo, esquema, derivados: Dict[str, Derivado], relaciones: Dict[str, Relacion]):
+        self.modelo = modelo
+        # Columnas del esquema Read que son columnas reales de la tabla (en el orden del esquema)
+        tabla = modelo.__table__.c
+        self.columnas = {nombre: getattr(modelo, nombre) for nombre in esquema.model_fields if nombre in tabla}
+        self.derivados = derivados
+        self.relaciones = relaciones
+
+    def parse(self, fields: Optional[str], expand: Optional[str]) -> Seleccion:
+        """Valida fields/expand. Nombres desconocidos -> 400."""
+        pedidos = _lista(fields)
+        if pedidos is None:
+            columnas, derivados = list(self.columnas), list(self.derivados)
+        else:
+            desconocidos = [c for c in pedidos if c not in self.columnas and c not in self.derivados]
+            if desconocidos:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Campos desconocidos en fields: {', '.join(desconocidos)}. Disponibles: {', '.join(list(self.columnas) + list(self.derivados))}",
+                )
+            # El id siempre se incluye: el frontend lo usa como clave de fila
+            columnas = [c for c in self.columnas if c in pedidos or c == "id"]
+            derivados = [d for d in self.derivados if d in pedidos]
+
+        relaciones = _lista(expand) or []
+        desconocidas = [r for r in relaciones if r not in self.relaciones]
+        if desconocidas:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Relaciones desconocidas en expand: {', '.join(desconocidas)}. Disponibles: {', '.join(self.relaciones)}",
+            )
+        return Seleccion(columnas, derivados, list(dict.fromkeys(relaciones)))
+
+    def query(self, seleccion: Seleccion):
+        """SELECT con solo las columnas necesarias. El llamador añade filtros, orden, offset y limit."""
+        columnas = [self.columnas[c].label(c) for c in seleccion.columnas]
+        for nombre in seleccion.relaciones:
+            columnas.append(self.relaciones[nombre].fk.label(f"_fk_{nombre}"))
+        joins = []
+        for nombre in seleccion.derivados:
+            derivado = self.derivados[nombre]
+            # Alias por campo: no se correlaciona con los EXISTS de los filtros del router
+            alias = aliased(derivado.modelo)
+            joins.append((alias, derivado.fk == alias.id))
+            columnas.extend(getattr(alias, c).label(f"_{nombre}_{c}") for c in derivado.columnas)
+        consulta = select(*columnas).select_from(self.modelo)
+        for alias, condicion in joins:
+            consulta = consulta.outerjoin(alias, condicion)
+        return consulta
+
+    def items(self, db, filas, seleccion: Seleccion) -> List[dict]:
+        """Convierte las filas en dicts y anida las relaciones de `expand` (una consulta IN por relación)."""
+        items = []
+        for fila in filas:
+            datos = fila._mapping
+            item = {c: datos[c] for c in seleccion.columnas}
+            for nombre in seleccion.derivados:
+                derivado = self.derivados[nombre]
+                valores = [datos[f"_{nombre}_{c}"] for c in derivado.columnas]
+                item[nombre] = None if all(v is None for v in valores) else derivado.formato(*valores)
+            items.append(item)
+
+        for nombre in seleccion.relaciones:
+            relacion = self.relaciones[nombre]
+            ids = {fila._mapping[f"_fk_{nombre}"] for fila in filas} - {None}
+            relacionados = {}
+            if ids:
+                objetos = db.execute(
+                    select(relacion.modelo).options(noload("*")).where(relacion.modelo.id.in_(ids))
+                ).scalars().all()
+                relacionados = {objeto.id: relacion.esquema.model_validate(objeto) for objeto in objetos}
+            for item, fila in zip(items, filas):
+                item[nombre] = relacionados.get(fila._mapping[f"_fk_{nombre}"])
+        return items
@@ -0,0 +1,287 @@
+# app/utils/tracing.py
+"""
+Trazas ligeras por petición con spans anidados.
+
+- Cada petición HTTP abre un span raíz; auth, SQL, serialización y codificación JSON
+  abren spans hijos mediante `span("categoria.nombre")`.
+- Propagación W3C: se respeta el encabezado `traceparent` entrante y se devuelve el
+  `traceparent` del span del servidor en la respuesta.
+- Exportación opcional en formato OTLP/JSON a un archivo (una traza por línea) o a
+  un colector OTLP/HTTP, desde un hilo en segundo plano.
+- Encabezado `Server-Timing` con las fases más costosas, visible en las devtools.
+"""
+import json
+import os
+import queue
+import random
+import re
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+from sqlalchemy import event
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "1") == "1"
+TRACE_EXPORT_FILE = os.getenv("TRACE_EXPORT_FILE")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT") # ej. http://localhost:4318/v1/traces
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))
+TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "insurtech-api")
+
+# Límite de spans almacenados por traza; el resumen para Server-Timing se sigue acumulando
+MAX_SPANS_POR_TRAZA = 256
+# Cantidad de fases incluidas en Server-Timing
+SERVER_TIMING_TOP = 5
+
+_TRACEPARENT_RE = re.compile(r"^([0-9a-f]{2})-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+def _nuevo_id(bytes_: int) -> str:
+    return f"{random.getrandbits(bytes_ * 8):0{bytes_ * 2}x}"
+
+
+class Span:
+    __slots__ = ("traza", "nombre", "span_id", "parent_id", "inicio_ns", "_inicio", "duracion", "atributos")
+
+    def __init__(self, traza: "Traza", nombre: str, parent_id: Optional[str], atributos: Optional[dict] = None):
+        self.traza = traza
+        self.nombre = nombre
+        self.span_id = _nuevo_id(8)
+        self.parent_id = parent_id
+        self.inicio_ns = time.time_ns()
+        self._inicio = time.perf_counter()
+        self.duracion = None
+        self.atributos = atributos or {}
+
+    def finalizar(self):
+        if self.duracion is None:
+            self.duracion = time.perf_counter() - self._inicio
+            self.traza._registrar(self)
+
+
+class Traza:
+    """Conjunto de spans de una petición."""
+
+    def __init__(self, trace_id: str, muestreada: bool):
+        self.trace_id = trace_id
+        self.muestreada = muestreada
+        self.spans: List[Span] = []
+        self.descartados = 0
+        # categoría -> [duración acumulada, cantidad]
+        self.resumen: Dict[str, list] = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, span: Span):
+        categoria = span.nombre.split(".", 1)[0]
+        with self._lock:
+            acumulado = self.resumen.get(categoria)
+            if acumulado is None:
+                self.resumen[categoria] = [span.duracion, 1]
+            else:
+                acumulado[0] += span.duracion
+                acumulado[1] += 1
+            if len(self.spans) < MAX_SPANS_POR_TRAZA:
+                self.spans.append(span)
+            else:
+                self.descartados += 1
+
+    def server_timing(self, raiz: Span) -> str:
+        fases = sorted(
+            ((categoria, valores) for categoria, valores in self.resumen.items() if categoria != "http"),
+            key=lambda item: item[1][0],
+            reverse=True,
+        )[:SERVER_TIMING_TOP]
+        partes = [f'{categoria};dur={valores[0] * 1000:.2f};desc="{valores[1]}x"' for categoria, valores in fases]
+        total = raiz.duracion if raiz.duracion is not None else time.perf_counter() - raiz._inicio
+        partes.append(f"total;dur={total * 1000:.2f}")
+        return ", ".join(partes)
+
+
+_span_actual: ContextVar[Optional[Span]] = ContextVar("span_actual", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _span_actual.get()
+
+
+def start_span(nombre: str, **atributos) -> Optional[Span]:
+    """Abre un span hijo del span actual sin convertirlo en el span actual (útil para spans hoja)."""
+    padre = _span_actual.get()
+    if padre is None:
+        return None
+    return Span(padre.traza, nombre, padre.span_id, atributos)
+
+
+@contextmanager
+def span(nombre: str, **atributos):
+    """Abre un span hijo del span actual. Si no hay traza activa no hace nada."""
+    padre = _span_actual.get()
+    if padre is None:
+        yield None
+        return
+    hijo = Span(padre.traza, nombre, padre.span_id, atributos)
+    token = _span_actual.set(hijo)
+    try:
+        yield hijo
+    finally:
+        _span_actual.reset(token)
+        hijo.finalizar()
+
+
+# --- Exportación ---
+
+def _atributos_otlp(atributos: dict) -> list:
+    resultado = []
+    for clave, valor in atributos.items():
+        if isinstance(valor, bool):
+            resultado.append({"key": clave, "value": {"boolValue": valor}})
+        elif isinstance(valor, int):
+            resultado.append({"key": clave, "value": {"intValue": str(valor)}})
+        elif isinstance(valor, float):
+            resultado.append({"key": clave, "value": {"doubleValue": valor}})
+        else:
+            resultado.append({"key": clave, "value": {"stringValue": str(valor)}})
+    return resultado
+
+
+def _traza_a_otlp(traza: Traza) -> dict:
+    spans = []
+    for s in traza.spans:
+        span_otlp = {
+            "traceId": traza.trace_id,
+            "spanId": s.span_id,
+            "name": s.nombre,
+            "kind": 2 if s.nombre.startswith("http.") else 1, # SERVER / INTERNAL
+            "startTimeUnixNano": str(s.inicio_ns),
+            "endTimeUnixNano": str(s.inicio_ns + int((s.duracion or 0) * 1e9)),
+            "attributes": _atributos_otlp(s.atributos),
+        }
+        if s.parent_id:
+            span_otlp["parentSpanId"] = s.parent_id
+        spans.append(span_otlp)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": _atributos_otlp({"service.name": TRACE_SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "app.utils.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+class _Exportador:
+    """Hilo en segundo plano que envía las trazas al archivo y/o colector configurados."""
+
+    def __init__(self, archivo: Optional[str], endpoint: Optional[str]):
+        self.archivo = archivo
+        self.endpoint = endpoint
+        self._iniciar()
+
+    def _iniciar(self):
+        self._pid = os.getpid()
+        self._cola: "queue.Queue[Traza]" = queue.Queue(maxsize=1000)
+        self._hilo = threading.Thread(target=self._ejecutar, name="trace-exporter", daemon=True)
+        self._hilo.start()
+
+    def enviar(self, traza: Traza):
+        if self._pid != os.getpid():
+            # Los hilos no sobreviven al fork (workers de gunicorn con preload): iniciar uno propio
+            self._iniciar()
+        try:
+            self._cola.put_nowait(traza)
+        except queue.Full:
+            pass # Preferimos perder trazas antes que añadir latencia
+
+    def _ejecutar(self):
+        while True:
+            traza = self._cola.get()
+            try:
+                cuerpo = json.dumps(_traza_a_otlp(traza), separators=(",", ":"))
+                if self.archivo:
+                    with open(self.archivo, "a", encoding="utf-8") as f:
+                        f.write(cuerpo + "\n")
+                if self.endpoint:
+                    peticion = urllib.request.Request(
+                        self.endpoint, data=cuerpo.encode("utf-8"), headers={"Content-Type": "application/json"}, method="POST"
+                    )
+                    urllib.request.urlopen(peticion, timeout=5).close()
+            except Exception as e:
+                print(f"DEBUG BACKEND: [TRACING] Error exportando traza {traza.trace_id}: {e}")
+
+
+_exportador: Optional[_Exportador] = None
+if TRACING_ENABLED and (TRACE_EXPORT_FILE or TRACE_OTLP_ENDPOINT):
+    _exportador = _Exportador(TRACE_EXPORT_FILE, TRACE_OTLP_ENDPOINT)
+
+
+# --- Instrumentación de SQL ---
+
+def instrument_engine(engine):
+    """Registra un span 'db.query' por cada sentencia ejecutada en el engine."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _antes(conn, cursor, statement, parameters, context, executemany):
+        s = start_span("db.query", statement=statement[:200])
+        if s is not None and context is not None:
+            context._span_tracing = s
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _despues(conn, cursor, statement, parameters, context, executemany):
+        s = getattr(context, "_span_tracing", None)
+        if s is not None:
+            s.finalizar()
+
+    @event.listens_for(engine, "handle_error")
+    def _error(exception_context):
+        s = getattr(exception_context.execution_context, "_span_tracing", None)
+        if s is not None:
+            s.atributos["error"] = True
+            s.finalizar()
+
+
+# --- Middleware ---
+
+class TracingMiddleware:
+    """Middleware ASGI que abre el span raíz de cada petición y añade traceparent/Server-Timing."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not TRACING_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        trace_id, parent_id, muestreada = None, None, random.random() < TRACE_SAMPLE_RATE
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"traceparent":
+                coincidencia = _TRACEPARENT_RE.match(valor.decode("latin-1").strip().lower())
+                if coincidencia and coincidencia.group(2) != "0" * 32:
+                    trace_id, parent_id = coincidencia.group(2), coincidencia.group(3)
+                    muestreada = bool(int(coincidencia.group(4), 16) & 1)
+                break
+
+        traza = Traza(trace_id or _nuevo_id(16), muestreada)
+        raiz = Span(traza, "http.request", parent_id, {"http.method": scope.get("method", ""), "http.target": scope.get("path", "")})
+        token = _span_actual.set(raiz)
+
+        async def send_con_encabezados(message):
+            if message["type"] == "http.response.start":
+                encabezados = list(message.get("headers", []))
+                bandera = "01" if traza.muestreada else "00"
+                encabezados.append((b"traceparent", f"00-{traza.trace_id}-{raiz.span_id}-{bandera}".encode("latin-1")))
+                encabezados.append((b"server-timing", traza.server_timing(raiz).encode("latin-1")))
+                message = {**message, "headers": encabezados}
+                raiz.atributos["http.status_code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_con_encabezados)
+        finally:
+            _span_actual.reset(token)
+            ruta = getattr(scope.get("route"), "path", None)
+            if ruta:
+                raiz.atributos["http.route"] = ruta
+            raiz.finalizar()
+            if _exportador is not None and traza.muestreada:
+                _exportador.enviar(traza)
@@ -0,0 +1,138 @@
+# app/utils/warmup.py
+"""
+Calentamiento de la instancia antes de declararse lista (/readyz).
+
+Tras un deploy, las primeras peticiones reales pagaban el establecimiento de conexiones
+a la base de datos, la primera planificación de las consultas más usadas y la primera
+serialización de los modelos anidados. El calentamiento hace ese trabajo una vez, en un
+hilo aparte, mientras el servidor ya responde /healthz.
+"""
+import os
+import threading
+import time
+from typing import Optional
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select, text
+from sqlalchemy.orm import selectinload, joinedload
+
+from app.db.database import SessionLocal, engine
+
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+# Conexiones a abrir por adelantado (por defecto, el tamaño base del pool)
+WARMUP_POOL_CONNECTIONS = int(os.getenv("WARMUP_POOL_CONNECTIONS", "0")) or None
+# Cada cuánto se vuelve a comprobar si el esquema está al día (la inspección no es gratis)
+SCHEMA_CHECK_TTL = float(os.getenv("SCHEMA_CHECK_TTL", "60"))
+
+
+class EstadoCalentamiento:
+    def __init__(self):
+        self.completado = not WARMUP_ENABLED
+        self.error: Optional[str] = None
+        self.duracion: Optional[float] = None
+        self._esquema_al_dia: Optional[bool] = None
+        self._esquema_verificado = 0.0
+        self._lock = threading.Lock()
+
+    def esquema_al_dia(self) -> bool:
+        from app.migrate import schema_is_current
+        with self._lock:
+            if self._esquema_al_dia is None or time.monotonic() - self._esquema_verificado > SCHEMA_CHECK_TTL:
+                self._esquema_al_dia = schema_is_current(engine)
+                self._esquema_verificado = time.monotonic()
+            return self._esquema_al_dia
+
+
+estado = EstadoCalentamiento()
+
+
+def _abrir_pool():
+    tamano = WARMUP_POOL_CONNECTIONS
+    if tamano is None:
+        tamano = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    conexiones = []
+    try:
+        for _ in range(max(1, tamano)):
+            conexion = engine.connect()
+            conexion.execute(text("SELECT 1"))
+            conexiones.append(conexion)
+    finally:
+        # Al cerrarlas vuelven al pool, ya establecidas
+        for conexion in conexiones:
+            conexion.close()
+    return len(conexiones)
+
+
+def _consultas_y_serializadores() -> list:
+    """
+    Ejecuta una vez las consultas y serializaciones de las pantallas más usadas.
+    Cada paso es independiente: si uno falla se registra y se sigue con los demás.
+    Devuelve la lista de errores ("paso: error").
+    """
+    from app.models import Poliza, Reclamacion, ReclamacionRead, Comision, ComisionRead, Cliente, ClienteRead, Asesor, AsesorRead
+    from app.routers.dashboard import get_statistics_summary, get_polizas_proximas_a_vencer
+    from app.routers.poliza import _get_poliza_with_relations_and_map
+
+    def polizas(db):
+        # También carga la caché de referencia (empresas y asesores)
+        filas = db.execute(select(Poliza).options(selectinload(Poliza.cliente)).limit(10)).scalars().all()
+        jsonable_encoder([_get_poliza_with_relations_and_map(p, db) for p in filas])
+
+    def reclamaciones(db):
+        filas = db.query(Reclamacion).options(joinedload(Reclamacion.poliza), joinedload(Reclamacion.cliente)).limit(10).all()
+        jsonable_encoder([ReclamacionRead.model_validate(r) for r in filas])
+
+    def comisiones(db):
+        filas = db.query(Comision).options(joinedload(Comision.poliza), joinedload(Comision.asesor)).limit(10).all()
+        jsonable_encoder([ComisionRead.model_validate(c) for c in filas])
+
+    pasos = (
+        # Dashboard (pantalla inicial del frontend): los handlers no usan current_user
+        ("dashboard_resumen", lambda db: jsonable_encoder(get_statistics_summary(db=db, current_user=None))),
+        ("dashboard_proximas_a_vencer", lambda db: jsonable_encoder(get_polizas_proximas_a_vencer(days_out=30, db=db, current_user=None))),
+        ("polizas", polizas),
+        ("reclamaciones", reclamaciones),
+        ("comisiones", comisiones),
+        ("clientes", lambda db: jsonable_encoder([ClienteRead.model_validate(c) for c in db.query(Cliente).limit(10).all()])),
+        ("asesores", lambda db: jsonable_encoder([AsesorRead.model_validate(a) for a in db.query(Asesor).limit(10).all()])),
+    )
+
+    errores = []
+    db = SessionLocal()
+    try:
+        for nombre, paso in pasos:
+            try:
+                paso(db)
+            except Exception as e:
+                errores.append(f"{nombre}: {e}")
+                print(f"ERROR DB: [WARMUP] Falló el paso '{nombre}': {e}")
+            finally:
+                # Un paso fallido no deja la transacción abortada para los siguientes
+                db.rollback()
+    finally:
+        db.close()
+    return errores
+
+
+def warm_up():
+    """Calienta pool, consultas y serializadores. Marca la instancia como lista al terminar."""
+    inicio = time.perf_counter()
+    try:
+        conexiones = _abrir_pool()
+        errores = _consultas_y_serializadores()
+        estado.esquema_al_dia()
+        estado.duracion = time.perf_counter() - inicio
+        if errores:
+            estado.error = "; ".join(errores)
+        print(f"DEBUG BACKEND: [WARMUP] Completado en {estado.duracion * 1000:.0f}ms ({conexiones} conexiones abiertas, {len(errores)} pasos fallidos).")
+    except Exception as e:
+        # Un fallo del calentamiento no debe impedir servir: /readyz sigue comprobando la BD
+        estado.error = str(e)
+        print(f"ERROR DB: [WARMUP] Error durante el calentamiento: {e}")
+    finally:
+        estado.completado = True
+
+
+def start_warm_up():
+    if WARMUP_ENABLED:
+        threading.Thread(target=warm_up, name="warmup", daemon=True).start()
@@ -0,0 +1,6 @@
+# bench/__init__.py
+# Herramientas de rendimiento: generación de datos, pruebas de carga y microbenchmarks.
+import os
+
+# Directorio donde las herramientas guardan sus resultados JSON (ignorado por git)
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
@@ -0,0 +1,107 @@
+# bench/asgi_client.py
+"""
+Cliente ASGI en proceso: invoca la aplicación directamente, sin sockets ni servidor.
+
+Sirve para medir el costo de CPU de un endpoint (routing, dependencias, consulta,
+serialización, middlewares) sin el ruido de la red ni de uvicorn.
+
+    from bench.harness import create_app
+    from bench.asgi_client import ClienteASGI
+    cliente = ClienteASGI(create_app(":memory:", scale=0.01))
+    cliente.login()
+    respuesta = cliente.get("/api/v1/clientes/", limit=100)
+"""
+import asyncio
+import json
+import urllib.parse
+from typing import Dict, List, Optional, Tuple
+
+from bench.seed import BENCH_PASSWORD, BENCH_USERNAME
+
+
+class RespuestaASGI:
+    __slots__ = ("status", "encabezados", "cuerpo")
+
+    def __init__(self, status: int, encabezados: Dict[str, str], cuerpo: bytes):
+        self.status = status
+        self.encabezados = encabezados
+        self.cuerpo = cuerpo
+
+    def json(self):
+        return json.loads(self.cuerpo)
+
+
+class ClienteASGI:
+    def __init__(self, app, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.app = app
+        self.loop = loop or asyncio.new_event_loop()
+        self.token: Optional[str] = None
+
+    async def _llamar(self, metodo: str, ruta: str, consulta: str, cuerpo: bytes,
+                      encabezados: List[Tuple[bytes, bytes]]) -> RespuestaASGI:
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.3"},
+            "http_version": "1.1",
+            "method": metodo,
+            "scheme": "http",
+            "path": ruta,
+            "raw_path": ruta.encode("utf-8"),
+            "query_string": consulta.encode("latin-1"),
+            "root_path": "",
+            "headers": encabezados,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+            "state": {},
+        }
+        enviado = False
+        status = 500
+        respuesta_encabezados: Dict[str, str] = {}
+        partes: List[bytes] = []
+
+        async def receive():
+            nonlocal enviado
+            if not enviado:
+                enviado = True
+                return {"type": "http.request", "body": cuerpo, "more_body": False}
+            # El cuerpo ya se entregó: esperar indefinidamente como un cliente que no se desconecta
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                for nombre, valor in message.get("headers", []):
+                    respuesta_encabezados[nombre.decode("latin-1").lower()] = valor.decode("latin-1")
+            elif message["type"] == "http.response.body":
+                partes.append(message.get("body", b""))
+
+        await self.app(scope, receive, send)
+        return RespuestaASGI(status, respuesta_encabezados, b"".join(partes))
+
+    def request(self, metodo: str, ruta: str, params: Optional[Dict] = None, cuerpo: bytes = b"",
+                encabezados: Optional[Dict[str, str]] = None) -> RespuestaASGI:
+        consulta = urllib.parse.urlencode({k: v for k, v in (params or {}).items() if v not in (None, "")})
+        todos = {"host": "testserver"}
+        if self.token:
+            todos["authorization"] = f"Bearer {self.token}"
+        if cuerpo:
+            todos["content-length"] = str(len(cuerpo))
+        todos.update({k.lower(): v for k, v in (encabezados or {}).items()})
+        lista = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in todos.items()]
+        return self.loop.run_until_complete(self._llamar(metodo, ruta, consulta, cuerpo, lista))
+
+    def get(self, ruta: str, encabezados: Optional[Dict[str, str]] = None, **params) -> RespuestaASGI:
+        return self.request("GET", ruta, params, encabezados=encabezados)
+
+    def login(self, username: str = BENCH_USERNAME, password: str = BENCH_PASSWORD):
+        cuerpo = urllib.parse.urlencode({"username": username, "password": password}).encode("ascii")
+        respuesta = self.request("POST", "/api/v1/auth/token", cuerpo=cuerpo,
+                                 encabezados={"Content-Type": "application/x-www-form-urlencoded"})
+        if respuesta.status != 200:
+            raise RuntimeError(f"Login fallido ({respuesta.status}): {respuesta.cuerpo[:200]!r}")
+        self.token = respuesta.json()["access_token"]
+        return self.token
+
+    def close(self):
+        self.loop.close()
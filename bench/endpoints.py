@@ -0,0 +1,138 @@
+# bench/endpoints.py
+"""
+CPU por petición de los endpoints de listado, medida en proceso contra el harness.
+
+Para cada endpoint y tamaño de página (limit) mide el tiempo de CPU (time.process_time)
+de la petición completa a través de la aplicación ASGI: dependencias, consulta a SQLite,
+validación, codificación JSON y middlewares. Cada caso se mide dos veces:
+- fast: FastJSONResponse con pydantic-core (app.utils.responses.FAST_JSON = True);
+- classic: jsonable_encoder + json.dumps (FAST_JSON = False);
+y se reporta la CPU ahorrada por petición.
+
+Uso:
+    python -m bench.endpoints --scale 0.01
+    python -m bench.endpoints --endpoints polizas comisiones --limits 100 1000 --compare anterior.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from bench import RESULTS_DIR
+
+# Endpoints de listado tal como los llama el frontend
+ENDPOINTS = {
+    "clientes": "/api/v1/clientes/",
+    "polizas": "/api/v1/polizas/polizas/",
+    "reclamaciones": "/api/v1/reclamaciones/",
+    "comisiones": "/api/v1/comisiones/",
+    "empresas": "/api/v1/empresas_aseguradoras/",
+    "asesores": "/api/v1/asesores/",
+    "historial": "/api/v1/historial_cambio/",
+}
+LIMITES = (10, 100, 1000)
+MODOS = ("fast", "classic")
+
+
+def medir_cpu(funcion: Callable[[], object], presupuesto: float, minimo: int = 5) -> Dict[str, float]:
+    """Repite la función hasta agotar el presupuesto (tiempo de pared) y devuelve CPU mínima y mediana en segundos."""
+    funcion() # calentamiento
+    tiempos = []
+    limite = time.perf_counter() + presupuesto
+    while len(tiempos) < minimo or time.perf_counter() < limite:
+        inicio = time.process_time()
+        funcion()
+        tiempos.append(time.process_time() - inicio)
+    return {"min": min(tiempos), "median": statistics.median(tiempos), "runs": len(tiempos)}
+
+
+def ejecutar(endpoints: List[str], limites: List[int], presupuesto: float, scale: float, semilla: int) -> dict:
+    from bench.harness import create_app
+    from bench.asgi_client import ClienteASGI
+    from app.utils import responses
+
+    cliente = ClienteASGI(create_app(":memory:", scale=scale, semilla=semilla))
+    cliente.login()
+    resultados: Dict[str, dict] = {}
+    try:
+        for nombre in endpoints:
+            ruta = ENDPOINTS[nombre]
+            for limite in limites:
+                def llamar():
+                    respuesta = cliente.get(ruta, skip=0, limit=limite)
+                    if respuesta.status != 200:
+                        raise RuntimeError(f"{ruta} respondió {respuesta.status}: {respuesta.cuerpo[:200]!r}")
+                    return respuesta
+
+                bytes_respuesta = len(llamar().cuerpo)
+                for modo in MODOS:
+                    responses.FAST_JSON = modo == "fast"
+                    medicion = medir_cpu(llamar, presupuesto)
+                    resultados[f"{nombre}[{limite}].{modo}"] = {
+                        "endpoint": nombre, "limit": limite, "mode": modo, "runs": medicion["runs"],
+                        "bytes": bytes_respuesta,
+                        "cpu_min_ms": round(medicion["min"] * 1000, 3),
+                        "cpu_median_ms": round(medicion["median"] * 1000, 3),
+                    }
+    finally:
+        responses.FAST_JSON = True
+        cliente.close()
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+        "scale": scale, "seed": semilla, "results": resultados,
+    }
+
+
+def imprimir(resultado: dict, anterior: Optional[dict] = None):
+    previos = (anterior or {}).get("results", {})
+    datos = resultado["results"]
+    print(f"{'caso':<32}{'runs':>7}{'bytes':>10}{'cpu min ms':>12}{'cpu med ms':>12}{'ahorro':>10}")
+    for clave, fila in datos.items():
+        linea = f"{clave:<32}{fila['runs']:>7}{fila['bytes']:>10}{fila['cpu_min_ms']:>12.3f}{fila['cpu_median_ms']:>12.3f}"
+        if fila["mode"] == "fast":
+            clasico = datos.get(clave[:-len("fast")] + "classic")
+            if clasico and clasico["cpu_median_ms"]:
+                linea += f"{(clasico['cpu_median_ms'] - fila['cpu_median_ms']) / clasico['cpu_median_ms'] * 100:>9.1f}%"
+            else:
+                linea += f"{'':>10}"
+        else:
+            linea += f"{'':>10}"
+        previo = previos.get(clave)
+        if previo and previo["cpu_median_ms"]:
+            linea += f"   {(fila['cpu_median_ms'] - previo['cpu_median_ms']) / previo['cpu_median_ms'] * 100:+.1f}% vs anterior"
+        print(linea)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="CPU por petición de los endpoints de listado (en proceso, SQLite en memoria).")
+    parser.add_argument("--endpoints", nargs="+", choices=list(ENDPOINTS), default=list(ENDPOINTS))
+    parser.add_argument("--limits", nargs="+", type=int, default=list(LIMITES), help="Tamaños de página a medir.")
+    parser.add_argument("--scale", type=float, default=0.01, help="Escala de los datos sintéticos (bench.seed).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--budget", type=float, default=1.0, help="Segundos de medición por caso.")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto bench/results/endpoints-<fecha>.json).")
+    parser.add_argument("--compare", help="Resultado JSON previo contra el que comparar.")
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.endpoints, args.limits, args.budget, args.scale, args.seed)
+    anterior = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir(resultado, anterior)
+
+    ruta = args.output
+    if not ruta:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        ruta = os.path.join(RESULTS_DIR, f"endpoints-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\n[endpoints] Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+# bench/harness.py
+"""
+Harness local: arranca la aplicación completa contra SQLite (archivo o en memoria),
+con el esquema creado y opcionalmente poblado con bench.seed, sin necesidad de Postgres.
+
+Uso:
+    # Crear y poblar un archivo SQLite reutilizable, y servir la app en el puerto 8001
+    python -m bench.harness --db /tmp/insurtech-bench.db --scale 0.01 --serve
+
+    # Todo en memoria (el servidor corre en este mismo proceso)
+    python -m bench.harness --db :memory: --scale 0.01 --serve
+
+Desde código (benchmarks en proceso):
+    from bench.harness import create_app
+    app = create_app(":memory:", scale=0.01)
+"""
+import argparse
+import os
+import sys
+from typing import Dict, Optional
+
+DEFAULT_DB = ":memory:"
+
+
+def configure(db: str = DEFAULT_DB):
+    """Activa el modo harness. Debe llamarse antes de importar cualquier módulo de app."""
+    if "app.db.database" in sys.modules:
+        from app.db.database import DATABASE_URL
+        esperado = "sqlite://" if db == ":memory:" else f"sqlite:///{db}"
+        if DATABASE_URL != esperado:
+            raise RuntimeError(f"app.db.database ya fue importado con {DATABASE_URL}; configure() debe llamarse antes.")
+        return
+    os.environ.pop("DATABASE_URL", None)
+    os.environ["HARNESS_DB"] = db
+
+
+def prepare_database(scale: Optional[float] = None, semilla: int = 42, drop: bool = False,
+                     volumenes: Optional[Dict[str, int]] = None):
+    """Crea el esquema y, si se indica una escala o volúmenes, carga los datos sintéticos."""
+    from app.db.database import Base, engine
+    import app.models # noqa: F401
+
+    if scale is None and volumenes is None:
+        if drop:
+            Base.metadata.drop_all(engine)
+        Base.metadata.create_all(engine)
+        return engine
+
+    from bench.seed import scaled_volumes, seed_database
+    seed_database(engine, scaled_volumes(scale if scale is not None else 1.0, volumenes), semilla, drop=drop)
+    return engine
+
+
+def create_app(db: str = DEFAULT_DB, scale: Optional[float] = None, semilla: int = 42, drop: bool = False):
+    """Devuelve la aplicación FastAPI lista para usarse contra la base del harness."""
+    configure(db)
+    prepare_database(scale, semilla, drop)
+    from app.main import app
+    return app
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Arranca la aplicación contra SQLite local para benchmarks y perfilado.")
+    parser.add_argument("--db", default=DEFAULT_DB, help="Archivo SQLite o ':memory:' (por defecto en memoria).")
+    parser.add_argument("--scale", type=float, help="Poblar con bench.seed a esta escala (sin valor: solo el esquema).")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla de los datos sintéticos.")
+    parser.add_argument("--drop", action="store_true", help="Recrear el esquema desde cero.")
+    parser.add_argument("--serve", action="store_true", help="Servir la aplicación con uvicorn al terminar.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args(argv)
+
+    if args.db != ":memory:" and args.scale is not None and os.path.exists(args.db) and not args.drop:
+        parser.error(f"{args.db} ya existe: usa --drop para volver a poblarlo o omite --scale para reutilizarlo.")
+
+    app = create_app(args.db, args.scale, args.seed, args.drop)
+    print(f"[harness] Base de datos lista ({args.db}).")
+    if args.serve:
+        import uvicorn
+        uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+    elif args.db == ":memory:":
+        print("[harness] Aviso: sin --serve, la base en memoria se descarta al salir.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+# bench/loadtest.py
+"""
+Prueba de carga HTTP que reproduce las secuencias de llamadas reales del frontend (App.jsx).
+
+Cada usuario virtual inicia sesión una vez y luego recorre "journeys" elegidos al azar
+(según su peso): carga del dashboard, listado de pólizas con filtros, reclamaciones,
+comisiones, etc. Las llamadas que el frontend dispara en paralelo desde un mismo
+useEffect se lanzan también en paralelo, como haría el navegador.
+
+Al terminar reporta throughput, percentiles de latencia y tasa de errores por endpoint,
+y guarda los resultados en JSON para comparar ejecuciones (--compare).
+
+Uso:
+    python -m bench.loadtest --base-url http://localhost:8001 --users 20 --duration 60
+    python -m bench.loadtest --start-app --database-url postgresql://... --users 50
+    python -m bench.loadtest --start-app --harness-db /tmp/insurtech-bench.db --users 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.parse
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from bench import RESULTS_DIR
+from bench.seed import BENCH_PASSWORD, BENCH_USERNAME, FECHA_REFERENCIA
+
+API = "/api/v1"
+
+# Tamaño de página del frontend (constantes.jsx) y el "todos" que usa para llenar los selects
+POR_PAGINA = 10
+TODOS = 9999
+
+TIPOS_POLIZA = ["Vehículo", "Salud", "Vida", "Hogar"]
+ESTADOS_POLIZA = ["Activa", "Vencida", "Pendiente"]
+ESTADOS_RECLAMACION = ["Pendiente", "En Proceso", "Aprobada"]
+ESTATUS_PAGO = ["Pendiente", "Pagado"]
+BUSQUEDAS = ["Gonz", "Pérez", "María", "POL-2024", "V-40"]
+
+
+# --- Cliente HTTP/1.1 mínimo con keep-alive (solo biblioteca estándar) ---
+
+class RespuestaHTTP:
+    __slots__ = ("status", "encabezados", "cuerpo")
+
+    def __init__(self, status: int, encabezados: Dict[str, str], cuerpo: bytes):
+        self.status = status
+        self.encabezados = encabezados
+        self.cuerpo = cuerpo
+
+    def json(self):
+        return json.loads(self.cuerpo)
+
+
+class ConexionHTTP:
+    def __init__(self, host: str, puerto: int):
+        self.host = host
+        self.puerto = puerto
+        self._lector: Optional[asyncio.StreamReader] = None
+        self._escritor: Optional[asyncio.StreamWriter] = None
+
+    async def _conectar(self):
+        self._lector, self._escritor = await asyncio.open_connection(self.host, self.puerto)
+
+    def cerrar(self):
+        if self._escritor is not None:
+            self._escritor.close()
+            self._lector = self._escritor = None
+
+    async def solicitar(self, metodo: str, ruta: str, encabezados: Dict[str, str], cuerpo: bytes = b"") -> RespuestaHTTP:
+        # Un reintento si el servidor cerró la conexión inactiva
+        for intento in range(2):
+            if self._escritor is None:
+                await self._conectar()
+            try:
+                return await self._enviar(metodo, ruta, encabezados, cuerpo)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                self.cerrar()
+                if intento == 1:
+                    raise
+
+    async def _enviar(self, metodo: str, ruta: str, encabezados: Dict[str, str], cuerpo: bytes) -> RespuestaHTTP:
+        lineas = [f"{metodo} {ruta} HTTP/1.1", f"Host: {self.host}:{self.puerto}", f"Content-Length: {len(cuerpo)}"]
+        lineas.extend(f"{nombre}: {valor}" for nombre, valor in encabezados.items())
+        self._escritor.write(("\r\n".join(lineas) + "\r\n\r\n").encode("latin-1") + cuerpo)
+        await self._escritor.drain()
+
+        linea_estado = await self._lector.readuntil(b"\r\n")
+        if not linea_estado:
+            raise ConnectionError("Conexión cerrada por el servidor")
+        status = int(linea_estado.split(b" ", 2)[1])
+        recibidos: Dict[str, str] = {}
+        while True:
+            linea = await self._lector.readuntil(b"\r\n")
+            if linea == b"\r\n":
+                break
+            nombre, _, valor = linea.decode("latin-1").partition(":")
+            recibidos[nombre.strip().lower()] = valor.strip()
+
+        if recibidos.get("transfer-encoding", "").lower() == "chunked":
+            partes = []
+            while True:
+                tamano = int((await self._lector.readuntil(b"\r\n")).split(b";", 1)[0], 16)
+                if tamano == 0:
+                    await self._lector.readuntil(b"\r\n")
+                    break
+                partes.append(await self._lector.readexactly(tamano))
+                await self._lector.readexactly(2)
+            respuesta = b"".join(partes)
+        else:
+            respuesta = await self._lector.readexactly(int(recibidos.get("content-length", "0")))
+
+        if recibidos.get("connection", "").lower() == "close":
+            self.cerrar()
+        return RespuestaHTTP(status, recibidos, respuesta)
+
+
+# --- Registro de resultados ---
+
+@dataclass
+class Estadisticas:
+    latencias: Dict[str, List[float]] = field(default_factory=dict)
+    errores: Dict[str, Dict[str, int]] = field(default_factory=dict)
+
+    def registrar(self, nombre: str, duracion: float, error: Optional[str]):
+        self.latencias.setdefault(nombre, []).append(duracion)
+        if error is not None:
+            por_tipo = self.errores.setdefault(nombre, {})
+            por_tipo[error] = por_tipo.get(error, 0) + 1
+
+
+def _percentil(valores: Sequence[float], cuantil: float) -> float:
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(cuantil * len(ordenados)))]
+
+
+def resumir(estadisticas: Estadisticas, duracion: float) -> Dict[str, dict]:
+    resumen = {}
+    todas = [valor for valores in estadisticas.latencias.values() for valor in valores]
+    grupos = dict(estadisticas.latencias)
+    grupos["TOTAL"] = todas
+    for nombre, valores in grupos.items():
+        errores = estadisticas.errores.get(nombre, {}) if nombre != "TOTAL" else {
+            tipo: sum(e.get(tipo, 0) for e in estadisticas.errores.values())
+            for tipo in {t for e in estadisticas.errores.values() for t in e}
+        }
+        total_errores = sum(errores.values())
+        resumen[nombre] = {
+            "requests": len(valores),
+            "rps": round(len(valores) / duracion, 2) if duracion else 0.0,
+            "p50_ms": round(_percentil(valores, 0.50) * 1000, 2),
+            "p90_ms": round(_percentil(valores, 0.90) * 1000, 2),
+            "p99_ms": round(_percentil(valores, 0.99) * 1000, 2),
+            "max_ms": round(max(valores, default=0.0) * 1000, 2),
+            "error_rate": round(total_errores / len(valores), 4) if valores else 0.0,
+            "errors": errores,
+        }
+    return resumen
+
+
+# --- Usuario virtual y journeys ---
+
+class UsuarioVirtual:
+    """Simula una pestaña del navegador: un token y hasta 6 conexiones keep-alive."""
+
+    MAX_CONEXIONES = 6
+
+    def __init__(self, host: str, puerto: int, estadisticas: Estadisticas, rng: random.Random):
+        self.host = host
+        self.puerto = puerto
+        self.estadisticas = estadisticas
+        self.rng = rng
+        self.token: Optional[str] = None
+        self._libres: List[ConexionHTTP] = []
+        self._semaforo = asyncio.Semaphore(self.MAX_CONEXIONES)
+
+    def cerrar(self):
+        for conexion in self._libres:
+            conexion.cerrar()
+        self._libres.clear()
+
+    async def solicitar(self, nombre: str, metodo: str, ruta: str, cuerpo: bytes = b"",
+                        encabezados: Optional[Dict[str, str]] = None) -> Optional[RespuestaHTTP]:
+        encabezados = dict(encabezados or {})
+        if self.token:
+            encabezados["Authorization"] = f"Bearer {self.token}"
+        async with self._semaforo:
+            conexion = self._libres.pop() if self._libres else ConexionHTTP(self.host, self.puerto)
+            inicio = time.perf_counter()
+            try:
+                respuesta = await conexion.solicitar(metodo, ruta, encabezados, cuerpo)
+            except (OSError, asyncio.IncompleteReadError, ValueError) as e:
+                conexion.cerrar()
+                self.estadisticas.registrar(nombre, time.perf_counter() - inicio, type(e).__name__)
+                return None
+            self._libres.append(conexion)
+        error = None if respuesta.status < 400 else str(respuesta.status)
+        self.estadisticas.registrar(nombre, time.perf_counter() - inicio, error)
+        return respuesta
+
+    async def get(self, nombre: str, ruta: str, **params) -> Optional[RespuestaHTTP]:
+        consulta = urllib.parse.urlencode({k: v for k, v in params.items() if v not in (None, "")})
+        return await self.solicitar(nombre, "GET", f"{API}{ruta}?{consulta}" if consulta else f"{API}{ruta}")
+
+    async def paralelo(self, *llamadas):
+        await asyncio.gather(*llamadas)
+
+    async def login(self, username: str, password: str) -> bool:
+        cuerpo = urllib.parse.urlencode({"username": username, "password": password}).encode("ascii")
+        respuesta = await self.solicitar("POST /auth/token", "POST", f"{API}/auth/token", cuerpo,
+                                         {"Content-Type": "application/x-www-form-urlencoded"})
+        if respuesta is None or respuesta.status != 200:
+            return False
+        self.token = respuesta.json()["access_token"]
+        # App.jsx consulta el usuario actual en cuanto cambia el token
+        await self.get("GET /auth/users/me/", "/auth/users/me/")
+        return True
+
+    def _fecha(self) -> str:
+        return FECHA_REFERENCIA.replace(year=FECHA_REFERENCIA.year - self.rng.randint(0, 2), day=1).date().isoformat()
+
+    # Cada journey reproduce el useEffect de la pestaña correspondiente en App.jsx
+
+    async def dashboard(self):
+        await self.paralelo(
+            self.get("GET /statistics/summary/", "/statistics/summary/"),
+            self.get("GET /polizas/polizas/proximas_a_vencer/", "/polizas/polizas/proximas_a_vencer/", dias_restantes=30),
+        )
+
+    async def clientes(self):
+        for pagina in range(self.rng.randint(1, 3)):
+            await self.get("GET /clientes/", "/clientes/", offset=pagina * POR_PAGINA, limit=POR_PAGINA,
+                           search_term=self.rng.choice(BUSQUEDAS) if self.rng.random() < 0.3 else None)
+
+    async def polizas(self):
+        # Lista paginada con filtros + catálogos completos para los selects del formulario
+        filtros = {
+            "search_term": self.rng.choice(BUSQUEDAS) if self.rng.random() < 0.3 else None,
+            "tipo_poliza": self.rng.choice(TIPOS_POLIZA) if self.rng.random() < 0.4 else None,
+            "estado": self.rng.choice(ESTADOS_POLIZA) if self.rng.random() < 0.4 else None,
+            "fecha_inicio_filter": self._fecha() if self.rng.random() < 0.2 else None,
+        }
+        await self.paralelo(
+            self.get("GET /polizas/polizas/", "/polizas/polizas/", offset=0, limit=POR_PAGINA, **filtros),
+            self.get("GET /clientes/ (todos)", "/clientes/", offset=0, limit=TODOS),
+            self.get("GET /empresas_aseguradoras/ (todos)", "/empresas_aseguradoras/", offset=0, limit=TODOS),
+            self.get("GET /asesores/ (todos)", "/asesores/", offset=0, limit=TODOS),
+        )
+        for pagina in range(1, self.rng.randint(1, 4)):
+            await self.get("GET /polizas/polizas/", "/polizas/polizas/", offset=pagina * POR_PAGINA, limit=POR_PAGINA, **filtros)
+
+    async def reclamaciones(self):
+        await self.paralelo(
+            self.get("GET /reclamaciones/", "/reclamaciones/", offset=0, limit=POR_PAGINA,
+                     estado=self.rng.choice(ESTADOS_RECLAMACION) if self.rng.random() < 0.4 else None),
+            self.get("GET /polizas/polizas/ (todos)", "/polizas/polizas/", offset=0, limit=TODOS),
+            self.get("GET /clientes/ (todos)", "/clientes/", offset=0, limit=TODOS),
+        )
+
+    async def empresas(self):
+        await self.get("GET /empresas_aseguradoras/", "/empresas_aseguradoras/", offset=0, limit=POR_PAGINA)
+
+    async def asesores(self):
+        await self.paralelo(
+            self.get("GET /asesores/", "/asesores/", offset=0, limit=POR_PAGINA),
+            self.get("GET /empresas_aseguradoras/ (todos)", "/empresas_aseguradoras/", offset=0, limit=TODOS),
+        )
+
+    async def comisiones(self):
+        await self.paralelo(
+            self.get("GET /comisiones/", "/comisiones/", offset=0, limit=POR_PAGINA,
+                     estatus_pago=self.rng.choice(ESTATUS_PAGO) if self.rng.random() < 0.4 else None),
+            self.get("GET /asesores/ (todos)", "/asesores/", offset=0, limit=TODOS),
+            self.get("GET /polizas/polizas/ (todos)", "/polizas/polizas/", offset=0, limit=TODOS),
+        )
+
+
+# (journey, peso): el dashboard es la pestaña inicial y la más visitada
+JOURNEYS: List[Tuple[str, int]] = [
+    ("dashboard", 30), ("polizas", 25), ("clientes", 15), ("reclamaciones", 10),
+    ("comisiones", 10), ("asesores", 5), ("empresas", 5),
+]
+
+
+async def _usuario(indice: int, args, estadisticas: Estadisticas, fin: float, listos: List[int]):
+    rng = random.Random(f"{args.seed}:{indice}")
+    usuario = UsuarioVirtual(args.host, args.port, estadisticas, rng)
+    try:
+        # Escalonar los inicios de sesión durante el ramp-up
+        await asyncio.sleep(args.ramp_up * indice / max(1, args.users))
+        if not await usuario.login(args.username, args.password):
+            print(f"[loadtest] Usuario virtual {indice}: inicio de sesión fallido.")
+            return
+        listos.append(indice)
+        nombres = [nombre for nombre, _ in JOURNEYS]
+        pesos = [peso for _, peso in JOURNEYS]
+        journeys_restantes = args.iterations
+        while time.monotonic() < fin and (journeys_restantes is None or journeys_restantes > 0):
+            journey = args.journey or rng.choices(nombres, pesos)[0]
+            await getattr(usuario, journey)()
+            if journeys_restantes is not None:
+                journeys_restantes -= 1
+            if args.think_time:
+                await asyncio.sleep(rng.uniform(0, 2 * args.think_time))
+    finally:
+        usuario.cerrar()
+
+
+async def ejecutar(args) -> dict:
+    estadisticas = Estadisticas()
+    listos: List[int] = []
+    inicio = time.monotonic()
+    # Con --iterations y sin --duration, cada usuario termina al completar sus journeys
+    fin = inicio + args.ramp_up + args.duration if args.duration is not None else float("inf")
+    await asyncio.gather(*(_usuario(i, args, estadisticas, fin, listos) for i in range(args.users)))
+    duracion = time.monotonic() - inicio
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "base_url": args.base_url, "users": args.users, "duration": args.duration, "ramp_up": args.ramp_up,
+            "think_time": args.think_time, "iterations": args.iterations, "journey": args.journey, "seed": args.seed,
+        },
+        "logged_in_users": len(listos),
+        "elapsed_s": round(duracion, 2),
+        "endpoints": resumir(estadisticas, duracion),
+    }
+
+
+# --- Reporte y comparación ---
+
+def imprimir(resultado: dict, anterior: Optional[dict] = None):
+    print(f"\n[loadtest] {resultado['logged_in_users']} usuarios virtuales, {resultado['elapsed_s']}s")
+    print(f"{'endpoint':<48}{'reqs':>8}{'rps':>9}{'p50':>9}{'p90':>9}{'p99':>9}{'err%':>8}")
+    previos = (anterior or {}).get("endpoints", {})
+    for nombre, datos in sorted(resultado["endpoints"].items(), key=lambda item: (item[0] == "TOTAL", item[0])):
+        linea = (f"{nombre:<48}{datos['requests']:>8}{datos['rps']:>9.1f}{datos['p50_ms']:>9.1f}"
+                 f"{datos['p90_ms']:>9.1f}{datos['p99_ms']:>9.1f}{datos['error_rate'] * 100:>8.2f}")
+        previo = previos.get(nombre)
+        if previo and previo["p90_ms"]:
+            linea += f"   p90 {(datos['p90_ms'] - previo['p90_ms']) / previo['p90_ms'] * 100:+.1f}%"
+        print(linea)
+    for nombre, datos in resultado["endpoints"].items():
+        if nombre != "TOTAL" and datos["errors"]:
+            print(f"  errores en {nombre}: {datos['errors']}")
+
+
+def guardar(resultado: dict, ruta: Optional[str]) -> str:
+    if not ruta:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        ruta = os.path.join(RESULTS_DIR, f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    return ruta
+
+
+# --- Arranque local de la aplicación ---
+
+def iniciar_app(args) -> subprocess.Popen:
+    entorno = dict(os.environ)
+    if args.database_url:
+        entorno["DATABASE_URL"] = args.database_url
+    elif args.harness_db:
+        # SQLite local preparado con `python -m bench.harness --db <archivo> --scale ...`
+        entorno.pop("DATABASE_URL", None)
+        entorno["HARNESS_DB"] = args.harness_db
+    comando = [sys.executable, "-m", "uvicorn", "app.main:app", "--host", args.host, "--port", str(args.port),
+               "--log-level", "warning", "--no-access-log"]
+    print(f"[loadtest] Iniciando la aplicación: {' '.join(comando)}")
+    proceso = subprocess.Popen(comando, env=entorno, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               stdout=subprocess.DEVNULL if args.quiet_app else None)
+    return proceso
+
+
+async def esperar_app(host: str, puerto: int, proceso: Optional[subprocess.Popen], timeout: float = 60.0):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if proceso is not None and proceso.poll() is not None:
+            raise RuntimeError(f"La aplicación terminó durante el arranque (código {proceso.returncode}).")
+        conexion = ConexionHTTP(host, puerto)
+        try:
+            respuesta = await conexion.solicitar("GET", "/docs", {})
+            if respuesta.status < 500:
+                return
+        except OSError:
+            pass
+        finally:
+            conexion.cerrar()
+        await asyncio.sleep(0.25)
+    raise RuntimeError(f"La aplicación no respondió en {timeout:.0f}s.")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Prueba de carga que reproduce los patrones de llamadas del frontend.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8001", help="URL base de la API (sin /api/v1).")
+    parser.add_argument("--users", type=int, default=10, help="Cantidad de usuarios virtuales concurrentes.")
+    parser.add_argument("--duration", type=float, help="Duración de la prueba en segundos tras el ramp-up (por defecto 30).")
+    parser.add_argument("--ramp-up", type=float, default=5.0, help="Segundos para escalonar el inicio de los usuarios.")
+    parser.add_argument("--think-time", type=float, default=0.5, help="Pausa media entre journeys, en segundos.")
+    parser.add_argument("--iterations", type=int, help="Journeys por usuario (en lugar de limitar por duración).")
+    parser.add_argument("--journey", choices=[nombre for nombre, _ in JOURNEYS], help="Ejecutar solo este journey.")
+    parser.add_argument("--username", default=BENCH_USERNAME)
+    parser.add_argument("--password", default=BENCH_PASSWORD)
+    parser.add_argument("--seed", type=int, default=42, help="Semilla para la elección de journeys y filtros.")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto bench/results/loadtest-<fecha>.json).")
+    parser.add_argument("--compare", help="Resultado JSON previo contra el que comparar.")
+    parser.add_argument("--start-app", action="store_true", help="Iniciar la aplicación con uvicorn antes de la prueba.")
+    parser.add_argument("--database-url", help="DATABASE_URL para la aplicación iniciada con --start-app.")
+    parser.add_argument("--harness-db", help="Archivo SQLite del harness para la aplicación iniciada con --start-app.")
+    parser.add_argument("--quiet-app", action="store_true", help="Descartar la salida estándar de la aplicación iniciada.")
+    args = parser.parse_args(argv)
+
+    url = urllib.parse.urlsplit(args.base_url)
+    if url.scheme != "http":
+        parser.error("Solo se admite http:// (la prueba se ejecuta contra una instancia local).")
+    args.host, args.port = url.hostname, url.port or 80
+    if args.duration is None and args.iterations is None:
+        args.duration = 30.0
+
+    proceso = iniciar_app(args) if args.start_app else None
+    try:
+        asyncio.run(esperar_app(args.host, args.port, proceso))
+        resultado = asyncio.run(ejecutar(args))
+    finally:
+        if proceso is not None:
+            proceso.terminate()
+            proceso.wait(timeout=30)
+
+    anterior = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir(resultado, anterior)
+    print(f"\n[loadtest] Resultados guardados en {guardar(resultado, args.output)}")
+    return 0 if resultado["logged_in_users"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
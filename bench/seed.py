@@ -0,0 +1,368 @@
+# bench/seed.py
+"""
+Generador determinista de datos sintéticos a escala de producción.
+
+Puebla la base de datos con usuarios, empresas aseguradoras, asesores, clientes,
+pólizas, reclamaciones, comisiones e historial de cambios, con nombres, cédulas y
+RIF venezolanos realistas y respetando la integridad referencial.
+
+- Determinista: la misma semilla y fecha de referencia producen exactamente los mismos datos.
+- Rápido: en PostgreSQL usa COPY por lotes; en otros motores, inserciones executemany.
+
+Uso:
+    python -m bench.seed --database-url postgresql://... --scale 1 --seed 42 --drop
+"""
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+import unicodedata
+from array import array
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+# Volúmenes por defecto con --scale 1
+VOLUMENES_BASE = {
+    "users": 50,
+    "empresas_aseguradoras": 40,
+    "asesores": 2_000,
+    "clientes": 200_000,
+    "polizas": 500_000,
+    "reclamaciones": 100_000,
+    "comisiones": 400_000,
+    "historial_cambios": 1_000_000,
+}
+
+# Fecha fija para que las fechas generadas no dependan del día en que se ejecuta
+FECHA_REFERENCIA = datetime(2025, 7, 1)
+LOTE = 50_000
+
+# Usuario conocido para pruebas de carga y perfilado
+BENCH_USERNAME = "bench_admin"
+BENCH_PASSWORD = "bench_password"
+
+NOMBRES = [
+    "José", "Luis", "Carlos", "Juan", "Miguel", "Pedro", "Jesús", "Rafael", "Alejandro", "Andrés",
+    "Daniel", "Gabriel", "Ricardo", "Manuel", "Francisco", "Antonio", "Eduardo", "Fernando", "Jorge", "Óscar",
+    "María", "Ana", "Carmen", "Rosa", "Luisa", "Gabriela", "Daniela", "Andreína", "Valentina", "Mariana",
+    "Patricia", "Yolanda", "Isabel", "Alejandra", "Carolina", "Fabiola", "Yenny", "Keyla", "Aleika", "Milagros",
+    "Víctor", "Héctor", "Ramón", "Yorman", "Wilmer", "Richard", "Yusmary", "Nathaly", "Oriana", "Génesis",
+]
+APELLIDOS = [
+    "González", "Rodríguez", "Pérez", "Hernández", "García", "Martínez", "López", "Sánchez", "Ramírez", "Díaz",
+    "Torres", "Rojas", "Gómez", "Flores", "Suárez", "Morales", "Castillo", "Romero", "Mendoza", "Rivas",
+    "Medina", "Silva", "Vargas", "Guerrero", "Marcano", "Briceño", "Colmenares", "Chacón", "Bolívar", "Urdaneta",
+    "Salazar", "Contreras", "Rondón", "Villalobos", "Quintero", "Carrasco", "Ochoa", "Peña", "Blanco", "Zambrano",
+]
+CIUDADES = [
+    "Caracas", "Maracaibo", "Valencia", "Barquisimeto", "Maracay", "Ciudad Guayana", "Barcelona", "Maturín",
+    "Puerto La Cruz", "Mérida", "San Cristóbal", "Cumaná", "Barinas", "Coro", "Los Teques",
+]
+ASEGURADORAS = [
+    "Seguros Caracas", "Mercantil Seguros", "Seguros La Previsora", "Seguros Horizonte", "Seguros Pirámide",
+    "Seguros Constitución", "Seguros Venezuela", "Banesco Seguros", "Seguros Qualitas", "Seguros La Occidental",
+    "Seguros Universitas", "Hispana de Seguros", "Seguros Altamira", "Seguros Catatumbo", "Seguros Guayana",
+    "Seguros Ávila", "Seguros Canaima", "Seguros Orinoco", "Seguros Los Andes", "Seguros del Lago",
+]
+DOMINIOS = ["gmail.com", "hotmail.com", "yahoo.com", "outlook.com", "cantv.net"]
+
+# Mezclas de valores (nombre del miembro del Enum de SQLAlchemy, peso)
+TIPOS_POLIZA = [("VEHICULO", 35), ("SALUD", 30), ("VIDA", 15), ("HOGAR", 10), ("VIAJE", 5), ("OTROS", 5)]
+ESTADOS_POLIZA_VIGENTE = [("ACTIVA", 85), ("PENDIENTE", 10), ("CANCELADA", 5)]
+ESTADOS_POLIZA_VENCIDA = [("VENCIDA", 90), ("CANCELADA", 10)]
+ESTADOS_RECLAMACION = [("PENDIENTE", 25), ("EN_PROCESO", 20), ("APROBADA", 30), ("RECHAZADA", 15), ("CERRADA", 10)]
+ESTATUS_PAGO = [("PAGADO", 60), ("PENDIENTE", 35), ("ANULADO", 5)]
+TIPOS_COMISION = [("VENTA_NUEVA", 50), ("RENOVACION", 40), ("SERVICIO_ADICIONAL", 10)]
+CAMPOS_HISTORIAL = {
+    "polizas": ["estado", "prima", "monto_asegurado", "fecha_fin", "asesor_id", "observaciones"],
+    "clientes": ["telefono", "email", "direccion"],
+    "reclamaciones": ["estado", "monto_aprobado", "observaciones"],
+    "comisiones": ["estatus_pago", "fecha_pago", "monto"],
+}
+
+# Pesos del RIF venezolano para el dígito verificador
+_PESOS_RIF = (3, 2, 7, 6, 5, 4, 3, 2)
+_VALOR_LETRA_RIF = {"V": 1, "E": 2, "J": 3, "P": 4, "G": 5}
+
+
+def _sin_acentos(texto: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+
+
+def _eleccion_ponderada(rng: random.Random, opciones: Sequence[Tuple[str, int]]) -> Callable[[], str]:
+    valores = [valor for valor, _ in opciones]
+    pesos = [peso for _, peso in opciones]
+    return lambda: rng.choices(valores, pesos)[0]
+
+
+def _permutar(i: int, base: int, rango: int) -> int:
+    """Biyección determinista de i en [base, base + rango) para obtener números únicos de aspecto aleatorio."""
+    return base + (i * 7919) % rango
+
+
+def rif(letra: str, numero: int) -> str:
+    """Genera un RIF con su dígito verificador (ej. J-30123456-7)."""
+    digitos = f"{numero:08d}"
+    suma = _VALOR_LETRA_RIF[letra] * 4 + sum(int(d) * p for d, p in zip(digitos, _PESOS_RIF))
+    verificador = 11 - suma % 11
+    if verificador >= 10:
+        verificador = 0
+    return f"{letra}-{digitos}-{verificador}"
+
+
+def cedula(i: int, extranjero: bool = False) -> str:
+    return f"{'E' if extranjero else 'V'}-{_permutar(i, 4_000_000, 29_000_000)}"
+
+
+def _fecha_sesgada(rng: random.Random, referencia: datetime, dias_atras: int) -> datetime:
+    """Fecha anterior a la referencia con más densidad en el pasado reciente."""
+    dias = rng.triangular(0, dias_atras, 0)
+    return (referencia - timedelta(days=dias)).replace(microsecond=0)
+
+
+class Generador:
+    def __init__(self, volumenes: Dict[str, int], semilla: int, referencia: datetime, hashed_password: str):
+        self.volumenes = volumenes
+        self.semilla = semilla
+        self.referencia = referencia
+        self.hashed_password = hashed_password
+        # Datos de las pólizas necesarios para generar tablas dependientes con integridad referencial
+        self.poliza_cliente = array("i")
+        self.poliza_asesor = array("i") # 0 = sin asesor
+        self.poliza_prima = array("d")
+        self.poliza_inicio = array("d") # segundos respecto a la fecha de referencia
+        self.poliza_fin = array("d")
+
+    def _fecha(self, segundos: float) -> datetime:
+        return self.referencia + timedelta(seconds=int(segundos))
+
+    def _rng(self, tabla: str) -> random.Random:
+        # Un generador por tabla: cambiar el volumen de una tabla no altera las demás
+        return random.Random(f"{self.semilla}:{tabla}")
+
+    def users(self) -> Iterator[tuple]:
+        for i in range(1, self.volumenes["users"] + 1):
+            username = BENCH_USERNAME if i == 1 else f"usuario{i:04d}"
+            yield (i, username, f"{username}@insurtech.test", self.hashed_password, 1,
+                   self.referencia - timedelta(days=30), self.referencia + timedelta(days=3650), False)
+
+    def empresas_aseguradoras(self) -> Iterator[tuple]:
+        rng = self._rng("empresas")
+        for i in range(1, self.volumenes["empresas_aseguradoras"] + 1):
+            base = ASEGURADORAS[(i - 1) % len(ASEGURADORAS)]
+            nombre = base if i <= len(ASEGURADORAS) else f"{base} {(i - 1) // len(ASEGURADORAS) + 1}"
+            dominio = _sin_acentos(nombre).lower().replace(" ", "")
+            yield (i, nombre, rif("J", _permutar(i, 30_000_000, 9_000_000)), f"Av. Principal, {rng.choice(CIUDADES)}",
+                   f"0212-{rng.randint(1000000, 9999999)}", f"contacto{i}@{dominio}.com.ve",
+                   _fecha_sesgada(rng, self.referencia, 3650))
+
+    def _persona(self, rng: random.Random, i: int, prefijo_email: str):
+        nombre = rng.choice(NOMBRES)
+        apellido = rng.choice(APELLIDOS)
+        email = f"{_sin_acentos(nombre).lower()}.{_sin_acentos(apellido).lower()}.{prefijo_email}{i}@{rng.choice(DOMINIOS)}"
+        telefono = f"04{rng.choice(('12', '14', '16', '24', '26'))}-{rng.randint(1000000, 9999999)}"
+        return nombre, apellido, email, telefono
+
+    def asesores(self) -> Iterator[tuple]:
+        rng = self._rng("asesores")
+        empresas = self.volumenes["empresas_aseguradoras"]
+        for i in range(1, self.volumenes["asesores"] + 1):
+            nombre, apellido, email, telefono = self._persona(rng, i, "a")
+            empresa_id = rng.randint(1, empresas) if empresas and rng.random() < 0.8 else None
+            yield (i, nombre, apellido, cedula(i), telefono, email, _fecha_sesgada(rng, self.referencia, 3650), empresa_id)
+
+    def clientes(self) -> Iterator[tuple]:
+        rng = self._rng("clientes")
+        for i in range(1, self.volumenes["clientes"] + 1):
+            nombre, apellido, email, telefono = self._persona(rng, i, "c")
+            nacimiento = self.referencia - timedelta(days=rng.randint(18 * 365, 85 * 365))
+            yield (i, nombre, apellido, cedula(i, extranjero=rng.random() < 0.05), telefono, email,
+                   f"Calle {rng.randint(1, 120)}, {rng.choice(CIUDADES)}", nacimiento.replace(hour=0, minute=0, second=0),
+                   _fecha_sesgada(rng, self.referencia, 5 * 365))
+
+    def polizas(self) -> Iterator[tuple]:
+        rng = self._rng("polizas")
+        tipo = _eleccion_ponderada(rng, TIPOS_POLIZA)
+        estado_vigente = _eleccion_ponderada(rng, ESTADOS_POLIZA_VIGENTE)
+        estado_vencida = _eleccion_ponderada(rng, ESTADOS_POLIZA_VENCIDA)
+        clientes, empresas, asesores = (self.volumenes[t] for t in ("clientes", "empresas_aseguradoras", "asesores"))
+        for i in range(1, self.volumenes["polizas"] + 1):
+            cliente_id = rng.randint(1, clientes)
+            asesor_id = rng.randint(1, asesores) if asesores and rng.random() < 0.9 else None
+            inicio = _fecha_sesgada(rng, self.referencia, 5 * 365)
+            fin = inicio + timedelta(days=rng.choice((180, 365, 365, 365, 730)))
+            monto = round(rng.lognormvariate(9.5, 1.0), 2)
+            prima = round(monto * rng.uniform(0.02, 0.08), 2)
+            estado = estado_vigente() if fin >= self.referencia else estado_vencida()
+            self.poliza_cliente.append(cliente_id)
+            self.poliza_asesor.append(asesor_id or 0)
+            self.poliza_prima.append(prima)
+            self.poliza_inicio.append((inicio - self.referencia).total_seconds())
+            self.poliza_fin.append((fin - self.referencia).total_seconds())
+            yield (i, f"POL-{inicio.year}-{i:08d}", tipo(), inicio, fin, monto, prima, estado,
+                   None if rng.random() < 0.7 else "Renovación automática",
+                   cliente_id, rng.randint(1, empresas), asesor_id, inicio - timedelta(days=rng.randint(0, 15)))
+
+    def reclamaciones(self) -> Iterator[tuple]:
+        rng = self._rng("reclamaciones")
+        estado = _eleccion_ponderada(rng, ESTADOS_RECLAMACION)
+        total_polizas = len(self.poliza_cliente)
+        for i in range(1, self.volumenes["reclamaciones"] + 1):
+            indice = rng.randrange(total_polizas)
+            inicio, fin = self.poliza_inicio[indice], min(self.poliza_fin[indice], 0.0)
+            fecha = self._fecha(rng.uniform(inicio, max(inicio, fin)))
+            valor_estado = estado()
+            reclamado = round(rng.lognormvariate(7.0, 1.2), 2)
+            resuelta = valor_estado in ("APROBADA", "RECHAZADA", "CERRADA")
+            aprobado = round(reclamado * rng.uniform(0.5, 1.0), 2) if valor_estado in ("APROBADA", "CERRADA") else None
+            yield (i, indice + 1, self.poliza_cliente[indice], fecha, f"Reclamación por siniestro #{i} reportado por el asegurado.",
+                   valor_estado, reclamado, aprobado, fecha + timedelta(days=rng.randint(3, 60)) if resuelta else None, None)
+
+    def comisiones(self) -> Iterator[tuple]:
+        rng = self._rng("comisiones")
+        estatus = _eleccion_ponderada(rng, ESTATUS_PAGO)
+        tipo = _eleccion_ponderada(rng, TIPOS_COMISION)
+        total_polizas, asesores = len(self.poliza_cliente), self.volumenes["asesores"]
+        for i in range(1, self.volumenes["comisiones"] + 1):
+            indice = rng.randrange(total_polizas)
+            asesor_id = self.poliza_asesor[indice] or rng.randint(1, asesores)
+            porcentaje = rng.choice((5.0, 7.5, 10.0, 12.5, 15.0))
+            calculo = self._fecha(self.poliza_inicio[indice]) + timedelta(days=rng.randint(0, 30))
+            valor_estatus = estatus()
+            yield (i, indice + 1, asesor_id, round(self.poliza_prima[indice] * porcentaje / 100, 2), porcentaje, calculo,
+                   valor_estatus, calculo + timedelta(days=rng.randint(5, 45)) if valor_estatus == "PAGADO" else None, tipo(), None)
+
+    def historial_cambios(self) -> Iterator[tuple]:
+        rng = self._rng("historial")
+        tablas = list(CAMPOS_HISTORIAL)
+        maximos = {"polizas": self.volumenes["polizas"], "clientes": self.volumenes["clientes"],
+                   "reclamaciones": self.volumenes["reclamaciones"], "comisiones": self.volumenes["comisiones"]}
+        usuarios = self.volumenes["users"]
+        for i in range(1, self.volumenes["historial_cambios"] + 1):
+            tabla = rng.choices(tablas, (50, 20, 20, 10))[0]
+            campo = rng.choice(CAMPOS_HISTORIAL[tabla])
+            yield (i, tabla, rng.randint(1, max(1, maximos[tabla])), campo, f"valor_{rng.randint(1, 999)}",
+                   f"valor_{rng.randint(1, 999)}", _fecha_sesgada(rng, self.referencia, 3 * 365), rng.randint(1, usuarios))
+
+
+# Orden de carga (respeta las claves foráneas) y columnas de cada tabla
+TABLAS: List[Tuple[str, Tuple[str, ...]]] = [
+    ("users", ("id", "username", "email", "hashed_password", "is_active", "license_start_date", "license_end_date", "is_trial")),
+    ("empresas_aseguradoras", ("id", "nombre", "rif", "direccion", "telefono", "email", "fecha_registro")),
+    ("asesores", ("id", "nombre", "apellido", "cedula", "telefono", "email", "fecha_contratacion", "empresa_aseguradora_id")),
+    ("clientes", ("id", "nombre", "apellido", "cedula", "telefono", "email", "direccion", "fecha_nacimiento", "fecha_registro")),
+    ("polizas", ("id", "numero_poliza", "tipo_poliza", "fecha_inicio", "fecha_fin", "monto_asegurado", "prima", "estado",
+                 "observaciones", "cliente_id", "empresa_aseguradora_id", "asesor_id", "fecha_creacion")),
+    ("reclamaciones", ("id", "poliza_id", "cliente_id", "fecha_reclamacion", "descripcion", "estado", "monto_reclamado",
+                       "monto_aprobado", "fecha_resolucion", "observaciones")),
+    ("comisiones", ("id", "poliza_id", "asesor_id", "monto", "porcentaje_comision", "fecha_calculo", "estatus_pago",
+                    "fecha_pago", "tipo_comision", "observaciones")),
+    ("historial_cambios", ("id", "tabla_afectada", "registro_id", "campo_modificado", "valor_anterior", "valor_nuevo",
+                           "fecha_cambio", "usuario_id")),
+]
+
+
+def _lotes(filas: Iterable[tuple], tamano: int) -> Iterator[List[tuple]]:
+    lote = []
+    for fila in filas:
+        lote.append(fila)
+        if len(lote) >= tamano:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+def _copiar_postgres(conn, tabla: str, columnas: Sequence[str], filas: List[tuple]):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(filas) # None se escribe vacío, que COPY interpreta como NULL
+    buffer.seek(0)
+    cursor = conn.connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {tabla} ({', '.join(columnas)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _insertar_generico(conn, tabla, columnas: Sequence[str], filas: List[tuple]):
+    conn.execute(tabla.insert(), [dict(zip(columnas, fila)) for fila in filas])
+
+
+def scaled_volumes(scale: float, overrides: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    volumenes = {tabla: max(1, int(cantidad * scale)) for tabla, cantidad in VOLUMENES_BASE.items()}
+    volumenes.update({tabla: cantidad for tabla, cantidad in (overrides or {}).items() if cantidad is not None})
+    return volumenes
+
+
+def seed_database(engine, volumenes: Dict[str, int], semilla: int = 42, referencia: datetime = FECHA_REFERENCIA,
+                  drop: bool = False, lote: int = LOTE) -> Dict[str, float]:
+    """
+    Crea el esquema (opcionalmente desde cero) y carga los datos sintéticos.
+    Devuelve la duración en segundos de la carga de cada tabla.
+    """
+    from app.db.database import Base
+    import app.models # noqa: F401  (registra todos los modelos en Base.metadata)
+    from app.utils.auth import get_password_hash
+
+    if drop:
+        Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+
+    # argon2 es lento a propósito: se calcula una sola vez y se reutiliza para todos los usuarios
+    generador = Generador(volumenes, semilla, referencia, get_password_hash(BENCH_PASSWORD))
+    es_postgres = engine.dialect.name == "postgresql"
+    duraciones = {}
+
+    with engine.begin() as conn:
+        for nombre_tabla, columnas in TABLAS:
+            inicio = time.perf_counter()
+            tabla = Base.metadata.tables[nombre_tabla]
+            total = 0
+            for filas in _lotes(getattr(generador, nombre_tabla)(), lote):
+                if es_postgres:
+                    _copiar_postgres(conn, nombre_tabla, columnas, filas)
+                else:
+                    _insertar_generico(conn, tabla, columnas, filas)
+                total += len(filas)
+            duraciones[nombre_tabla] = time.perf_counter() - inicio
+            print(f"[seed] {nombre_tabla}: {total} filas en {duraciones[nombre_tabla]:.1f}s")
+            if es_postgres:
+                # Los IDs se insertaron explícitamente: alinear la secuencia para los próximos INSERT
+                conn.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{nombre_tabla}', 'id'), (SELECT COALESCE(MAX(id), 1) FROM {nombre_tabla}))"
+                )
+        if es_postgres:
+            for nombre_tabla, _ in TABLAS:
+                conn.exec_driver_sql(f"ANALYZE {nombre_tabla}")
+    return duraciones
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Genera un dataset sintético determinista para benchmarks.")
+    parser.add_argument("--database-url", default=os.getenv("DATABASE_URL"), help="URL de la base de datos destino (por defecto DATABASE_URL).")
+    parser.add_argument("--seed", type=int, default=42, help="Semilla del generador.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplicador de los volúmenes por defecto.")
+    parser.add_argument("--fecha-referencia", default=FECHA_REFERENCIA.date().isoformat(), help="Fecha 'actual' de los datos (YYYY-MM-DD).")
+    parser.add_argument("--drop", action="store_true", help="Eliminar y recrear todas las tablas antes de cargar.")
+    parser.add_argument("--lote", type=int, default=LOTE, help="Filas por lote de inserción.")
+    for tabla in VOLUMENES_BASE:
+        parser.add_argument(f"--{tabla.replace('_', '-')}", type=int, dest=tabla, help=f"Cantidad de filas de {tabla}.")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("Se requiere --database-url o la variable de entorno DATABASE_URL.")
+    # app.db.database lee DATABASE_URL al importarse
+    os.environ["DATABASE_URL"] = args.database_url
+    from app.db.database import engine
+
+    volumenes = scaled_volumes(args.scale, {tabla: getattr(args, tabla) for tabla in VOLUMENES_BASE})
+    inicio = time.perf_counter()
+    seed_database(engine, volumenes, args.seed, datetime.fromisoformat(args.fecha_referencia), args.drop, args.lote)
+    print(f"[seed] Carga completa en {time.perf_counter() - inicio:.1f}s. Usuario de pruebas: {BENCH_USERNAME} / {BENCH_PASSWORD}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
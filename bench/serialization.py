@@ -0,0 +1,199 @@
+# bench/serialization.py
+"""
+Microbenchmarks de serialización de los modelos Read.
+
+Para cada modelo y tamaño de página (10, 100 y 1000 filas) mide por separado:
+- validate: conversión ORM -> Pydantic con model_validate (lo que hacen los routers fila a fila);
+- encode_fastapi: jsonable_encoder + json.dumps (el camino clásico de FastAPI/JSONResponse);
+- encode_pydantic: volcado directo a JSON con pydantic-core (TypeAdapter.dump_json, como FastJSONResponse).
+
+No necesita base de datos: los objetos ORM se construyen en memoria (transitorios, con sus
+relaciones asignadas) a partir del generador de bench.seed, así los datos son realistas
+y siempre los mismos.
+
+Uso:
+    python -m bench.serialization
+    python -m bench.serialization --models PolizaRead ComisionRead --sizes 100 1000 --compare anterior.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+# Los modelos importan app.db.database; sin DATABASE_URL se usa el harness en memoria (no se abre ninguna conexión)
+if not os.getenv("DATABASE_URL"):
+    os.environ.setdefault("HARNESS_DB", ":memory:")
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import Enum as SAEnum
+
+from app.models import (
+    Asesor, AsesorRead, Cliente, ClienteRead, Comision, ComisionRead, EmpresaAseguradora, EmpresaAseguradoraRead,
+    HistorialCambio, HistorialCambioRead, Poliza, PolizaRead, Reclamacion, ReclamacionRead,
+)
+from app.routers.poliza import _get_poliza_with_relations_and_map
+from bench import RESULTS_DIR
+from bench.seed import FECHA_REFERENCIA, TABLAS, Generador
+
+TAMANOS = (10, 100, 1000)
+
+
+def _objetos(clase, nombre_tabla: str, filas) -> List:
+    """Convierte las tuplas del generador en instancias ORM transitorias."""
+    columnas = dict(TABLAS)[nombre_tabla]
+    enums = {
+        columna.name: columna.type.enum_class
+        for columna in clase.__table__.columns
+        if isinstance(columna.type, SAEnum) and columna.type.enum_class is not None
+    }
+    objetos = []
+    for fila in filas:
+        valores = dict(zip(columnas, fila))
+        for nombre, enum_class in enums.items():
+            if valores.get(nombre) is not None:
+                valores[nombre] = enum_class[valores[nombre]]
+        objetos.append(clase(**valores))
+    return objetos
+
+
+def construir_datos(filas: int, semilla: int = 42) -> Dict[str, List]:
+    """Grafo de objetos ORM con las relaciones que cargan los routers (selectinload/joinedload)."""
+    volumenes = {tabla: filas for tabla, _ in TABLAS}
+    generador = Generador(volumenes, semilla, FECHA_REFERENCIA, "")
+    empresas = _objetos(EmpresaAseguradora, "empresas_aseguradoras", generador.empresas_aseguradoras())
+    asesores = _objetos(Asesor, "asesores", generador.asesores())
+    clientes = _objetos(Cliente, "clientes", generador.clientes())
+    polizas = _objetos(Poliza, "polizas", generador.polizas())
+    reclamaciones = _objetos(Reclamacion, "reclamaciones", generador.reclamaciones())
+    comisiones = _objetos(Comision, "comisiones", generador.comisiones())
+    historial = _objetos(HistorialCambio, "historial_cambios", generador.historial_cambios())
+
+    for asesor in asesores:
+        if asesor.empresa_aseguradora_id:
+            asesor.empresa_aseguradora = empresas[asesor.empresa_aseguradora_id - 1]
+    for poliza in polizas:
+        poliza.cliente = clientes[poliza.cliente_id - 1]
+        poliza.empresa_aseguradora = empresas[poliza.empresa_aseguradora_id - 1]
+        if poliza.asesor_id:
+            poliza.asesor = asesores[poliza.asesor_id - 1]
+    for reclamacion in reclamaciones:
+        reclamacion.poliza = polizas[reclamacion.poliza_id - 1]
+        reclamacion.cliente = clientes[reclamacion.cliente_id - 1]
+    for comision in comisiones:
+        comision.poliza = polizas[comision.poliza_id - 1]
+        comision.asesor = asesores[comision.asesor_id - 1]
+
+    return {
+        "ClienteRead": clientes, "EmpresaAseguradoraRead": empresas, "AsesorRead": asesores, "PolizaRead": polizas,
+        "ReclamacionRead": reclamaciones, "ComisionRead": comisiones, "HistorialCambioRead": historial,
+    }
+
+
+def _validar_reclamacion(rec: Reclamacion) -> ReclamacionRead:
+    # Igual que get_all_reclamaciones
+    rec_read = ReclamacionRead.model_validate(rec)
+    rec_read.poliza_numero_poliza = rec.poliza.numero_poliza if rec.poliza else None
+    rec_read.cliente_nombre_completo = f"{rec.cliente.nombre} {rec.cliente.apellido}" if rec.cliente else None
+    rec_read.estado_display = rec.estado.value
+    return rec_read
+
+
+def _validar_comision(comision: Comision) -> ComisionRead:
+    # Igual que read_comisiones: campos planos en el objeto ORM y validación por fila
+    comision.poliza_numero_poliza = comision.poliza.numero_poliza if comision.poliza else None
+    comision.asesor_nombre_completo = f"{comision.asesor.nombre} {comision.asesor.apellido or ''}".strip() if comision.asesor else None
+    return ComisionRead.model_validate(comision)
+
+
+# Modelo -> (clase Pydantic, función de validación por fila tal como la usan los routers)
+MODELOS: Dict[str, tuple] = {
+    "ClienteRead": (ClienteRead, ClienteRead.model_validate),
+    "EmpresaAseguradoraRead": (EmpresaAseguradoraRead, EmpresaAseguradoraRead.model_validate),
+    "AsesorRead": (AsesorRead, AsesorRead.model_validate),
+    "PolizaRead": (PolizaRead, _get_poliza_with_relations_and_map),
+    "ReclamacionRead": (ReclamacionRead, _validar_reclamacion),
+    "ComisionRead": (ComisionRead, _validar_comision),
+    "HistorialCambioRead": (HistorialCambioRead, HistorialCambioRead.model_validate),
+}
+
+
+def medir(funcion: Callable[[], object], presupuesto: float, minimo: int = 5) -> Dict[str, float]:
+    """Repite la función hasta agotar el presupuesto de tiempo y devuelve mínimo y mediana en segundos."""
+    funcion() # calentamiento
+    tiempos = []
+    limite = time.perf_counter() + presupuesto
+    while len(tiempos) < minimo or time.perf_counter() < limite:
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {"min": min(tiempos), "median": statistics.median(tiempos), "runs": len(tiempos)}
+
+
+def ejecutar(modelos: List[str], tamanos: List[int], presupuesto: float) -> dict:
+    datos = construir_datos(max(tamanos))
+    resultados: Dict[str, dict] = {}
+    for nombre in modelos:
+        clase, validar = MODELOS[nombre]
+        adaptador = TypeAdapter(List[clase])
+        for tamano in tamanos:
+            objetos = datos[nombre][:tamano]
+            validados = [validar(o) for o in objetos]
+            casos = {
+                "validate": lambda: [validar(o) for o in objetos],
+                "encode_fastapi": lambda: json.dumps(jsonable_encoder(validados), ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+                "encode_pydantic": lambda: adaptador.dump_json(validados),
+            }
+            for caso, funcion in casos.items():
+                medicion = medir(funcion, presupuesto)
+                resultados[f"{nombre}[{len(objetos)}].{caso}"] = {
+                    "model": nombre, "rows": len(objetos), "case": caso, "runs": medicion["runs"],
+                    "min_ms": round(medicion["min"] * 1000, 3),
+                    "median_ms": round(medicion["median"] * 1000, 3),
+                    "per_row_us": round(medicion["median"] / max(1, len(objetos)) * 1e6, 2),
+                }
+    return {"timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0], "results": resultados}
+
+
+def imprimir(resultado: dict, anterior: Optional[dict] = None):
+    previos = (anterior or {}).get("results", {})
+    print(f"{'caso':<48}{'runs':>7}{'min ms':>10}{'med ms':>10}{'us/fila':>10}")
+    for clave, datos in resultado["results"].items():
+        linea = f"{clave:<48}{datos['runs']:>7}{datos['min_ms']:>10.3f}{datos['median_ms']:>10.3f}{datos['per_row_us']:>10.2f}"
+        previo = previos.get(clave)
+        if previo and previo["median_ms"]:
+            linea += f"   {(datos['median_ms'] - previo['median_ms']) / previo['median_ms'] * 100:+.1f}%"
+        print(linea)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Microbenchmarks de serialización ORM -> Pydantic -> JSON.")
+    parser.add_argument("--models", nargs="+", choices=list(MODELOS), default=list(MODELOS))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(TAMANOS), help="Tamaños de página a medir.")
+    parser.add_argument("--budget", type=float, default=0.5, help="Segundos de medición por caso.")
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto bench/results/serialization-<fecha>.json).")
+    parser.add_argument("--compare", help="Resultado JSON previo contra el que comparar.")
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.models, args.sizes, args.budget)
+    anterior = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir(resultado, anterior)
+
+    ruta = args.output
+    if not ruta:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        ruta = os.path.join(RESULTS_DIR, f"serialization-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\n[serialization] Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
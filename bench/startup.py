@@ -0,0 +1,110 @@
+# bench/startup.py
+"""
+Perfil del arranque de la aplicación con un presupuesto de tiempo.
+
+Lanza un intérprete nuevo con `-X importtime`, importa app.main y ejecuta los eventos
+de startup contra el harness (SQLite en memoria), y reporta:
+- tiempo de importación de app.main y tiempo de los eventos de startup;
+- los módulos con mayor tiempo de importación acumulado;
+- si algún módulo pesado opcional (pandas, openpyxl, numpy) se importó en el arranque.
+
+Termina con código 1 si el arranque supera el presupuesto o se importa un módulo prohibido,
+para poder usarlo como control en CI.
+
+Uso:
+    python -m bench.startup --budget-ms 1500
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional
+
+# Módulos que no deben importarse en el arranque (se cargan bajo demanda)
+MODULOS_PROHIBIDOS = ("pandas", "numpy", "openpyxl")
+
+_SCRIPT = r"""
+import asyncio, json, sys, time
+inicio = time.perf_counter()
+from app.main import app
+importado = time.perf_counter()
+asyncio.run(app.router.startup())
+arrancado = time.perf_counter()
+asyncio.run(app.router.shutdown())
+print(json.dumps({
+    "import_ms": (importado - inicio) * 1000,
+    "startup_ms": (arrancado - importado) * 1000,
+    "modules": sorted(sys.modules),
+}))
+"""
+
+
+def _parsear_importtime(salida: str) -> List[Dict]:
+    """Parsea las líneas 'import time: self [us] | cumulative | imported package' de -X importtime."""
+    modulos = []
+    for linea in salida.splitlines():
+        if not linea.startswith("import time:") or "self [us]" in linea:
+            continue
+        propio, acumulado, nombre = linea[len("import time:"):].split("|")
+        modulos.append({
+            "module": nombre.strip(),
+            "depth": (len(nombre) - len(nombre.lstrip())) // 2,
+            "self_ms": int(propio) / 1000,
+            "cumulative_ms": int(acumulado) / 1000,
+        })
+    return modulos
+
+
+def medir_arranque() -> dict:
+    entorno = dict(os.environ)
+    entorno.pop("DATABASE_URL", None)
+    entorno.update({"HARNESS_DB": ":memory:", "AUTO_MIGRATE": "0", "DEBUG": "0", "LOOP_LAG_ENABLED": "0"})
+    raiz = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    proceso = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", _SCRIPT],
+        cwd=raiz, env=entorno, capture_output=True, text=True, check=False,
+    )
+    if proceso.returncode != 0:
+        raise RuntimeError(f"El arranque falló:\n{proceso.stderr[-4000:]}")
+    resultado = json.loads(proceso.stdout.strip().splitlines()[-1])
+    resultado["imports"] = _parsear_importtime(proceso.stderr)
+    return resultado
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Perfil de importación y arranque de la aplicación.")
+    parser.add_argument("--budget-ms", type=float, default=2000.0, help="Presupuesto para importación + startup.")
+    parser.add_argument("--top", type=int, default=25, help="Cantidad de módulos a mostrar.")
+    parser.add_argument("--output", help="Guardar el reporte completo en este archivo JSON.")
+    args = parser.parse_args(argv)
+
+    resultado = medir_arranque()
+    # Solo paquetes de primer nivel o módulos de la app: los submódulos ya cuentan en su padre
+    principales = [m for m in resultado["imports"] if m["depth"] == 0 or m["module"].startswith("app.")]
+    print(f"{'módulo':<50}{'acumulado ms':>14}{'propio ms':>12}")
+    for modulo in sorted(principales, key=lambda m: m["cumulative_ms"], reverse=True)[:args.top]:
+        print(f"{modulo['module']:<50}{modulo['cumulative_ms']:>14.1f}{modulo['self_ms']:>12.1f}")
+
+    total = resultado["import_ms"] + resultado["startup_ms"]
+    print(f"\n[startup] importación de app.main: {resultado['import_ms']:.0f}ms, eventos de startup: {resultado['startup_ms']:.0f}ms, "
+          f"total: {total:.0f}ms (presupuesto {args.budget_ms:.0f}ms)")
+
+    cargados = set(resultado["modules"])
+    prohibidos = [m for m in MODULOS_PROHIBIDOS if m in cargados]
+    if prohibidos:
+        print(f"[startup] Módulos pesados importados en el arranque: {', '.join(prohibidos)}")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({k: v for k, v in resultado.items() if k != "modules"}, f, indent=2)
+
+    if total > args.budget_ms or prohibidos:
+        print("[startup] FUERA DE PRESUPUESTO")
+        return 1
+    print("[startup] OK")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
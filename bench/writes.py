@@ -0,0 +1,183 @@
+# bench/writes.py
+"""
+Escrituras por segundo (por worker) de los handlers de alta y modificación.
+
+Ejecuta en proceso, contra el harness (SQLite en memoria poblado con bench.seed), peticiones
+secuenciales de:
+- POST /polizas/polizas/ y PUT /polizas/polizas/{id}
+- POST /comisiones/ y PUT /comisiones/{id}
+
+y reporta para cada una escrituras/s, latencia mediana, CPU por escritura y sentencias SQL
+por escritura (contadas en el engine, incluida la autenticación), que es lo que más pesa
+cuando la base de datos está en otra máquina.
+
+Uso:
+    python -m bench.writes --scale 0.01 --count 500
+    python -m bench.writes --count 200 --compare anterior.json
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from bench import RESULTS_DIR
+from bench.seed import FECHA_REFERENCIA
+
+CASOS = ("create_poliza", "update_poliza", "create_comision", "update_comision")
+
+
+class ContadorSQL:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.total = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def _poliza(i: int, volumenes: Dict[str, int]) -> dict:
+    inicio = FECHA_REFERENCIA - timedelta(days=i % 300)
+    return {
+        "numero_poliza": f"BENCH-W-{i:08d}",
+        "tipo_poliza": "Salud",
+        "fecha_inicio": inicio.isoformat(),
+        "fecha_fin": (inicio + timedelta(days=365)).isoformat(),
+        "monto_asegurado": 10000 + i,
+        "prima": 250.5,
+        "estado": "Activa",
+        "cliente_id": i % volumenes["clientes"] + 1,
+        "empresa_aseguradora_id": i % volumenes["empresas_aseguradoras"] + 1,
+        "asesor_id": i % volumenes["asesores"] + 1,
+    }
+
+
+def _comision(i: int, poliza_id: int, volumenes: Dict[str, int]) -> dict:
+    return {
+        "poliza_id": poliza_id,
+        "asesor_id": i % volumenes["asesores"] + 1,
+        "monto": 120.0 + i % 50,
+        "porcentaje_comision": 10.0,
+        "estatus_pago": "Pendiente",
+        "tipo_comision": "Venta Nueva",
+    }
+
+
+def medir(nombre: str, cantidad: int, llamar: Callable[[int], object], contador: ContadorSQL) -> dict:
+    llamar(-1) # calentamiento
+    latencias = []
+    sentencias_antes = contador.total
+    cpu_inicio = time.process_time()
+    inicio = time.perf_counter()
+    for i in range(cantidad):
+        t0 = time.perf_counter()
+        llamar(i)
+        latencias.append(time.perf_counter() - t0)
+    duracion = time.perf_counter() - inicio
+    cpu = time.process_time() - cpu_inicio
+    return {
+        "case": nombre, "count": cantidad,
+        "writes_per_s": round(cantidad / duracion, 1),
+        "median_ms": round(statistics.median(latencias) * 1000, 3),
+        "cpu_per_write_ms": round(cpu / cantidad * 1000, 3),
+        "statements_per_write": round((contador.total - sentencias_antes) / cantidad, 2),
+    }
+
+
+def ejecutar(cantidad: int, scale: float, semilla: int) -> dict:
+    from bench.harness import create_app
+    from bench.asgi_client import ClienteASGI
+    from bench.seed import scaled_volumes
+
+    app = create_app(":memory:", scale=scale, semilla=semilla)
+    # create_app configura el harness: app.db.database solo puede importarse después
+    from app.db.database import engine
+    volumenes = scaled_volumes(scale)
+    cliente = ClienteASGI(app)
+    cliente.login()
+    contador = ContadorSQL(engine)
+    json_headers = {"Content-Type": "application/json"}
+    creadas: Dict[str, List[int]] = {"polizas": [], "comisiones": []}
+    desplazamiento = {"create_poliza": 0}
+
+    def enviar(metodo: str, ruta: str, cuerpo: dict, esperado: int):
+        respuesta = cliente.request(metodo, ruta, cuerpo=json.dumps(cuerpo).encode("utf-8"), encabezados=json_headers)
+        if respuesta.status != esperado:
+            raise RuntimeError(f"{metodo} {ruta} respondió {respuesta.status}: {respuesta.cuerpo[:300]!r}")
+        return respuesta.json()
+
+    def create_poliza(i: int):
+        desplazamiento["create_poliza"] += 1
+        datos = enviar("POST", "/api/v1/polizas/polizas/", _poliza(desplazamiento["create_poliza"], volumenes), 201)
+        creadas["polizas"].append(datos["id"])
+
+    def update_poliza(i: int):
+        poliza_id = creadas["polizas"][i % len(creadas["polizas"])]
+        enviar("PUT", f"/api/v1/polizas/polizas/{poliza_id}", {"prima": 300.0 + i % 100, "observaciones": f"bench {i}"}, 200)
+
+    def create_comision(i: int):
+        poliza_id = creadas["polizas"][i % len(creadas["polizas"])]
+        datos = enviar("POST", "/api/v1/comisiones/", _comision(i, poliza_id, volumenes), 201)
+        creadas["comisiones"].append(datos["id"])
+
+    def update_comision(i: int):
+        comision_id = creadas["comisiones"][i % len(creadas["comisiones"])]
+        enviar("PUT", f"/api/v1/comisiones/{comision_id}", {"estatus_pago": "Pagado" if i % 2 else "Pendiente"}, 200)
+
+    funciones = {"create_poliza": create_poliza, "update_poliza": update_poliza,
+                 "create_comision": create_comision, "update_comision": update_comision}
+    resultados = {}
+    try:
+        for caso in CASOS:
+            resultados[caso] = medir(caso, cantidad, funciones[caso], contador)
+    finally:
+        cliente.close()
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"), "python": sys.version.split()[0],
+        "scale": scale, "seed": semilla, "results": resultados,
+    }
+
+
+def imprimir(resultado: dict, anterior: Optional[dict] = None):
+    previos = (anterior or {}).get("results", {})
+    print(f"{'caso':<20}{'escrituras/s':>14}{'med ms':>10}{'cpu ms':>10}{'sql/escritura':>15}")
+    for clave, fila in resultado["results"].items():
+        linea = (f"{clave:<20}{fila['writes_per_s']:>14.1f}{fila['median_ms']:>10.3f}"
+                 f"{fila['cpu_per_write_ms']:>10.3f}{fila['statements_per_write']:>15.2f}")
+        previo = previos.get(clave)
+        if previo and previo["writes_per_s"]:
+            linea += f"   {(fila['writes_per_s'] - previo['writes_per_s']) / previo['writes_per_s'] * 100:+.1f}% escrituras/s"
+        print(linea)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Escrituras por segundo de los handlers de alta y modificación (en proceso, SQLite en memoria).")
+    parser.add_argument("--count", type=int, default=300, help="Escrituras por caso.")
+    parser.add_argument("--scale", type=float, default=0.01, help="Escala de los datos sintéticos (bench.seed).")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="Archivo JSON de resultados (por defecto bench/results/writes-<fecha>.json).")
+    parser.add_argument("--compare", help="Resultado JSON previo contra el que comparar.")
+    args = parser.parse_args(argv)
+
+    resultado = ejecutar(args.count, args.scale, args.seed)
+    anterior = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            anterior = json.load(f)
+    imprimir(resultado, anterior)
+
+    ruta = args.output
+    if not ruta:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        ruta = os.path.join(RESULTS_DIR, f"writes-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"\n[writes] Resultados guardados en {ruta}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())